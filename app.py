@@ -1,15 +1,69 @@
 
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, g, has_app_context, has_request_context, url_for
 import mysql.connector
 from mysql.connector import Error
 from werkzeug.security import generate_password_hash, check_password_hash
+import hashlib
+import hmac
 import json
+import os
 import random
+import re
+import signal
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import accumulate
 from datetime import datetime, timedelta
 from flask_apscheduler import APScheduler
+import click
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
 
 class Config:
     SCHEDULER_API_ENABLED = True
+    DB_BACKEND = os.environ.get('PLANT_GAME_DB_BACKEND', 'mysql')
+    DB_SQLITE_PATH = os.environ.get('PLANT_GAME_SQLITE_PATH', 'plant_game.sqlite3')
+    DB_POOL_SIZE = int(os.environ.get('PLANT_GAME_DB_POOL_SIZE', 10))
+    DB_ASYNC_POOL_SIZE = int(os.environ.get('PLANT_GAME_DB_ASYNC_POOL_SIZE', 20))
+    ASGI_SYNC_THREADS = int(os.environ.get('PLANT_GAME_ASGI_SYNC_THREADS', 8))
+    WORLD_TICK_SHARDS = int(os.environ.get('PLANT_GAME_TICK_SHARDS', 8))
+    WORLD_TICK_WORKERS = int(os.environ.get('PLANT_GAME_TICK_WORKERS', 4))
+    WORLD_TICK_BATCH_SIZE = 500
+    DB_SCHEDULER_POOL_SIZE = WORLD_TICK_WORKERS + 2
+    DB_POOL_TIMEOUT_SECONDS = 5.0
+    DB_POOL_HEALTH_CHECK_SECONDS = 30.0
+    EVENT_STREAM_HEARTBEAT_SECONDS = 15
+    EVENT_STREAM_SYNC_SLOTS = int(os.environ.get('PLANT_GAME_EVENT_STREAM_SYNC_SLOTS', 2))
+    EVENT_STREAM_RETRY_SECONDS = 60
+    MAX_BULK_ACTIONS = 100
+    MULTI_WORKER = os.environ.get('PLANT_GAME_MULTI_WORKER', '0') == '1'
+    BACKGROUND_JOBS = os.environ.get('PLANT_GAME_BACKGROUND_JOBS', '1') == '1'
+    TICK_LEADER_LOCK = os.environ.get('PLANT_GAME_TICK_LEADER_LOCK', 'db' if DB_BACKEND == 'mysql' else 'file')
+    TICK_LEADER_LOCK_FILE = os.environ.get('PLANT_GAME_TICK_LEADER_LOCK_FILE', os.path.join(tempfile.gettempdir(), 'plant_game_tick.lock'))
+    CACHE_SYNC_INTERVAL_SECONDS = 1
+    CACHE_SYNC_OVERLAP_SECONDS = 10
+    CACHE_INVALIDATION_RETENTION_SECONDS = 300
+    WEATHER_SEED = os.environ.get('PLANT_GAME_WEATHER_SEED', 'plant-game-weather')
+    WEATHER_EPOCH_SECONDS = 300
+    WEATHER_STICK_ROLL_SECONDS = 2.5
+    WEATHER_STICK_ONLINE_WINDOW_SECONDS = 90
+    SOLD_FRUIT_ARCHIVE_BATCH_SIZE = 1000
+    SOLD_FRUIT_ARCHIVE_INTERVAL_MINUTES = 60
+    FINGERPRINTED_ASSET_MAX_AGE_SECONDS = 365 * 24 * 3600
+    INSTRUMENTATION_ENABLED = os.environ.get('PLANT_GAME_INSTRUMENTATION', '0') == '1'
+    METRICS_ENABLED = os.environ.get('PLANT_GAME_METRICS', '0') == '1'
+    METRICS_TOKEN = os.environ.get('PLANT_GAME_METRICS_TOKEN', '')
+    METRICS_ALLOW_IPS = [ip.strip() for ip in os.environ.get('PLANT_GAME_METRICS_ALLOW_IPS', '127.0.0.1,::1').split(',') if ip.strip()]
 
 app = Flask(__name__)
 app.config.from_object(Config())
@@ -17,21 +71,473 @@ app.secret_key = 'your_super_secret_key_change_me_please'
 
 DB_CONFIG = {'host': 'localhost', 'user': 'root', 'password': '', 'database': 'plant_game_db'}
 PLANT_TYPES, FERTILIZER_TYPES, FRUIT_TYPES, WEATHER_TYPES, WEATHER_COMBINATIONS = {}, {}, {}, {}, {}
+WEATHER_COMBINATION_INDEX = {}
 PLOT_COSTS = {2: 5000, 3: 15000, 4: 50000}
-GLOBAL_WEATHER_STATE = []
-LAST_GLOBAL_WEATHER_UPDATE_MINUTE = -1
+PERENNIAL_FRUITING_STAGE = 16
+MAX_PLOT_FRUITS = 10
+FERTILIZER_EFFECT_SECONDS = 600
+LAST_ANNOUNCED_WEATHER_EPOCH = None
+LAST_CACHE_INVALIDATION_AT = 0
+APPLIED_CACHE_INVALIDATIONS = {}
+LAST_WORLD_TICK_STATS = {}
+GAME_STATE_CACHE, GAME_STATE_GENERATIONS = {}, {}
+GAME_STATE_LOCK = threading.Lock()
+GAME_STATE_MAX_AGE_SECONDS = 60
+GAME_STATE_CACHE_MAX_USERS = 10000
+WEATHER_EFFECT_SECONDS = 120
+FRUIT_COLUMNS = ('id', 'user_id', 'plot_id', 'fruit_type_id', 'weight', 'created_at', 'harvested', 'weather_effects', 'last_weather_check')
+INVENTORY_COLUMNS = ('id', 'user_id', 'item_type', 'item_id', 'quantity')
+STATE_SECTIONS = ('user', 'plots', 'inventory', 'inventory_fruits', 'global_weather')
+CATALOG_VERSION, CATALOG_RESPONSE_BODY = None, None
+SPAWN_TABLES = {}
+SPAWN_BOOST_SHAPES = {'tri': (0.90, 0.20, 0.80), 'dual': (0.80, 0.80, 0.20)}
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+ASSET_MANIFEST_PATH = os.path.join(app.static_folder, 'dist', 'manifest.json')
+ASSET_MANIFEST, CLIENT_ASSET_MANIFEST = {}, {}
 
-def get_db_connection():
+class PoolExhaustedError(Exception):
+    pass
+
+class MySQLBackend:
+    name = 'mysql'
+    auto_id = 'BIGINT AUTO_INCREMENT PRIMARY KEY'
+    timestamp_type = 'DATETIME'
+
+    def connect(self):
+        conn = mysql.connector.connect(**DB_CONFIG)
+        conn.autocommit = True
+        return conn
+
+    def cursor(self, conn, dictionary=False):
+        return conn.cursor(dictionary=dictionary, buffered=True)
+
+    def begin(self, conn):
+        conn.start_transaction()
+
+    def is_alive(self, conn):
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Error:
+            return False
+
+    def try_lock_users(self, conn, user_ids):
+        placeholders = ', '.join(['%s'] * len(user_ids))
+        with self.cursor(conn, dictionary=True) as cursor:
+            cursor.execute(f"SELECT id, GET_LOCK(CONCAT('plant_game_user_', id), 0) AS locked FROM users WHERE id IN ({placeholders})", tuple(user_ids))
+            return [row['id'] for row in cursor.fetchall() if row['locked'] == 1]
+
+    def unlock_users(self, conn, user_ids):
+        placeholders = ', '.join(['%s'] * len(user_ids))
+        with self.cursor(conn) as cursor:
+            cursor.execute(f"SELECT RELEASE_LOCK(CONCAT('plant_game_user_', id)) FROM users WHERE id IN ({placeholders})", tuple(user_ids))
+
+    def upsert_increment(self, table, columns, keys, column):
+        return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) ON DUPLICATE KEY UPDATE {column} = {column} + VALUES({column})"
+
+    def try_lock_name(self, conn, name):
+        with self.cursor(conn) as cursor:
+            cursor.execute("SELECT GET_LOCK(%s, 0)", (name,))
+            return cursor.fetchone()[0] == 1
+
+    def index_exists(self, conn, table, name):
+        with self.cursor(conn) as cursor:
+            cursor.execute("SELECT 1 FROM information_schema.statistics WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s LIMIT 1", (table, name))
+            return cursor.fetchone() is not None
+
+class _SQLiteCursor:
+    def __init__(self, cursor, dictionary):
+        self._cursor = cursor
+        if dictionary:
+            cursor.row_factory = lambda c, row: {col[0]: value for col, value in zip(c.description, row)}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def execute(self, query, params=()):
+        return self._cursor.execute(self._translate(query), params)
+
+    def executemany(self, query, seq_of_params):
+        return self._cursor.executemany(self._translate(query), seq_of_params)
+
+    def _translate(self, query):
+        return sqlite_query(query)
+
+def sqlite_query(query):
+    return re.sub(r'\s+FOR UPDATE\b', '', query).replace('%s', '?')
+
+class SQLiteBackend:
+    name = 'sqlite'
+    auto_id = 'INTEGER PRIMARY KEY AUTOINCREMENT'
+    timestamp_type = 'TIMESTAMP'
+
+    def __init__(self, path):
+        self.path = path
+        self._user_locks = set()
+        self._user_locks_guard = threading.Lock()
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False, detect_types=sqlite3.PARSE_DECLTYPES)
+
+    def cursor(self, conn, dictionary=False):
+        return _SQLiteCursor(conn.cursor(), dictionary)
+
+    def begin(self, conn):
+        conn.execute("BEGIN IMMEDIATE")
+
+    def is_alive(self, conn):
+        try:
+            conn.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def upsert_increment(self, table, columns, keys, column):
+        return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {column} = {column} + excluded.{column}"
+
+    def try_lock_users(self, conn, user_ids):
+        with self._user_locks_guard:
+            locked = [u for u in user_ids if u not in self._user_locks]
+            self._user_locks.update(locked)
+        return locked
+
+    def unlock_users(self, conn, user_ids):
+        with self._user_locks_guard:
+            self._user_locks.difference_update(user_ids)
+
+    def index_exists(self, conn, table, name):
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND name = ?", (table, name)).fetchone() is not None
+
+class ConnectionPool:
+    def __init__(self, name, backend, size, timeout=5.0, health_check_after=30.0):
+        self.name = name
+        self.backend = backend
+        self.size = size
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        self._idle = deque()
+        self._created = 0
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._stats = {'acquired': 0, 'exhausted': 0, 'connections_created': 0, 'health_check_failures': 0, 'wait_seconds_total': 0.0, 'wait_seconds_max': 0.0}
+
+    def acquire(self):
+        started = time.monotonic()
+        with self._cond:
+            while not self._idle and self._created >= self.size:
+                remaining = started + self.timeout - time.monotonic()
+                if remaining <= 0:
+                    self._stats['exhausted'] += 1
+                    raise PoolExhaustedError(f"{self.name} pool exhausted: all {self.size} connections in use")
+                self._cond.wait(remaining)
+            entry = self._idle.pop() if self._idle else None
+            if entry is None:
+                self._created += 1
+            self._in_use += 1
+            waited = time.monotonic() - started
+            self._stats['acquired'] += 1
+            self._stats['wait_seconds_total'] += waited
+            self._stats['wait_seconds_max'] = max(self._stats['wait_seconds_max'], waited)
+        try:
+            return self._checked_out(entry)
+        except Exception:
+            with self._cond:
+                self._created -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+    def _checked_out(self, entry):
+        if entry is not None:
+            conn, released_at = entry
+            if time.monotonic() - released_at < self.health_check_after or self.backend.is_alive(conn):
+                return conn
+            with self._cond:
+                self._stats['health_check_failures'] += 1
+            self._close(conn)
+        conn = self.backend.connect()
+        with self._cond:
+            self._stats['connections_created'] += 1
+        return conn
+
+    def release(self, conn, discard=False):
+        if discard:
+            self._close(conn)
+        with self._cond:
+            self._in_use -= 1
+            if discard:
+                self._created -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            self.release(conn, discard=not self.backend.is_alive(conn))
+            raise
+        self.release(conn)
+
+    def close_idle(self):
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._created -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._close(conn)
+
+    def metrics(self):
+        with self._cond:
+            return dict(self._stats, name=self.name, size=self.size, in_use=self._in_use, idle=len(self._idle))
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+_SQL_WHITESPACE = re.compile(r'\s+')
+_SQL_CASE_ARMS = re.compile(r'(?:WHEN %s THEN %s ?)+')
+_SQL_PLACEHOLDER_LISTS = re.compile(r'%s(?:, ?%s)+')
+_SQL_LITERALS = re.compile(r"'[^']*'|\b\d+(?:\.\d+)?\b")
+
+@lru_cache(maxsize=1024)
+def normalize_sql(query):
+    query = _SQL_WHITESPACE.sub(' ', query).strip()
+    query = _SQL_CASE_ARMS.sub('WHEN ... ', query)
+    query = _SQL_PLACEHOLDER_LISTS.sub('...', query)
+    return _SQL_LITERALS.sub('?', query)[:300]
+
+def _prometheus_sample(name, labels, value):
+    if not labels:
+        return f"{name} {value}"
+    label_text = ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in labels.items())
+    return f"{name}{{{label_text}}} {value}"
+
+def _prometheus_family(lines, name, kind, help_text, samples, suffix=''):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    lines += [_prometheus_sample(name + suffix, labels, value) for labels, value in samples]
+
+class Instrumentation:
+    LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+    def __init__(self, enabled, exported_statements=20):
+        self.enabled = enabled
+        self.exported_statements = exported_statements
+        self._lock = threading.Lock()
+        self._statements = {}
+        self._requests = {}
+        self._phases = {}
+        self._db_errors = 0
+
+    def record_query(self, query, seconds, failed=False):
+        statement = normalize_sql(query)
+        with self._lock:
+            stat = self._statements.setdefault(statement, [0, 0.0, 0.0])
+            stat[0] += 1
+            stat[1] += seconds
+            stat[2] = max(stat[2], seconds)
+            self._db_errors += failed
+        trace = g.get('trace') if has_app_context() else None
+        if trace is not None:
+            trace['queries'] += 1
+            trace['db_seconds'] += seconds
+            if seconds > trace['slowest'][0]:
+                trace['slowest'] = (seconds, statement)
+
+    def record_phases(self, scope, phases):
+        with self._lock:
+            for phase, seconds in phases.items():
+                stat = self._phases.setdefault((scope, phase), [0, 0.0])
+                stat[0] += 1
+                stat[1] += seconds
+        trace = g.get('trace') if has_request_context() else None
+        if trace is not None:
+            for phase, seconds in phases.items():
+                trace['phases'][phase] = trace['phases'].get(phase, 0.0) + seconds
+
+    def record_request(self, endpoint, seconds, trace):
+        with self._lock:
+            stat = self._requests.setdefault(endpoint, {'count': 0, 'seconds': 0.0, 'queries': 0, 'db_seconds': 0.0, 'buckets': [0] * len(self.LATENCY_BUCKETS)})
+            stat['count'] += 1
+            stat['seconds'] += seconds
+            stat['queries'] += trace['queries']
+            stat['db_seconds'] += trace['db_seconds']
+            for i, bound in enumerate(self.LATENCY_BUCKETS):
+                if seconds <= bound:
+                    stat['buckets'][i] += 1
+
+    def slowest_statements(self, limit=None):
+        with self._lock:
+            ranked = sorted(self._statements.items(), key=lambda item: item[1][1], reverse=True)
+        return [{'statement': sql, 'calls': calls, 'seconds_total': total, 'seconds_max': worst} for sql, (calls, total, worst) in ranked[:limit]]
+
+    def prometheus(self, lines):
+        with self._lock:
+            requests = {endpoint: dict(stat, buckets=list(stat['buckets'])) for endpoint, stat in self._requests.items()}
+            phases = dict(self._phases)
+            db_errors = self._db_errors
+            calls = sum(stat[0] for stat in self._statements.values())
+            db_seconds = sum(stat[1] for stat in self._statements.values())
+        _prometheus_family(lines, 'plant_game_db_queries_total', 'counter', 'Statements executed.', [({}, calls)])
+        _prometheus_family(lines, 'plant_game_db_query_seconds_total', 'counter', 'Time spent executing statements.', [({}, db_seconds)])
+        _prometheus_family(lines, 'plant_game_db_errors_total', 'counter', 'Statements that raised.', [({}, db_errors)])
+        slowest = self.slowest_statements(self.exported_statements)
+        _prometheus_family(lines, 'plant_game_db_statement_seconds_total', 'counter', 'Time per normalized statement (top by total time).', [({'statement': s['statement']}, s['seconds_total']) for s in slowest])
+        _prometheus_family(lines, 'plant_game_db_statement_calls_total', 'counter', 'Calls per normalized statement (top by total time).', [({'statement': s['statement']}, s['calls']) for s in slowest])
+        _prometheus_family(lines, 'plant_game_db_statement_seconds_max', 'gauge', 'Slowest single call per normalized statement.', [({'statement': s['statement']}, s['seconds_max']) for s in slowest])
+        buckets = []
+        for endpoint, stat in sorted(requests.items()):
+            buckets += [({'endpoint': endpoint, 'le': bound}, count) for bound, count in zip(self.LATENCY_BUCKETS, stat['buckets'])]
+            buckets += [({'endpoint': endpoint, 'le': '+Inf'}, stat['count'])]
+        _prometheus_family(lines, 'plant_game_request_duration_seconds', 'histogram', 'Request latency.', buckets, suffix='_bucket')
+        lines += [_prometheus_sample('plant_game_request_duration_seconds_sum', {'endpoint': e}, stat['seconds']) for e, stat in sorted(requests.items())]
+        lines += [_prometheus_sample('plant_game_request_duration_seconds_count', {'endpoint': e}, stat['count']) for e, stat in sorted(requests.items())]
+        _prometheus_family(lines, 'plant_game_request_queries_total', 'counter', 'Statements executed while serving requests.', [({'endpoint': e}, stat['queries']) for e, stat in sorted(requests.items())])
+        _prometheus_family(lines, 'plant_game_request_db_seconds_total', 'counter', 'Database time while serving requests.', [({'endpoint': e}, stat['db_seconds']) for e, stat in sorted(requests.items())])
+        _prometheus_family(lines, 'plant_game_update_phase_seconds_total', 'counter', 'Time in game update phases; scope is world for the scheduler tick and user for request-path updates.', [({'scope': scope, 'phase': phase}, stat[1]) for (scope, phase), stat in sorted(phases.items())])
+        _prometheus_family(lines, 'plant_game_update_phase_runs_total', 'counter', 'Game update phase runs.', [({'scope': scope, 'phase': phase}, stat[0]) for (scope, phase), stat in sorted(phases.items())])
+
+class _TracedCursor:
+    def __init__(self, cursor, tracer):
+        self._cursor = cursor
+        self._tracer = tracer
+
+    def __enter__(self):
+        self._cursor.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._cursor.__exit__(*exc)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def execute(self, query, params=()):
+        return self._timed(self._cursor.execute, query, params)
+
+    def executemany(self, query, seq_of_params):
+        return self._timed(self._cursor.executemany, query, seq_of_params)
+
+    def _timed(self, func, query, params):
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = func(query, params)
+            failed = False
+            return result
+        finally:
+            self._tracer.record_query(query, time.perf_counter() - started, failed)
+
+class TracedBackend:
+    def __init__(self, backend, tracer):
+        self._backend = backend
+        self._tracer = tracer
+
+    def __getattr__(self, name):
+        return getattr(self._backend, name)
+
+    def cursor(self, conn, dictionary=False):
+        return _TracedCursor(self._backend.cursor(conn, dictionary), self._tracer)
+
+INSTRUMENTATION = Instrumentation(app.config['INSTRUMENTATION_ENABLED'])
+
+DB_BACKENDS = {
+    'mysql': lambda config: MySQLBackend(),
+    'sqlite': lambda config: SQLiteBackend(config['DB_SQLITE_PATH']),
+}
+
+DB_BACKEND = DB_BACKENDS[app.config['DB_BACKEND']](app.config)
+if INSTRUMENTATION.enabled:
+    DB_BACKEND = TracedBackend(DB_BACKEND, INSTRUMENTATION)
+REQUEST_DB_POOL = ConnectionPool('request', DB_BACKEND, app.config['DB_POOL_SIZE'], app.config['DB_POOL_TIMEOUT_SECONDS'], app.config['DB_POOL_HEALTH_CHECK_SECONDS'])
+SCHEDULER_DB_POOL = ConnectionPool('scheduler', DB_BACKEND, app.config['DB_SCHEDULER_POOL_SIZE'], app.config['DB_POOL_TIMEOUT_SECONDS'], app.config['DB_POOL_HEALTH_CHECK_SECONDS'])
+
+def db_pool_metrics():
+    return [REQUEST_DB_POOL.metrics(), SCHEDULER_DB_POOL.metrics()]
+
+def get_context_connection():
+    if 'db_conn' not in g:
+        pool = REQUEST_DB_POOL if has_request_context() else SCHEDULER_DB_POOL
+        g.db_conn = pool.acquire()
+        g.db_pool = pool
+    return g.db_conn
+
+@app.teardown_appcontext
+def release_context_connection(exc):
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        pool = g.pop('db_pool')
+        pool.release(conn, discard=exc is not None and not DB_BACKEND.is_alive(conn))
+
+@contextmanager
+def _db_connection():
+    if has_app_context():
+        yield get_context_connection()
+        return
+    with SCHEDULER_DB_POOL.connection() as conn:
+        yield conn
+
+@contextmanager
+def db_cursor(dictionary=False):
+    with _db_connection() as conn:
+        with DB_BACKEND.cursor(conn, dictionary) as cursor:
+            yield cursor
+
+@contextmanager
+def user_locks(user_ids):
+    with _db_connection() as conn:
+        locked = DB_BACKEND.try_lock_users(conn, user_ids)
+        try:
+            yield locked
+        finally:
+            if locked:
+                DB_BACKEND.unlock_users(conn, locked)
+
+@contextmanager
+def db_transaction():
+    with _db_connection() as conn:
+        DB_BACKEND.begin(conn)
+        try:
+            with DB_BACKEND.cursor(conn, dictionary=True) as cursor:
+                yield cursor
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+
+class ActionRejected(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+def run_game_action(user_id, apply, event='state_changed', failure_message='Action failed, please try again.'):
     try:
-        return mysql.connector.connect(**DB_CONFIG)
-    except Error as e:
-        print(f"DB Connection Error: {e}")
-        return None
+        with db_transaction() as cursor:
+            apply(cursor)
+    except ActionRejected as e:
+        return jsonify(success=False, message=e.message), e.status
+    except Exception as e:
+        print(f"Action Error for user {user_id}: {e}")
+        return jsonify(success=False, message=failure_message), 500
+    invalidate_game_state(user_id, event=event)
+    return get_game_state()
 
 def load_game_data():
-    global PLANT_TYPES, FERTILIZER_TYPES, FRUIT_TYPES, WEATHER_TYPES, WEATHER_COMBINATIONS
-    with get_db_connection() as conn:
-        with conn.cursor(dictionary=True) as cursor:
+    global PLANT_TYPES, FERTILIZER_TYPES, FRUIT_TYPES, WEATHER_TYPES, WEATHER_COMBINATIONS, WEATHER_COMBINATION_INDEX
+    with SCHEDULER_DB_POOL.connection() as conn:
+        with DB_BACKEND.cursor(conn, dictionary=True) as cursor:
             cursor.execute("SELECT * FROM plant_types")
             PLANT_TYPES = {p['id']: p for p in cursor.fetchall()}
             cursor.execute("SELECT * FROM fertilizer_types")
@@ -44,82 +550,558 @@ def load_game_data():
             combo_data = cursor.fetchall()
             for combo in combo_data:
                 combo['weather_type_ids'] = json.loads(combo['weather_type_ids'])
-                WEATHER_COMBINATIONS[combo['id']] = combo
-    print("All game data loaded.")
+            WEATHER_COMBINATIONS = {combo['id']: combo for combo in combo_data}
+    WEATHER_COMBINATION_INDEX = {frozenset(c['weather_type_ids']): c for c in WEATHER_COMBINATIONS.values()}
+    _build_catalog()
+    _build_spawn_tables()
+    weather_ids_for_epoch.cache_clear()
+    print(f"All game data loaded (catalog {CATALOG_VERSION}).")
+
+def catalog_data():
+    return {
+        'plant_types': PLANT_TYPES,
+        'fertilizer_types': FERTILIZER_TYPES,
+        'fruit_types': FRUIT_TYPES,
+        'weather_types': WEATHER_TYPES,
+        'weather_combinations': WEATHER_COMBINATIONS,
+        'plot_costs': PLOT_COSTS
+    }
+
+def _build_catalog():
+    global CATALOG_VERSION, CATALOG_RESPONSE_BODY
+    encoded = app.json.dumps(catalog_data())
+    CATALOG_VERSION = hashlib.sha1(encoded.encode()).hexdigest()[:16]
+    CATALOG_RESPONSE_BODY = f'{{"success": true, "catalog_version": "{CATALOG_VERSION}", "game_data": {encoded}}}'
+
+def _section_hash(value):
+    return hashlib.sha1(value if isinstance(value, bytes) else app.json.dumps(value).encode()).hexdigest()[:10]
 
-load_game_data()
 
 def db_execute(query, params=(), commit=False):
-    with app.app_context():
-        with get_db_connection() as conn:
-            with conn.cursor() as cursor:
-                try:
-                    cursor.execute(query, params)
-                except Exception as e:
-                    print(f"DB Execute Error: {e}")
-                    conn.rollback()
-                    return False
-                if commit:
-                    conn.commit()
-                    return True
+    try:
+        with db_cursor() as cursor:
+            cursor.execute(query, params)
+    except Exception as e:
+        print(f"DB Execute Error: {e}")
+        return False
+    if commit:
+        return True
+
+def db_execute_many(query, seq_of_params):
+    try:
+        with db_cursor() as cursor:
+            cursor.executemany(query, seq_of_params)
+    except Exception as e:
+        print(f"DB Execute Error: {e}")
+        return False
+    return True
+
+def db_bulk_update(table, column, values_by_id, also=None, chunk_size=500):
+    items = list(values_by_id.items())
+    also_sql = ''.join(f", {name} = %s" for name in (also or {}))
+    for start in range(0, len(items), chunk_size):
+        chunk = items[start:start + chunk_size]
+        cases = ' '.join(['WHEN %s THEN %s'] * len(chunk))
+        placeholders = ', '.join(['%s'] * len(chunk))
+        params = [value for pair in chunk for value in pair] + list((also or {}).values()) + [row_id for row_id, _ in chunk]
+        if not db_execute(f"UPDATE {table} SET {column} = CASE id {cases} END{also_sql} WHERE id IN ({placeholders})", tuple(params), commit=True):
+            return False
+    return True
 
 def db_fetch_one(query, params=()):
-    with app.app_context():
-        with get_db_connection() as conn:
-            with conn.cursor(dictionary=True) as cursor:
-                try:
-                    cursor.execute(query, params)
-                    return cursor.fetchone()
-                except Exception as e:
-                    return None
+    try:
+        with db_cursor(dictionary=True) as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchone()
+    except Exception as e:
+        return None
 
 def db_fetch_all(query, params=()):
-    with app.app_context():
-        with get_db_connection() as conn:
-            with conn.cursor(dictionary=True) as cursor:
-                try:
-                    cursor.execute(query, params)
-                    return cursor.fetchall()
-                except Exception as e:
-                    return []
+    try:
+        with db_cursor(dictionary=True) as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+    except Exception as e:
+        return []
+
+class GameEventBroker:
+    def __init__(self, history=20, sync_slots=0):
+        self.history = history
+        self.sync_slots = sync_slots
+        self.sync_streams = 0
+        self.sync_rejected = 0
+        self._lock = threading.Lock()
+        self._channels = {}
+
+    def claim_sync_slot(self):
+        with self._lock:
+            if self.sync_streams >= self.sync_slots:
+                self.sync_rejected += 1
+                return False
+            self.sync_streams += 1
+            return True
+
+    def release_sync_slot(self):
+        with self._lock:
+            self.sync_streams -= 1
+
+    def publish(self, user_id, event, data=None):
+        with self._lock:
+            channel = self._channels.get(user_id)
+            if channel:
+                self._append(channel, event, data)
+
+    def broadcast(self, event, data=None):
+        with self._lock:
+            for channel in self._channels.values():
+                self._append(channel, event, data)
+
+    def _append(self, channel, event, data):
+        channel['seq'] += 1
+        channel['events'].append((channel['seq'], event, data))
+        channel['cond'].notify_all()
+        for wake in channel['waiters']:
+            wake()
+
+    def subscribe(self, user_id, wake=None):
+        with self._lock:
+            channel = self._channels.get(user_id)
+            if channel is None:
+                channel = self._channels[user_id] = {'cond': threading.Condition(self._lock), 'events': deque(maxlen=self.history), 'seq': 0, 'subscribers': 0, 'waiters': []}
+            channel['subscribers'] += 1
+            if wake:
+                channel['waiters'].append(wake)
+            return channel, channel['seq']
+
+    def unsubscribe(self, user_id, channel, wake=None):
+        with self._lock:
+            channel['subscribers'] -= 1
+            if wake:
+                channel['waiters'].remove(wake)
+            if not channel['subscribers']:
+                self._channels.pop(user_id, None)
+
+    def pending(self, channel, seen):
+        with self._lock:
+            return [e for e in channel['events'] if e[0] > seen], channel['seq']
+
+    def listen(self, user_id, heartbeat_seconds):
+        channel, seen = self.subscribe(user_id)
+        try:
+            while True:
+                with self._lock:
+                    if channel['seq'] == seen:
+                        channel['cond'].wait(heartbeat_seconds)
+                    pending = [e for e in channel['events'] if e[0] > seen]
+                    seen = channel['seq']
+                yield pending
+        finally:
+            self.unsubscribe(user_id, channel)
+
+    def metrics(self):
+        with self._lock:
+            return {'channels': len(self._channels), 'subscribers': sum(c['subscribers'] for c in self._channels.values()), 'sync_streams': self.sync_streams, 'sync_rejected': self.sync_rejected}
+
+GAME_EVENTS = GameEventBroker(sync_slots=app.config['EVENT_STREAM_SYNC_SLOTS'])
+
+def weather_epoch(now):
+    return int(now.timestamp()) // app.config['WEATHER_EPOCH_SECONDS']
+
+def weather_epoch_start(epoch):
+    return datetime.fromtimestamp(epoch * app.config['WEATHER_EPOCH_SECONDS'])
+
+@lru_cache(maxsize=4096)
+def weather_ids_for_epoch(epoch):
+    rng = random.Random(f"{app.config['WEATHER_SEED']}:{epoch}")
+    return tuple(w_id for w_id in sorted(WEATHER_TYPES) if rng.random() < WEATHER_TYPES[w_id]['spawn_rate'])
+
+def current_weather(now):
+    return [WEATHER_TYPES[w_id] for w_id in weather_ids_for_epoch(weather_epoch(now))]
+
+def online_weather_rolls(since, now):
+    rolls, start, end = {}, since.timestamp(), now.timestamp()
+    while start < end:
+        epoch = int(start) // app.config['WEATHER_EPOCH_SECONDS']
+        boundary = min(end, (epoch + 1) * app.config['WEATHER_EPOCH_SECONDS'])
+        for w_id in weather_ids_for_epoch(epoch):
+            rolls[w_id] = rolls.get(w_id, 0.0) + (boundary - start) / app.config['WEATHER_STICK_ROLL_SECONDS']
+        start = boundary
+    return rolls
+
+def weather_stick_chance(stick_rate, rolls):
+    return 1 - (1 - stick_rate) ** rolls
+
+def weather_schedule(start, epochs):
+    first = weather_epoch(start)
+    return [(weather_epoch_start(epoch), [WEATHER_TYPES[w_id]['name'] for w_id in weather_ids_for_epoch(epoch)]) for epoch in range(first, first + epochs)]
+
+def announce_weather(now=None):
+    global LAST_ANNOUNCED_WEATHER_EPOCH
+    now = now or datetime.now()
+    epoch = weather_epoch(now)
+    if epoch == LAST_ANNOUNCED_WEATHER_EPOCH:
+        return
+    LAST_ANNOUNCED_WEATHER_EPOCH = epoch
+    names = [w['name'] for w in current_weather(now)]
+    print(f"--- Global weather for {weather_epoch_start(epoch).strftime('%H:%M')}: {names} ---")
+    GAME_EVENTS.broadcast('weather_changed', {'weather': names})
+
+class FileLeaderLock:
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    @property
+    def is_leader(self):
+        return self._file is not None
+
+    def try_acquire(self):
+        if self._file:
+            return True
+        f = open(self.path, 'a+')
+        try:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            f.close()
+            return False
+        self._file = f
+        print(f"👑 Worker {worker_id()} is now the tick leader (file lock {self.path}).")
+        return True
+
+class DatabaseLeaderLock:
+    def __init__(self, backend, name):
+        self.backend = backend
+        self.name = name
+        self._conn = None
+
+    @property
+    def is_leader(self):
+        return self._conn is not None
+
+    def try_acquire(self):
+        if self._conn is not None:
+            if self.backend.is_alive(self._conn):
+                return True
+            print(f"Worker {worker_id()} lost its tick leader connection.")
+            self._conn = None
+        try:
+            conn = self.backend.connect()
+            if not self.backend.try_lock_name(conn, self.name):
+                conn.close()
+                return False
+        except Exception as e:
+            print(f"Tick leader election error: {e}")
+            return False
+        self._conn = conn
+        print(f"👑 Worker {worker_id()} is now the tick leader (database lock {self.name}).")
+        return True
+
+class StandaloneLeaderLock:
+    is_leader = True
+
+    def try_acquire(self):
+        return True
+
+TICK_LEADER_LOCKS = {
+    'file': lambda config: FileLeaderLock(config['TICK_LEADER_LOCK_FILE']),
+    'db': lambda config: DatabaseLeaderLock(DB_BACKEND, 'plant_game_tick_leader'),
+    'none': lambda config: StandaloneLeaderLock(),
+}
+
+TICK_LEADER = TICK_LEADER_LOCKS[app.config['TICK_LEADER_LOCK']](app.config)
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+class WorldTickScheduler:
+    def __init__(self, shards, workers, batch_size):
+        self.shards = shards
+        self.workers = workers
+        self.batch_size = batch_size
+        self._executor = None
+        self._run_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {'runs': 0, 'skipped_overlaps': 0, 'failed_shards': 0, 'backlog_shards': 0, 'last_duration_seconds': 0.0, 'max_duration_seconds': 0.0, 'last_users': 0, 'last_users_locked_out': 0}
+
+    def run(self, now=None):
+        if not self._run_lock.acquire(blocking=False):
+            with self._stats_lock:
+                self._stats['skipped_overlaps'] += 1
+            return None
+        try:
+            return self._run(now or datetime.now())
+        finally:
+            self._run_lock.release()
+
+    def _run(self, now):
+        started = time.perf_counter()
+        stats = {'started_at': now, 'phases': {}, 'stages_materialized': 0, 'fruits_spawned': 0, 'weather_updates': 0, 'users': 0, 'users_locked_out': 0, 'failed_shards': 0}
+        with app.app_context():
+            announce_weather(now)
+            user_ids = [row['user_id'] for row in db_fetch_all("SELECT DISTINCT user_id FROM user_plots WHERE plant_type_id IS NOT NULL")]
+        shards = [shard for shard in ([u for u in user_ids if u % self.shards == i] for i in range(self.shards)) if shard]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='world-tick')
+        with self._stats_lock:
+            self._stats['backlog_shards'] = len(shards)
+        shard_results = list(self._executor.map(self._run_shard, shards, [now] * len(shards)))
+        for shard_stats in shard_results:
+            for phase, seconds in shard_stats.pop('phases').items():
+                stats['phases'][phase] = stats['phases'].get(phase, 0.0) + seconds
+            for key in ('stages_materialized', 'fruits_spawned', 'weather_updates', 'users', 'users_locked_out', 'failed_shards'):
+                stats[key] += shard_stats[key]
+        stats['shard_seconds'] = [round(r['seconds'], 4) for r in shard_results]
+        stats['total_seconds'] = time.perf_counter() - started
+        with self._stats_lock:
+            self._stats['runs'] += 1
+            self._stats['failed_shards'] += stats['failed_shards']
+            self._stats['last_duration_seconds'] = stats['total_seconds']
+            self._stats['max_duration_seconds'] = max(self._stats['max_duration_seconds'], stats['total_seconds'])
+            self._stats['last_users'] = stats['users']
+            self._stats['last_users_locked_out'] = stats['users_locked_out']
+        return stats
+
+    def _run_shard(self, user_ids, now):
+        started = time.perf_counter()
+        totals = {'phases': {}, 'stages_materialized': 0, 'fruits_spawned': 0, 'weather_updates': 0, 'users': 0, 'users_locked_out': 0, 'failed_shards': 0}
+        try:
+            with app.app_context():
+                for start in range(0, len(user_ids), self.batch_size):
+                    batch = user_ids[start:start + self.batch_size]
+                    with user_locks(batch) as locked:
+                        totals['users_locked_out'] += len(batch) - len(locked)
+                        if not locked:
+                            continue
+                        batch_stats = run_world_tick(user_ids=locked, now=now, scope='world')
+                    totals['users'] += len(locked)
+                    for phase, seconds in batch_stats['phases'].items():
+                        totals['phases'][phase] = totals['phases'].get(phase, 0.0) + seconds
+                    for key in ('stages_materialized', 'fruits_spawned', 'weather_updates'):
+                        totals[key] += batch_stats[key]
+        except Exception as e:
+            print(f"❌ Error running world tick shard: {e}")
+            totals['failed_shards'] += 1
+        finally:
+            with self._stats_lock:
+                self._stats['backlog_shards'] -= 1
+        totals['seconds'] = time.perf_counter() - started
+        return totals
+
+    def metrics(self):
+        with self._stats_lock:
+            return dict(self._stats, shards=self.shards, workers=self.workers)
+
+WORLD_TICK = WorldTickScheduler(app.config['WORLD_TICK_SHARDS'], app.config['WORLD_TICK_WORKERS'], app.config['WORLD_TICK_BATCH_SIZE'])
 
 def run_global_game_updates():
-    with app.app_context():
-        print(f"⏱  Running background game update at {datetime.now().strftime('%H:%M:%S')}")
-        user_ids = [u['id'] for u in db_fetch_all("SELECT id FROM users")]
-        print(f"Found {len(user_ids)} users to update.")
-        for uid in user_ids:
-            try:
-                perform_game_updates(uid)
-            except Exception as e:
-                print(f"❌ Error updating user {uid}: {e}")
-        print("✅ Background update complete.")
+    if not TICK_LEADER.try_acquire():
+        return
+    print(f"⏱  Running background game update at {datetime.now().strftime('%H:%M:%S')}")
+    if app.config['MULTI_WORKER']:
+        db_execute("DELETE FROM cache_invalidations WHERE created_at < %s", (int(time.time()) - app.config['CACHE_INVALIDATION_RETENTION_SECONDS'],), commit=True)
+    try:
+        stats = WORLD_TICK.run()
+    except Exception as e:
+        print(f"❌ Error running world tick: {e}")
+        return
+    if stats is None:
+        print("⏭  Previous world tick still running, skipping this one.")
+        return
+    LAST_WORLD_TICK_STATS.update(stats)
+    phases = ', '.join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in stats['phases'].items())
+    print(f"✅ Background update complete in {stats['total_seconds'] * 1000:.1f}ms across {len(stats['shard_seconds'])} shards: {stats['users']} users, {stats['users_locked_out']} skipped (locked), {stats['stages_materialized']} growth stages materialized, {stats['fruits_spawned']} fruits spawned, {stats['weather_updates']} weather updates (phase time summed across shards: {phases}).")
+
+def archive_sold_fruits(batch_size=None, now=None):
+    batch_size = batch_size or app.config['SOLD_FRUIT_ARCHIVE_BATCH_SIZE']
+    now = now or datetime.now()
+    archived = 0
+    while True:
+        with db_transaction() as cursor:
+            cursor.execute("SELECT id FROM user_fruits WHERE harvested=TRUE ORDER BY id LIMIT %s FOR UPDATE", (batch_size,))
+            fruit_ids = tuple(row['id'] for row in cursor.fetchall())
+            if fruit_ids:
+                placeholders = ', '.join(['%s'] * len(fruit_ids))
+                cursor.execute(f"INSERT INTO user_fruits_archive (id, user_id, fruit_type_id, weight, created_at, archived_at) SELECT id, user_id, fruit_type_id, weight, created_at, %s FROM user_fruits WHERE id IN ({placeholders})", (now, *fruit_ids))
+                cursor.execute(f"DELETE FROM fruit_weather_effects WHERE fruit_id IN ({placeholders})", fruit_ids)
+                cursor.execute(f"DELETE FROM user_fruits WHERE id IN ({placeholders})", fruit_ids)
+        archived += len(fruit_ids)
+        if len(fruit_ids) < batch_size:
+            return archived
+
+def run_sold_fruit_archive():
+    if not TICK_LEADER.try_acquire():
+        return
+    try:
+        archived = archive_sold_fruits()
+    except Exception as e:
+        print(f"❌ Error archiving sold fruits: {e}")
+        return
+    if archived:
+        print(f"🗄  Archived {archived} sold fruits into user_fruits_archive.")
+
+def sync_cache_invalidations():
+    global LAST_CACHE_INVALIDATION_AT
+    rows = db_fetch_all("SELECT id, origin, user_id, event, created_at FROM cache_invalidations WHERE created_at >= %s ORDER BY created_at, id", (LAST_CACHE_INVALIDATION_AT - app.config['CACHE_SYNC_OVERLAP_SECONDS'],))
+    fresh = [row for row in rows if row['id'] not in APPLIED_CACHE_INVALIDATIONS]
+    for row in fresh:
+        APPLIED_CACHE_INVALIDATIONS[row['id']] = row['created_at']
+    LAST_CACHE_INVALIDATION_AT = max([LAST_CACHE_INVALIDATION_AT, *(row['created_at'] for row in rows)])
+    horizon = LAST_CACHE_INVALIDATION_AT - app.config['CACHE_SYNC_OVERLAP_SECONDS']
+    for row_id in [row_id for row_id, created_at in APPLIED_CACHE_INVALIDATIONS.items() if created_at < horizon]:
+        del APPLIED_CACHE_INVALIDATIONS[row_id]
+    me, catalog_changed, by_event = worker_id(), False, {}
+    for row in fresh:
+        if row['origin'] == me:
+            continue
+        if row['event'] == 'catalog_changed':
+            catalog_changed = True
+        else:
+            by_event.setdefault(row['event'], set()).add(row['user_id'])
+    if catalog_changed:
+        reload_catalog_locally()
+    for event, user_ids in by_event.items():
+        _invalidate_local_game_state(user_ids, event)
+
+def reload_catalog_locally():
+    load_game_data()
+    with GAME_STATE_LOCK:
+        for user_id in GAME_STATE_CACHE:
+            GAME_STATE_GENERATIONS[user_id] = GAME_STATE_GENERATIONS.get(user_id, 0) + 1
+        GAME_STATE_CACHE.clear()
+    GAME_EVENTS.broadcast('catalog_changed', {'catalog_version': CATALOG_VERSION})
 
 scheduler = APScheduler()
 scheduler.init_app(app)
-scheduler.start()
 
-if scheduler.get_job('update_game_every_2min'):
-    scheduler.remove_job('update_game_every_2min')
+def start_background_jobs():
+    global LAST_CACHE_INVALIDATION_AT, APPLIED_CACHE_INVALIDATIONS
+    if scheduler.running:
+        return
+    scheduler.add_job(id='update_game_every_2min', func=run_global_game_updates, trigger='interval', minutes=1, max_instances=1, coalesce=True, replace_existing=True)
+    scheduler.add_job(id='announce_weather', func=announce_weather, trigger='cron', minute='*/5', second=1, coalesce=True, replace_existing=True)
+    scheduler.add_job(id='archive_sold_fruits', func=run_sold_fruit_archive, trigger='interval', minutes=app.config['SOLD_FRUIT_ARCHIVE_INTERVAL_MINUTES'], max_instances=1, coalesce=True, replace_existing=True)
+    if app.config['MULTI_WORKER']:
+        require_migration('0004_cache_invalidations')
+        LAST_CACHE_INVALIDATION_AT = int(time.time())
+        APPLIED_CACHE_INVALIDATIONS = {row['id']: row['created_at'] for row in db_fetch_all("SELECT id, created_at FROM cache_invalidations WHERE created_at >= %s", (LAST_CACHE_INVALIDATION_AT - app.config['CACHE_SYNC_OVERLAP_SECONDS'],))}
+        scheduler.add_job(id='sync_cache_invalidations', func=sync_cache_invalidations, trigger='interval', seconds=app.config['CACHE_SYNC_INTERVAL_SECONDS'], max_instances=1, coalesce=True, replace_existing=True)
+    elif hasattr(signal, 'SIGHUP') and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGHUP, lambda signum, frame: reload_catalog_locally())
+    scheduler.start()
+    TICK_LEADER.try_acquire()
+
+def load_asset_manifest():
+    global ASSET_MANIFEST, CLIENT_ASSET_MANIFEST
+    try:
+        with open(ASSET_MANIFEST_PATH) as f:
+            ASSET_MANIFEST = json.load(f)
+    except FileNotFoundError:
+        print("Static assets are not built, serving the source images. Run build_assets.py to pack them.")
+        return
+    static_url = lambda path: f"{app.static_url_path}/{path}"
+    CLIENT_ASSET_MANIFEST = {
+        'atlases': {name: {'png': static_url(a['png']), 'webp': static_url(a['webp']), 'columns': a['columns'], 'rows': a['rows']} for name, a in ASSET_MANIFEST['atlases'].items()},
+        'sprites': ASSET_MANIFEST['sprites'],
+        'images': {path: {fmt: static_url(file) for fmt, file in files.items()} for path, files in ASSET_MANIFEST['images'].items()},
+    }
+    print(f"Static asset manifest {ASSET_MANIFEST['version']} loaded.")
 
-scheduler.add_job(
-    id='update_game_every_2min',
-    func=run_global_game_updates,
-    trigger='interval',
-    minutes=1
-)
+@app.template_global()
+def asset_url(path):
+    fingerprinted = ASSET_MANIFEST.get('files', {}).get(path) or ASSET_MANIFEST.get('images', {}).get(path, {}).get('png')
+    return url_for('static', filename=fingerprinted or path)
 
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return render_template('index.html', asset_manifest=CLIENT_ASSET_MANIFEST, preload=ASSET_MANIFEST.get('preload', []))
 
 @app.route('/ui/<fragment_name>')
 def get_ui_fragment(fragment_name):
     return render_template(f'game_ui_fragments/{fragment_name}.html')
 
+@app.before_request
+def start_request_trace():
+    if INSTRUMENTATION.enabled:
+        g.trace = {'started': time.perf_counter(), 'queries': 0, 'db_seconds': 0.0, 'slowest': (0.0, None), 'phases': {}}
+
+@app.after_request
+def finish_request_trace(response):
+    trace = g.pop('trace', None)
+    if trace is None:
+        return response
+    seconds = time.perf_counter() - trace['started']
+    INSTRUMENTATION.record_request(request.endpoint or 'unmatched', seconds, trace)
+    if app.debug:
+        response.headers['X-DB-Queries'] = str(trace['queries'])
+        response.headers['X-DB-Time-Ms'] = f"{trace['db_seconds'] * 1000:.2f}"
+        if trace['slowest'][1]:
+            response.headers['X-DB-Slowest'] = f"{trace['slowest'][0] * 1000:.2f}ms {trace['slowest'][1][:200]}"
+        timings = [f'db;dur={trace["db_seconds"] * 1000:.2f};desc="{trace["queries"]} queries"']
+        timings += [f"{phase};dur={phase_seconds * 1000:.2f}" for phase, phase_seconds in trace['phases'].items()]
+        response.headers['Server-Timing'] = ', '.join(timings + [f"total;dur={seconds * 1000:.2f}"])
+    return response
+
+@app.after_request
+def cache_fingerprinted_assets(response):
+    if request.path.startswith(f"{app.static_url_path}/dist/") and request.path != f"{app.static_url_path}/dist/manifest.json" and response.status_code in (200, 304):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = app.config['FINGERPRINTED_ASSET_MAX_AGE_SECONDS']
+        response.cache_control.immutable = True
+    return response
+
+def metrics_access_denied():
+    if not app.config['METRICS_ENABLED']:
+        return jsonify(success=False, message='Not Found'), 404
+    token = app.config['METRICS_TOKEN']
+    auth = request.headers.get('Authorization', '')
+    if token and auth.startswith('Bearer ') and hmac.compare_digest(auth[7:].encode(), token.encode()):
+        return
+    if not token and request.remote_addr in app.config['METRICS_ALLOW_IPS']:
+        return
+    return jsonify(success=False, message='Metrics Access Denied'), 401, {'WWW-Authenticate': 'Bearer'} if token else {}
+
+@app.route('/metrics')
+def metrics():
+    lines = []
+    pools = db_pool_metrics()
+    for key, kind in (('in_use', 'gauge'), ('idle', 'gauge'), ('acquired', 'counter'), ('exhausted', 'counter'), ('connections_created', 'counter'), ('wait_seconds_total', 'counter')):
+        _prometheus_family(lines, f'plant_game_db_pool_{key}', kind, f'Connection pool {key.replace("_", " ")}.', [({'pool': pool['name']}, pool[key]) for pool in pools])
+    tick = dict(LAST_WORLD_TICK_STATS)
+    if tick:
+        _prometheus_family(lines, 'plant_game_world_tick_last_seconds', 'gauge', 'Duration of the last world tick.', [({}, tick['total_seconds'])])
+        _prometheus_family(lines, 'plant_game_world_tick_last_phase_seconds', 'gauge', 'Phase durations of the last world tick.', [({'phase': phase}, seconds) for phase, seconds in tick['phases'].items()])
+        _prometheus_family(lines, 'plant_game_world_tick_last_fruits_spawned', 'gauge', 'Fruits spawned by the last world tick.', [({}, tick['fruits_spawned'])])
+    _prometheus_family(lines, 'plant_game_tick_leader', 'gauge', 'Whether this worker runs the world tick.', [({'worker': worker_id()}, int(TICK_LEADER.is_leader))])
+    ticks = WORLD_TICK.metrics()
+    _prometheus_family(lines, 'plant_game_world_tick_runs_total', 'counter', 'Completed world ticks.', [({}, ticks['runs'])])
+    _prometheus_family(lines, 'plant_game_world_tick_skipped_total', 'counter', 'World ticks skipped because the previous one was still running.', [({}, ticks['skipped_overlaps'])])
+    _prometheus_family(lines, 'plant_game_world_tick_failed_shards_total', 'counter', 'World tick shards that raised.', [({}, ticks['failed_shards'])])
+    _prometheus_family(lines, 'plant_game_world_tick_backlog_shards', 'gauge', 'Shards of the running world tick not yet finished.', [({}, ticks['backlog_shards'])])
+    _prometheus_family(lines, 'plant_game_world_tick_max_seconds', 'gauge', 'Longest world tick since start.', [({}, ticks['max_duration_seconds'])])
+    _prometheus_family(lines, 'plant_game_world_tick_last_users_locked_out', 'gauge', 'Users skipped by the last world tick because a request held their lock.', [({}, ticks['last_users_locked_out'])])
+    broker = GAME_EVENTS.metrics()
+    _prometheus_family(lines, 'plant_game_event_stream_subscribers', 'gauge', 'Open event streams.', [({}, broker['subscribers'])])
+    _prometheus_family(lines, 'plant_game_event_stream_sync_streams', 'gauge', 'Event streams holding a WSGI worker thread.', [({}, broker['sync_streams'])])
+    _prometheus_family(lines, 'plant_game_event_stream_sync_rejected_total', 'counter', 'Event streams refused because every WSGI slot was taken.', [({}, broker['sync_rejected'])])
+    _prometheus_family(lines, 'plant_game_state_cache_users', 'gauge', 'Users with a cached game state snapshot.', [({}, len(GAME_STATE_CACHE))])
+    if INSTRUMENTATION.enabled:
+        INSTRUMENTATION.prometheus(lines)
+    return app.response_class('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+@app.before_request
+def require_background_jobs():
+    if app.config['BACKGROUND_JOBS'] and not scheduler.running:
+        raise RuntimeError("Background jobs were never started: no world tick, sold fruit archive or cache sync. Serve with `gunicorn -c gunicorn.conf.py app:app`, `gunicorn -c gunicorn_asgi.conf.py` or `python app.py`, or set PLANT_GAME_BACKGROUND_JOBS=0 to serve without them.")
+
 @app.before_request
 def require_login():
-    allowed = ['index', 'get_ui_fragment', 'login', 'register', 'check_session', 'static', 'favicon.ico']
+    if request.endpoint == 'metrics':
+        return metrics_access_denied()
+    allowed = ['index', 'get_ui_fragment', 'login', 'register', 'check_session', 'get_catalog', 'static', 'favicon.ico']
     if request.endpoint in allowed or request.path.startswith('/static/'):
         return
     if 'user_id' not in session:
@@ -164,98 +1146,334 @@ def check_session():
 @app.route('/api/get_game_state')
 def get_game_state():
     user_id = session.get('user_id')
-    perform_game_updates(user_id)
-    user_data = db_fetch_one("SELECT username, money FROM users WHERE id=%s", (user_id,))
-    if not user_data:
+    now = datetime.now()
+    snapshot = get_game_snapshot(user_id, now)
+    if not snapshot:
         session.clear()
         return jsonify(success=False, message='User not found'), 404
-    plots = db_fetch_all("SELECT * FROM user_plots WHERE user_id=%s ORDER BY plot_number", (user_id,))
+    return jsonify(game_state_payload(snapshot, now, request.args.get('since', ''), request.args.get('catalog')))
+
+def game_state_payload(snapshot, now, since, catalog):
+    stages = [compute_growth_stage(plot, now) for plot in snapshot['plots']]
+    hashes = dict(snapshot['section_hashes'])
+    hashes['plots'] = _section_hash(f"{snapshot['section_hashes']['plots']}:{stages}".encode())
+    global_weather = current_weather(now)
+    hashes['global_weather'] = _section_hash(str([w['id'] for w in global_weather]).encode())
+    known = dict(zip(STATE_SECTIONS, since.split('-')))
+    state = {}
+    for name in STATE_SECTIONS:
+        if known.get(name) == hashes[name]:
+            continue
+        if name == 'plots':
+            state['plots'] = [dict(plot, growth_stage=stage) for plot, stage in zip(snapshot['plots'], stages)]
+        elif name == 'global_weather':
+            state['global_weather'] = global_weather
+        else:
+            state[name] = snapshot[name]
+    if catalog != CATALOG_VERSION:
+        state['game_data'] = catalog_data()
+    state_version = '-'.join(hashes[name] for name in STATE_SECTIONS)
+    return {'success': True, 'state': state, 'state_version': state_version, 'catalog_version': CATALOG_VERSION}
+
+@app.route('/api/catalog')
+def get_catalog():
+    response = app.response_class(CATALOG_RESPONSE_BODY, mimetype='application/json')
+    response.set_etag(CATALOG_VERSION)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@app.route('/api/update_game')
+def update_game():
+    return get_game_state()
+
+@app.route('/api/events')
+def game_events():
+    user_id = session['user_id']
+    if not GAME_EVENTS.claim_sync_slot():
+        return jsonify(success=False, message='Event stream unavailable, falling back to polling'), 503, {'Retry-After': str(app.config['EVENT_STREAM_RETRY_SECONDS'])}
+    heartbeat_seconds = app.config['EVENT_STREAM_HEARTBEAT_SECONDS']
+    def stream():
+        yield 'retry: 5000\n\n'
+        for events in GAME_EVENTS.listen(user_id, heartbeat_seconds):
+            yield encode_game_events(events)
+    response = app.response_class(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(GAME_EVENTS.release_sync_slot)
+    return response
+
+def encode_game_events(events):
+    if not events:
+        return ': keepalive\n\n'
+    return ''.join(f"id: {seq}\nevent: {event}\ndata: {json.dumps(data or {})}\n\n" for seq, event, data in events)
+
+def invalidate_game_state(*user_ids, event='state_changed'):
+    _invalidate_local_game_state(user_ids, event)
+    if app.config['MULTI_WORKER'] and user_ids:
+        created_at, origin = int(time.time()), worker_id()
+        db_execute_many("INSERT INTO cache_invalidations (origin, user_id, event, created_at) VALUES (%s, %s, %s, %s)", [(origin, user_id, event, created_at) for user_id in user_ids])
+
+def _invalidate_local_game_state(user_ids, event):
+    with GAME_STATE_LOCK:
+        for user_id in user_ids:
+            GAME_STATE_GENERATIONS[user_id] = GAME_STATE_GENERATIONS.get(user_id, 0) + 1
+            GAME_STATE_CACHE.pop(user_id, None)
+    for user_id in user_ids:
+        GAME_EVENTS.publish(user_id, event)
+
+def cached_game_snapshot(user_id, now):
+    with GAME_STATE_LOCK:
+        snapshot = GAME_STATE_CACHE.get(user_id)
+    if snapshot and now < snapshot['next_update_at']:
+        return snapshot
+    return None
+
+def get_game_snapshot(user_id, now):
+    snapshot = cached_game_snapshot(user_id, now)
+    if snapshot:
+        return snapshot
+    perform_game_updates(user_id)
+    return build_game_snapshot(user_id, now)
+
+def game_state_generation(user_id):
+    with GAME_STATE_LOCK:
+        return GAME_STATE_GENERATIONS.get(user_id, 0)
+
+SNAPSHOT_PLOTS_QUERY = '''
+    SELECT u.username, u.money, p.*
+    FROM users u
+    LEFT JOIN user_plots p ON p.user_id = u.id
+    WHERE u.id=%s
+    ORDER BY p.plot_number
+'''
+
+SNAPSHOT_ITEMS_QUERY = '''
+    SELECT 'fruit' AS row_kind, id, user_id, plot_id, fruit_type_id, weight, created_at, harvested, NULL AS weather_effects, last_weather_check, NULL AS item_type, NULL AS item_id, NULL AS quantity
+    FROM user_fruits WHERE user_id=%s AND harvested=FALSE
+    UNION ALL
+    SELECT 'item', id, user_id, NULL, NULL, NULL, NULL, NULL, NULL, NULL, item_type, item_id, quantity
+    FROM inventory WHERE user_id=%s
+    UNION ALL
+    SELECT 'effect', fwe.fruit_id, NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL, fwe.weather_id, fwe.applied_at
+    FROM fruit_weather_effects fwe JOIN user_fruits uf ON fwe.fruit_id = uf.id
+    WHERE uf.user_id=%s AND uf.harvested=FALSE
+    ORDER BY created_at DESC
+'''
+
+def build_game_snapshot(user_id, now):
+    generation = game_state_generation(user_id)
+    rows = db_fetch_all(SNAPSHOT_PLOTS_QUERY, (user_id,))
+    if not rows:
+        return None
+    items = db_fetch_all(SNAPSHOT_ITEMS_QUERY, (user_id, user_id, user_id))
+    return assemble_game_snapshot(user_id, generation, rows, items, now)
+
+def assemble_game_snapshot(user_id, generation, rows, items, now):
+    plots = [{k: v for k, v in row.items() if k not in ('username', 'money')} for row in rows if row['id'] is not None]
+    fruits_by_plot = {plot['id']: [] for plot in plots if plot['plant_type_id']}
+    inventory, inventory_fruits, effects_by_fruit = [], [], {}
+    for row in items:
+        if row['row_kind'] == 'item':
+            inventory.append({k: row[k] for k in INVENTORY_COLUMNS})
+            continue
+        if row['row_kind'] == 'effect':
+            effects_by_fruit.setdefault(row['id'], []).append((row['quantity'], row['item_id']))
+            continue
+        fruit = {k: row[k] for k in FRUIT_COLUMNS}
+        if fruit['plot_id'] is not None:
+            fruits_by_plot.get(fruit['plot_id'], []).append(fruit)
+            continue
+        fruit_type = FRUIT_TYPES.get(fruit['fruit_type_id'])
+        plant_type = PLANT_TYPES.get(fruit_type['plant_type_id']) if fruit_type else None
+        if plant_type:
+            fruit.update(color_name=fruit_type['color_name'], image_suffix=fruit_type['image_suffix'], image_prefix=plant_type['image_prefix'], plant_name=plant_type['name'])
+            inventory_fruits.append(fruit)
     for plot in plots:
-        plot['fruits'] = db_fetch_all("SELECT * FROM user_fruits WHERE plot_id=%s AND harvested=FALSE", (plot['id'],)) if plot.get('plant_type_id') else []
-    inventory_fruits = db_fetch_all('''
-        SELECT uf.*, ft.color_name, ft.image_suffix, pt.image_prefix, pt.name as plant_name
-        FROM user_fruits uf
-        JOIN fruit_types ft ON uf.fruit_type_id = ft.id
-        JOIN plant_types pt ON ft.plant_type_id = pt.id
-        WHERE uf.user_id = %s AND uf.plot_id IS NULL AND uf.harvested = FALSE
-        ORDER BY uf.created_at DESC
-    ''', (user_id,))
-    state = {
-        'user': user_data,
+        plot['fruits'] = fruits_by_plot.get(plot['id'], [])
+    for fruit in [f for plot in plots for f in plot['fruits']] + inventory_fruits:
+        fruit['weather_effects'] = encode_weather_effects(effects_by_fruit.get(fruit['id'], []))
+    snapshot = {
+        'user': {'username': rows[0]['username'], 'money': rows[0]['money']},
         'plots': plots,
-        'inventory': db_fetch_all("SELECT * FROM inventory WHERE user_id=%s", (user_id,)),
+        'inventory': inventory,
         'inventory_fruits': inventory_fruits,
-        'global_weather': GLOBAL_WEATHER_STATE,
-        'game_data': {
-            'plant_types': PLANT_TYPES,
-            'fertilizer_types': FERTILIZER_TYPES,
-            'fruit_types': FRUIT_TYPES,
-            'weather_types': WEATHER_TYPES,
-            'weather_combinations': WEATHER_COMBINATIONS,
-            'plot_costs': PLOT_COSTS
-        }
+        'next_update_at': _next_update_due(plots, now)
     }
-    return jsonify(success=True, state=state)
+    snapshot['section_hashes'] = {name: _section_hash(snapshot[name]) for name in ('user', 'plots', 'inventory', 'inventory_fruits')}
+    with GAME_STATE_LOCK:
+        if GAME_STATE_GENERATIONS.get(user_id, 0) == generation:
+            GAME_STATE_CACHE.pop(user_id, None)
+            GAME_STATE_CACHE[user_id] = snapshot
+            while len(GAME_STATE_CACHE) > GAME_STATE_CACHE_MAX_USERS:
+                GAME_STATE_CACHE.pop(next(iter(GAME_STATE_CACHE)))
+    return snapshot
 
-@app.route('/api/update_game')
-def update_game():
-    perform_game_updates(session['user_id'])
-    return get_game_state()
+def _next_update_due(plots, now):
+    minute_start = now.replace(second=0, microsecond=0)
+    due = [now + timedelta(seconds=GAME_STATE_MAX_AGE_SECONDS)]
+    has_plot_fruits = False
+    for plot in plots:
+        plant_type = PLANT_TYPES.get(plot['plant_type_id'])
+        if not plant_type or not plot['planted_at']:
+            continue
+        stage_seconds = plant_type['growth_time_per_stage_seconds']
+        boost_seconds = plot['growth_boost_seconds'] or 0
+        if plant_type['harvest_type'] == 'single_harvest':
+            if not plot['fruits']:
+                due.append(plot['planted_at'] + timedelta(seconds=(plant_type['max_growth_stage'] - 1) * stage_seconds - boost_seconds))
+        elif len(plot['fruits']) < MAX_PLOT_FRUITS:
+            last_attempt_time = plot['last_spawn_attempt_at']
+            if now.minute % 2 == 0 and (not last_attempt_time or last_attempt_time.minute != now.minute):
+                next_spawn_at = minute_start
+            else:
+                next_spawn_at = minute_start + timedelta(minutes=2 - now.minute % 2)
+            fruiting_at = plot['planted_at'] + timedelta(seconds=(PERENNIAL_FRUITING_STAGE - 1) * stage_seconds - boost_seconds)
+            due.append(max(fruiting_at, next_spawn_at))
+        for fruit in plot['fruits']:
+            has_plot_fruits = True
+            for effect in json.loads(fruit['weather_effects'] or '[]'):
+                due.append(datetime.fromisoformat(effect['applied_at']) + timedelta(seconds=WEATHER_EFFECT_SECONDS))
+    if has_plot_fruits:
+        due.append(weather_epoch_start(weather_epoch(now) + 1))
+        if current_weather(now):
+            due.append(minute_start + timedelta(minutes=1))
+    return min(due)
 
 def perform_game_updates(user_id):
-    global GLOBAL_WEATHER_STATE, LAST_GLOBAL_WEATHER_UPDATE_MINUTE
-    current_time = datetime.now()
-    plots_to_update = db_fetch_all('''
-        SELECT p.*, pt.max_growth_stage, pt.harvest_type, pt.growth_time_per_stage_seconds
+    with user_locks([user_id]) as locked:
+        if not locked:
+            return None
+        return run_world_tick(user_ids=locked)
+
+def effective_growth_seconds(plot, now):
+    return (now - plot['planted_at']).total_seconds() + (plot.get('growth_boost_seconds') or 0)
+
+def growth_boost_seconds(stage_seconds, effective_seconds, value):
+    return (stage_seconds - effective_seconds % stage_seconds) * value
+
+def compute_growth_stage(plot, now):
+    plant_type = PLANT_TYPES.get(plot.get('plant_type_id'))
+    if not plant_type or not plot.get('planted_at'):
+        return plot['growth_stage']
+    completed_stages = effective_growth_seconds(plot, now) // plant_type['growth_time_per_stage_seconds']
+    return max(plot['growth_stage'], min(plant_type['max_growth_stage'], int(completed_stages) + 1))
+
+def growth_event_stages(plant_type):
+    if plant_type['harvest_type'] == 'perennial':
+        return (PERENNIAL_FRUITING_STAGE, plant_type['max_growth_stage'])
+    return (plant_type['max_growth_stage'],)
+
+def _user_scope(column, user_ids):
+    if user_ids is None:
+        return '', ()
+    return f" AND {column} IN ({', '.join(['%s'] * len(user_ids))})", tuple(user_ids)
+
+def run_world_tick(user_ids=None, now=None, scope=None):
+    now = now or datetime.now()
+    scope = scope or ('world' if user_ids is None else 'user')
+    stats = {'started_at': now, 'scope': scope, 'phases': {}, 'stages_materialized': 0, 'fruits_spawned': 0, 'weather_updates': 0, 'touched_users': {}}
+    started = time.perf_counter()
+    for phase, func in (('growth', _tick_growth), ('perennial_spawn', _tick_perennial_spawns), ('single_harvest_spawn', _tick_single_harvest_spawns), ('weather_stick', _tick_weather_sticks)):
+        phase_started = time.perf_counter()
+        func(user_ids, now, stats)
+        stats['phases'][phase] = time.perf_counter() - phase_started
+    stats['total_seconds'] = time.perf_counter() - started
+    if INSTRUMENTATION.enabled:
+        INSTRUMENTATION.record_phases(scope, stats['phases'])
+    for event, touched in stats.pop('touched_users').items():
+        invalidate_game_state(*touched, event=event)
+    return stats
+
+def _tick_growth(user_ids, now, stats):
+    scope_sql, scope_params = _user_scope('p.user_id', user_ids)
+    plots = db_fetch_all(f'''
+        SELECT p.id, p.user_id, p.plant_type_id, p.planted_at, p.growth_boost_seconds, p.growth_stage
         FROM user_plots p
         JOIN plant_types pt ON p.plant_type_id = pt.id
-        WHERE p.user_id=%s AND p.plant_type_id IS NOT NULL AND p.growth_stage < pt.max_growth_stage
-    ''', (user_id,))
-    for plot in plots_to_update:
-        base_time_elapsed = (current_time - plot['planted_at']).total_seconds()
-        total_effective_time = base_time_elapsed + plot.get('growth_boost_seconds', 0)
-        completed_stages = total_effective_time // plot['growth_time_per_stage_seconds']
-        new_stage = min(plot['max_growth_stage'], int(completed_stages) + 1)
-        if new_stage > plot['growth_stage']:
-            db_execute("UPDATE user_plots SET growth_stage=%s, last_growth_update=%s WHERE id=%s", (new_stage, current_time, plot['id']), commit=True)
-    if current_time.minute % 5 == 0 and LAST_GLOBAL_WEATHER_UPDATE_MINUTE != current_time.minute:
-        GLOBAL_WEATHER_STATE = [w for w_id, w in WEATHER_TYPES.items() if random.random() < w['spawn_rate']]
-        LAST_GLOBAL_WEATHER_UPDATE_MINUTE = current_time.minute
-        print(f"--- Global weather updated at minute {LAST_GLOBAL_WEATHER_UPDATE_MINUTE}: {[w['name'] for w in GLOBAL_WEATHER_STATE]} ---")
-    perennial_plots = db_fetch_all('''
-        SELECT p.* FROM user_plots p JOIN plant_types pt ON p.plant_type_id = pt.id
-        WHERE p.user_id=%s AND pt.harvest_type = 'perennial' AND p.growth_stage >= 16
-    ''', (user_id,))
-    for plot in perennial_plots:
-        current_fruits = db_fetch_all("SELECT * FROM user_fruits WHERE plot_id=%s AND harvested=FALSE", (plot['id'],))
-        if len(current_fruits) < 10:
-            last_attempt_time = plot.get('last_spawn_attempt_at')
-            if current_time.minute % 2 == 0 and (not last_attempt_time or last_attempt_time.minute != current_time.minute):
-                print(f"OK to spawn for perennial plot {plot['id']} at minute {current_time.minute}.")
-                spawn_new_fruit(user_id, plot)
-    single_harvest_plots = db_fetch_all('''
+        WHERE p.plant_type_id IS NOT NULL AND p.growth_stage < pt.max_growth_stage{scope_sql}
+    ''', scope_params)
+    new_stages = {}
+    for plot in plots:
+        new_stage = compute_growth_stage(plot, now)
+        if any(plot['growth_stage'] < stage <= new_stage for stage in growth_event_stages(PLANT_TYPES[plot['plant_type_id']])):
+            new_stages[plot['id']] = new_stage
+            stats['touched_users'].setdefault('growth_stage', set()).add(plot['user_id'])
+    db_bulk_update('user_plots', 'growth_stage', new_stages, also={'last_growth_update': now})
+    stats['stages_materialized'] = len(new_stages)
+
+def _tick_perennial_spawns(user_ids, now, stats):
+    if now.minute % 2 != 0:
+        return
+    scope_sql, scope_params = _user_scope('p.user_id', user_ids)
+    plots = db_fetch_all(f'''
+        SELECT p.*, (SELECT COUNT(*) FROM user_fruits uf WHERE uf.plot_id = p.id AND uf.harvested = FALSE) AS fruit_count
+        FROM user_plots p
+        JOIN plant_types pt ON p.plant_type_id = pt.id
+        WHERE pt.harvest_type = 'perennial' AND p.growth_stage >= %s{scope_sql}
+    ''', (PERENNIAL_FRUITING_STAGE,) + scope_params)
+    due = [p for p in plots if p['fruit_count'] < MAX_PLOT_FRUITS and (not p['last_spawn_attempt_at'] or p['last_spawn_attempt_at'].minute != now.minute)]
+    _spawn_fruits(due, now, stats)
+
+def _tick_single_harvest_spawns(user_ids, now, stats):
+    scope_sql, scope_params = _user_scope('p.user_id', user_ids)
+    plots = db_fetch_all(f'''
         SELECT p.* FROM user_plots p JOIN plant_types pt ON p.plant_type_id = pt.id
-        WHERE p.user_id = %s
-          AND pt.harvest_type = 'single_harvest'
+        WHERE pt.harvest_type = 'single_harvest'
           AND p.growth_stage = pt.max_growth_stage
-          AND NOT EXISTS (SELECT 1 FROM user_fruits uf WHERE uf.plot_id = p.id AND uf.harvested = FALSE)
-    ''', (user_id,))
-    for plot in single_harvest_plots:
-        print(f"Transforming single-harvest plot {plot['id']} into a fruit.")
-        spawn_new_fruit(user_id, plot)
-    plots_with_fruits = db_fetch_all("SELECT id FROM user_plots WHERE user_id=%s AND plant_type_id IS NOT NULL", (user_id,))
-    global_weather_ids = {w['id'] for w in GLOBAL_WEATHER_STATE}
-    for plot in plots_with_fruits:
-        current_fruits = db_fetch_all("SELECT * FROM user_fruits WHERE plot_id=%s AND harvested=FALSE", (plot['id'],))
-        for fruit in current_fruits:
-            effects = json.loads(fruit.get('weather_effects') or '[]')
-            active_effects = [e for e in effects if (current_time - datetime.fromisoformat(e['applied_at'])).total_seconds() < 120]
-            ids_to_apply = global_weather_ids - {e['weather_id'] for e in active_effects}
-            for w_id in ids_to_apply:
-                if random.random() < WEATHER_TYPES[w_id]['stick_rate']:
-                    active_effects.append({'weather_id': w_id, 'applied_at': current_time.isoformat(), 'duration_seconds': 120})
-            if json.dumps(active_effects) != fruit.get('weather_effects'):
-                db_execute("UPDATE user_fruits SET weather_effects=%s WHERE id=%s", (json.dumps(active_effects), fruit['id']), commit=True)
+          AND NOT EXISTS (SELECT 1 FROM user_fruits uf WHERE uf.plot_id = p.id AND uf.harvested = FALSE){scope_sql}
+    ''', scope_params)
+    _spawn_fruits(plots, now, stats)
+
+def _spawn_fruits(plots, now, stats):
+    new_fruits = [(plot['user_id'], plot['id'], chosen['id'], round(fruit_weight, 1), now) for plot, chosen, fruit_weight in roll_fruits(plots, now)]
+    if not new_fruits:
+        return
+    db_execute_many("INSERT INTO user_fruits(user_id,plot_id,fruit_type_id,weight,created_at) VALUES(%s,%s,%s,%s,%s)", new_fruits)
+    db_bulk_update('user_plots', 'last_spawn_attempt_at', {fruit[1]: now for fruit in new_fruits})
+    stats['fruits_spawned'] += len(new_fruits)
+    stats['touched_users'].setdefault('fruit_spawned', set()).update(fruit[0] for fruit in new_fruits)
+
+def _tick_weather_sticks(user_ids, now, stats):
+    tick_rolls = {w_id: 1 for w_id in weather_ids_for_epoch(weather_epoch(now))}
+    online = stats['scope'] == 'user'
+    online_since = now - timedelta(seconds=app.config['WEATHER_STICK_ONLINE_WINDOW_SECONDS'])
+    now_epoch = int(now.timestamp())
+    scope_sql, scope_params = _user_scope('p.user_id', user_ids)
+    rows = db_fetch_all(f'''
+        SELECT uf.id, uf.user_id, uf.created_at, uf.last_weather_check, fwe.weather_id, fwe.applied_at
+        FROM user_fruits uf
+        JOIN user_plots p ON uf.plot_id = p.id
+        LEFT JOIN fruit_weather_effects fwe ON fwe.fruit_id = uf.id
+        WHERE uf.harvested = FALSE AND p.plant_type_id IS NOT NULL{scope_sql}
+    ''', scope_params)
+    owners, active, rolls, expired = {}, {}, {}, set()
+    for row in rows:
+        owners[row['id']] = row['user_id']
+        if online and row['id'] not in rolls:
+            rolls[row['id']] = online_weather_rolls(max(row['last_weather_check'] or row['created_at'], online_since), now)
+        weather_ids = active.setdefault(row['id'], set())
+        if row['weather_id'] is None:
+            continue
+        if now_epoch - row['applied_at'] < WEATHER_EFFECT_SECONDS:
+            weather_ids.add(row['weather_id'])
+        else:
+            expired.add(row['id'])
+    new_effects = [(fruit_id, w_id, now_epoch) for fruit_id, weather_ids in active.items() for w_id, n in rolls.get(fruit_id, tick_rolls).items() if w_id not in weather_ids and random.random() < weather_stick_chance(WEATHER_TYPES[w_id]['stick_rate'], n)]
+    expired = sorted(expired)
+    for start in range(0, len(expired), 500):
+        chunk = expired[start:start + 500]
+        db_execute(f"DELETE FROM fruit_weather_effects WHERE applied_at <= %s AND fruit_id IN ({', '.join(['%s'] * len(chunk))})", (now_epoch - WEATHER_EFFECT_SECONDS, *chunk), commit=True)
+    checked = sorted(fruit_id for fruit_id, fruit_rolls in rolls.items() if fruit_rolls)
+    for start in range(0, len(checked), 500):
+        chunk = checked[start:start + 500]
+        db_execute(f"UPDATE user_fruits SET last_weather_check=%s WHERE id IN ({', '.join(['%s'] * len(chunk))})", (now, *chunk), commit=True)
+    if new_effects:
+        db_execute_many("INSERT INTO fruit_weather_effects (fruit_id, weather_id, applied_at) VALUES (%s, %s, %s)", new_effects)
+    changed = set(expired) | {effect[0] for effect in new_effects}
+    if changed:
+        stats['touched_users'].setdefault('weather_effects', set()).update(owners[fruit_id] for fruit_id in changed)
+    stats['weather_updates'] = len(changed)
+
+def encode_weather_effects(effects):
+    return json.dumps([{'weather_id': weather_id, 'applied_at': datetime.fromtimestamp(applied_at).isoformat(), 'duration_seconds': WEATHER_EFFECT_SECONDS} for applied_at, weather_id in sorted(effects)])
 
 def calculate_redistributed_weights(possible_fruits, steal_percentage, dual_pool_share, tri_pool_share):
     normal_fruit = next((p for p in possible_fruits if 'normal' in p['image_suffix'].lower()), None)
@@ -283,71 +1501,106 @@ def calculate_redistributed_weights(possible_fruits, steal_percentage, dual_pool
         new_weights_map[fruit['id']] = fruit['rarity_rate'] + bonus
     return [new_weights_map.get(p['id'], p['rarity_rate']) for p in possible_fruits]
 
-def spawn_new_fruit(user_id, plot):
-    plant_id = plot['plant_type_id']
-    effects = json.loads(plot.get('fertilizer_applied_effect') or '{}')
-    now = datetime.now()
-    fruit_weight = round(random.uniform(0.5, 50.0), 1)
-    size_boost_effect = effects.get('fruit_size_boost')
-    if size_boost_effect and now < datetime.fromisoformat(size_boost_effect['expiry']):
-        fruit_weight *= (1 + size_boost_effect['value'])
-    possible = [ft for ft in FRUIT_TYPES.values() if ft['plant_type_id'] == plant_id]
-    weights = []
-    tri_color_effect = effects.get('tri_color_boost')
-    dual_color_effect = effects.get('dual_color_boost')
-    color_boost_effect = effects.get('fruit_color_boost')
-    is_tri_active = tri_color_effect and now < datetime.fromisoformat(tri_color_effect['expiry'])
-    is_dual_active = dual_color_effect and now < datetime.fromisoformat(dual_color_effect['expiry'])
-    is_color_boost_active = color_boost_effect and now < datetime.fromisoformat(color_boost_effect['expiry'])
-    if is_tri_active:
-        weights = calculate_redistributed_weights(possible, 0.90, 0.20, 0.80)
-    elif is_dual_active:
-        weights = calculate_redistributed_weights(possible, 0.80, 0.80, 0.20)
-    elif is_color_boost_active:
-        normal_fruit = next((f for f in possible if 'normal' in f['image_suffix'].lower()), None)
-        special_fruits = [f for f in possible if 'normal' not in f['image_suffix'].lower()]
-        if normal_fruit and special_fruits:
-            effect_value = color_boost_effect['value']
-            amount_to_redistribute = normal_fruit['rarity_rate'] * effect_value
-            new_normal_rate = normal_fruit['rarity_rate'] - amount_to_redistribute
-            total_special_original_rate = sum(f['rarity_rate'] for f in special_fruits)
-            new_weights_map = {normal_fruit['id']: new_normal_rate}
-            for fruit in special_fruits:
-                bonus = (amount_to_redistribute * (fruit['rarity_rate'] / total_special_original_rate)) if total_special_original_rate > 0 else 0
-                new_weights_map[fruit['id']] = fruit['rarity_rate'] + bonus
-            weights = [new_weights_map.get(p['id'], p['rarity_rate']) for p in possible]
-        else:
-            weights = [ft['rarity_rate'] for ft in possible]
-    else:
-        weights = [ft['rarity_rate'] for ft in possible]
-    if not weights or sum(w for w in weights if w is not None) <= 0:
-        print(f"Error: Could not determine valid weights for plant_id {plant_id}. Aborting fruit spawn.")
-        return
-    chosen = random.choices(possible, weights=weights, k=1)[0]
-    db_execute("INSERT INTO user_fruits(user_id,plot_id,fruit_type_id,weight,created_at) VALUES(%s,%s,%s,%s,%s)", (user_id, plot['id'], chosen['id'], round(fruit_weight, 1), now), commit=True)
-    db_execute("UPDATE user_plots SET last_spawn_attempt_at = %s WHERE id = %s", (now, plot['id']), commit=True)
-    print(f"Spawned a {chosen['color_name']} fruit for user {user_id} on plot {plot['plot_number']} at {now.strftime('%H:%M:%S')}")
+def calculate_color_boost_weights(possible_fruits, effect_value):
+    normal_fruit = next((f for f in possible_fruits if 'normal' in f['image_suffix'].lower()), None)
+    special_fruits = [f for f in possible_fruits if 'normal' not in f['image_suffix'].lower()]
+    if not (normal_fruit and special_fruits):
+        return [ft['rarity_rate'] for ft in possible_fruits]
+    amount_to_redistribute = normal_fruit['rarity_rate'] * effect_value
+    new_normal_rate = normal_fruit['rarity_rate'] - amount_to_redistribute
+    total_special_original_rate = sum(f['rarity_rate'] for f in special_fruits)
+    new_weights_map = {normal_fruit['id']: new_normal_rate}
+    for fruit in special_fruits:
+        bonus = (amount_to_redistribute * (fruit['rarity_rate'] / total_special_original_rate)) if total_special_original_rate > 0 else 0
+        new_weights_map[fruit['id']] = fruit['rarity_rate'] + bonus
+    return [new_weights_map.get(p['id'], p['rarity_rate']) for p in possible_fruits]
+
+class SpawnTable:
+    def __init__(self, fruits, weights):
+        self.fruits = fruits
+        self.weights = weights
+        self.cum_weights = list(accumulate(weights))
+
+    def sample(self, k=1, rng=random):
+        return rng.choices(self.fruits, cum_weights=self.cum_weights, k=k)
+
+def spawn_weights(possible, boost):
+    if boost in SPAWN_BOOST_SHAPES:
+        return calculate_redistributed_weights(possible, *SPAWN_BOOST_SHAPES[boost])
+    if boost:
+        return calculate_color_boost_weights(possible, boost[1])
+    return [ft['rarity_rate'] for ft in possible]
+
+def spawn_table(plant_id, boost=None):
+    key = (plant_id, boost)
+    if key not in SPAWN_TABLES:
+        possible = [ft for ft in FRUIT_TYPES.values() if ft['plant_type_id'] == plant_id]
+        weights = spawn_weights(possible, boost)
+        valid = weights and None not in weights and sum(weights) > 0
+        SPAWN_TABLES[key] = SpawnTable(possible, weights) if valid else None
+    return SPAWN_TABLES[key]
+
+def _build_spawn_tables():
+    global SPAWN_TABLES
+    SPAWN_TABLES = {}
+    color_values = {f['effect_value'] for f in FERTILIZER_TYPES.values() if f['effect_type'] == 'fruit_color_boost'}
+    for plant_id in PLANT_TYPES:
+        for boost in [None, *SPAWN_BOOST_SHAPES, *(('color', value) for value in color_values)]:
+            spawn_table(plant_id, boost)
+
+def _active_effect(effects, effect_type, now):
+    effect = effects.get(effect_type)
+    return effect if effect and now < datetime.fromisoformat(effect['expiry']) else None
+
+def spawn_boost(effects, now):
+    if _active_effect(effects, 'tri_color_boost', now):
+        return 'tri'
+    if _active_effect(effects, 'dual_color_boost', now):
+        return 'dual'
+    color_boost_effect = _active_effect(effects, 'fruit_color_boost', now)
+    return ('color', color_boost_effect['value']) if color_boost_effect else None
+
+def roll_fruits(plots, now, rng=random):
+    groups = {}
+    for plot in plots:
+        effects = json.loads(plot.get('fertilizer_applied_effect') or '{}')
+        fruit_weight = round(rng.uniform(0.5, 50.0), 1)
+        size_boost_effect = _active_effect(effects, 'fruit_size_boost', now)
+        if size_boost_effect:
+            fruit_weight *= (1 + size_boost_effect['value'])
+        groups.setdefault((plot['plant_type_id'], spawn_boost(effects, now)), []).append((plot, fruit_weight))
+    rolled = []
+    for (plant_id, boost), members in groups.items():
+        table = spawn_table(plant_id, boost)
+        if table is None:
+            print(f"Error: Could not determine valid weights for plant_id {plant_id}. Aborting fruit spawn.")
+            continue
+        for (plot, fruit_weight), chosen in zip(members, table.sample(len(members), rng)):
+            rolled.append((plot, chosen, fruit_weight))
+    return rolled
 
 @app.route('/api/harvest_fruit', methods=['POST'])
 def harvest_fruit():
     user_id = session['user_id']
     fruit_id = request.json.get('fruit_id')
-    query = '''
-        SELECT uf.id as fruit_id, p.id as plot_id, pt.harvest_type
-        FROM user_fruits uf
-        JOIN user_plots p ON uf.plot_id = p.id
-        JOIN plant_types pt ON p.plant_type_id = pt.id
-        WHERE uf.id=%s AND uf.user_id=%s AND uf.harvested=FALSE AND uf.plot_id IS NOT NULL
-    '''
-    fruit_data = db_fetch_one(query, (fruit_id, user_id))
-    if not fruit_data:
-        return jsonify(success=False, message='Fruit not found on plot or already harvested.'), 404
-    db_execute("UPDATE user_fruits SET plot_id=NULL, last_weather_check=NULL WHERE id=%s", (fruit_data['fruit_id'],), commit=True)
-    db_execute("UPDATE user_plots SET last_harvest_at=%s WHERE id=%s", (datetime.now(), fruit_data['plot_id']), commit=True)
-    if fruit_data['harvest_type'] == 'single_harvest':
-        _reset_plot(fruit_data['plot_id'])
-        print(f"Single-harvest plot {fruit_data['plot_id']} has been reset after harvest.")
-    return get_game_state()
+
+    def apply(cursor):
+        if not _harvest_fruits(cursor, user_id, [fruit_id]):
+            raise ActionRejected('Fruit not found on plot or already harvested.', 404)
+    return run_game_action(user_id, apply)
+
+@app.route('/api/harvest_fruits', methods=['POST'])
+def harvest_fruits():
+    user_id = session['user_id']
+    data = request.json or {}
+    fruit_ids = None if data.get('all') else _bulk_entries(data, 'fruit_ids')
+    if not data.get('all') and fruit_ids is None:
+        return jsonify(success=False, message='Invalid fruit list provided.'), 400
+
+    def apply(cursor):
+        if not _harvest_fruits(cursor, user_id, fruit_ids):
+            raise ActionRejected('No fruits to harvest.', 404)
+    return run_game_action(user_id, apply)
 
 @app.route('/api/sell_fruits', methods=['POST'])
 def sell_fruits():
@@ -355,41 +1608,47 @@ def sell_fruits():
     fruit_ids_to_sell = request.json.get('fruit_ids')
     if not fruit_ids_to_sell or not isinstance(fruit_ids_to_sell, list):
         return jsonify(success=False, message='Invalid fruit list provided.'), 400
-    total_earned = 0
-    valid_sold_ids = []
-    for fruit_id in fruit_ids_to_sell:
-        fruit = db_fetch_one("SELECT * FROM user_fruits WHERE id=%s AND user_id=%s AND plot_id IS NULL AND harvested=FALSE", (fruit_id, user_id))
-        if not fruit:
-            continue
-        fruit_type = FRUIT_TYPES.get(fruit['fruit_type_id'])
-        if not fruit_type:
-            continue
-        plant_type = PLANT_TYPES.get(fruit_type['plant_type_id'])
-        if not plant_type:
-            continue
-        weather_mult = 1.0
-        effects = json.loads(fruit.get('weather_effects') or '[]')
-        ids = sorted([e['weather_id'] for e in effects])
-        if ids:
-            if len(ids) == 1:
-                weather_info = WEATHER_TYPES.get(ids[0])
-                weather_mult = weather_info.get('price_multiplier', 1.0) if weather_info else 1.0
-            else:
-                combo = next((c for c in WEATHER_COMBINATIONS.values() if sorted(c['weather_type_ids']) == ids), None)
-                weather_mult = combo['price_multiplier'] if combo else 1.0
-        earned = round(plant_type['base_price'] * fruit['weight'] * fruit_type['price_multiplier'] * weather_mult)
-        total_earned += earned
-        valid_sold_ids.append(fruit_id)
-    if total_earned > 0:
-        db_execute("UPDATE users SET money = money + %s WHERE id=%s", (total_earned, user_id), commit=True)
-        if valid_sold_ids:
-            placeholders = ', '.join(['%s'] * len(valid_sold_ids))
-            query = f"UPDATE user_fruits SET harvested=TRUE WHERE id IN ({placeholders})"
-            db_execute(query, tuple(valid_sold_ids), commit=True)
-    return get_game_state()
+    placeholders = ', '.join(['%s'] * len(fruit_ids_to_sell))
+
+    def apply(cursor):
+        cursor.execute(f"SELECT id, fruit_type_id, weight FROM user_fruits WHERE id IN ({placeholders}) AND user_id=%s AND plot_id IS NULL AND harvested=FALSE FOR UPDATE", (*fruit_ids_to_sell, user_id))
+        fruits = [f for f in cursor.fetchall() if f['fruit_type_id'] in FRUIT_TYPES and FRUIT_TYPES[f['fruit_type_id']]['plant_type_id'] in PLANT_TYPES]
+        weather_ids = {}
+        if fruits:
+            cursor.execute(f"SELECT fruit_id, weather_id FROM fruit_weather_effects WHERE fruit_id IN ({', '.join(['%s'] * len(fruits))})", tuple(f['id'] for f in fruits))
+            for effect in cursor.fetchall():
+                weather_ids.setdefault(effect['fruit_id'], set()).add(effect['weather_id'])
+        for fruit in fruits:
+            fruit['weather_ids'] = weather_ids.get(fruit['id'], set())
+        total_earned = sum(price_fruits(*fruit_price_inputs(fruits)))
+        if total_earned > 0:
+            cursor.execute("UPDATE users SET money = money + %s WHERE id=%s", (total_earned, user_id))
+            sold_placeholders = ', '.join(['%s'] * len(fruits))
+            cursor.execute(f"UPDATE user_fruits SET harvested=TRUE WHERE id IN ({sold_placeholders})", tuple(f['id'] for f in fruits))
+    return run_game_action(user_id, apply, event='money_changed', failure_message='Sale failed, please try again.')
+
+def weather_multiplier(weather_ids):
+    if not weather_ids:
+        return 1.0
+    if len(weather_ids) == 1:
+        weather_info = WEATHER_TYPES.get(next(iter(weather_ids)))
+        return weather_info.get('price_multiplier', 1.0) if weather_info else 1.0
+    combo = WEATHER_COMBINATION_INDEX.get(frozenset(weather_ids))
+    return combo['price_multiplier'] if combo else 1.0
+
+def fruit_price_inputs(fruits):
+    fruit_types = [FRUIT_TYPES[f['fruit_type_id']] for f in fruits]
+    base_prices = [PLANT_TYPES[ft['plant_type_id']]['base_price'] for ft in fruit_types]
+    weights = [f['weight'] for f in fruits]
+    color_multipliers = [ft['price_multiplier'] for ft in fruit_types]
+    weather_multipliers = [weather_multiplier(f['weather_ids']) for f in fruits]
+    return base_prices, weights, color_multipliers, weather_multipliers
 
-def _reset_plot(plot_id):
-    db_execute('''
+def price_fruits(base_prices, weights, color_multipliers, weather_multipliers):
+    return [round(base * weight * color * weather) for base, weight, color, weather in zip(base_prices, weights, color_multipliers, weather_multipliers)]
+
+def _reset_plots(cursor, plot_ids):
+    cursor.execute(f'''
         UPDATE user_plots
         SET
             plant_type_id = NULL,
@@ -400,8 +1659,58 @@ def _reset_plot(plot_id):
             last_spawn_attempt_at = NULL,
             last_harvest_at = NULL,
             fertilizer_applied_effect = NULL
-        WHERE id = %s
-    ''', (plot_id,), commit=True)
+        WHERE id IN ({', '.join(['%s'] * len(plot_ids))})
+    ''', tuple(plot_ids))
+
+def _bulk_entries(data, key):
+    entries = data.get(key)
+    if not isinstance(entries, list) or not entries or len(entries) > app.config['MAX_BULK_ACTIONS']:
+        return None
+    return entries
+
+def _harvest_fruits(cursor, user_id, fruit_ids=None):
+    query = '''
+        SELECT uf.id as fruit_id, p.id as plot_id, p.plant_type_id
+        FROM user_fruits uf
+        JOIN user_plots p ON uf.plot_id = p.id
+        WHERE uf.user_id=%s AND uf.harvested=FALSE AND uf.plot_id IS NOT NULL
+    '''
+    params = (user_id,)
+    if fruit_ids is not None:
+        query += f" AND uf.id IN ({', '.join(['%s'] * len(fruit_ids))})"
+        params += tuple(fruit_ids)
+    cursor.execute(query + " FOR UPDATE", params)
+    fruits = [f for f in cursor.fetchall() if f['plant_type_id'] in PLANT_TYPES]
+    if not fruits:
+        return fruits
+    cursor.execute(f"UPDATE user_fruits SET plot_id=NULL, last_weather_check=NULL WHERE id IN ({', '.join(['%s'] * len(fruits))})", tuple(f['fruit_id'] for f in fruits))
+    single_plots = sorted({f['plot_id'] for f in fruits if PLANT_TYPES[f['plant_type_id']]['harvest_type'] == 'single_harvest'})
+    perennial_plots = sorted({f['plot_id'] for f in fruits if PLANT_TYPES[f['plant_type_id']]['harvest_type'] != 'single_harvest'})
+    if single_plots:
+        _reset_plots(cursor, single_plots)
+        print(f"Single-harvest plots {single_plots} have been reset after harvest.")
+    if perennial_plots:
+        cursor.execute(f"UPDATE user_plots SET last_harvest_at=%s WHERE id IN ({', '.join(['%s'] * len(perennial_plots))})", (datetime.now(), *perennial_plots))
+    return fruits
+
+def _spend_money(cursor, user_id, amount, message):
+    cursor.execute("UPDATE users SET money=money-%s WHERE id=%s AND money >= %s", (amount, user_id, amount))
+    if cursor.rowcount != 1:
+        raise ActionRejected(message)
+
+def _add_inventory(cursor, user_id, item_type, item_id, quantity=1):
+    cursor.execute(DB_BACKEND.upsert_increment('inventory', ('user_id', 'item_type', 'item_id', 'quantity'), ('user_id', 'item_type', 'item_id'), 'quantity'), (user_id, item_type, item_id, quantity))
+
+def _consume_inventory(cursor, user_id, inv_id, item_type, message):
+    cursor.execute("SELECT id, item_id, quantity FROM inventory WHERE id=%s AND user_id=%s AND item_type=%s FOR UPDATE", (inv_id, user_id, item_type))
+    item = cursor.fetchone()
+    if not item or item['quantity'] < 1:
+        raise ActionRejected(message)
+    if item['quantity'] > 1:
+        cursor.execute("UPDATE inventory SET quantity=quantity-1 WHERE id=%s", (inv_id,))
+    else:
+        cursor.execute("DELETE FROM inventory WHERE id=%s", (inv_id,))
+    return item
 
 @app.route('/api/dig_up_plant', methods=['POST'])
 def dig_up_plant():
@@ -412,34 +1721,35 @@ def dig_up_plant():
     plot_id = data.get('plot_id')
     if not plot_id:
         return jsonify(success=False, message='Plot ID is required.'), 400
-    plot = db_fetch_one("SELECT id, plant_type_id FROM user_plots WHERE id=%s AND user_id=%s", (plot_id, user_id))
-    if not plot or not plot.get('plant_type_id'):
-        return jsonify(success=False, message='Plot not found or is already empty.'), 400
-    db_execute("DELETE FROM user_fruits WHERE plot_id = %s", (plot_id,), commit=True)
-    _reset_plot(plot_id)
-    print(f"User {user_id} successfully dug up plot {plot_id}.")
-    return get_game_state()
+
+    def apply(cursor):
+        cursor.execute("SELECT id, plant_type_id FROM user_plots WHERE id=%s AND user_id=%s FOR UPDATE", (plot_id, user_id))
+        plot = cursor.fetchone()
+        if not plot or not plot.get('plant_type_id'):
+            raise ActionRejected('Plot not found or is already empty.')
+        cursor.execute("DELETE FROM fruit_weather_effects WHERE fruit_id IN (SELECT id FROM user_fruits WHERE plot_id = %s)", (plot_id,))
+        cursor.execute("DELETE FROM user_fruits WHERE plot_id = %s", (plot_id,))
+        _reset_plots(cursor, [plot_id])
+        print(f"User {user_id} successfully dug up plot {plot_id}.")
+    return run_game_action(user_id, apply)
 
 @app.route('/api/buy_item', methods=['POST'])
 def buy_item():
     user_id = session.get('user_id')
     data = request.json
     item_type, item_id = data.get('item_type'), int(data.get('item_id'))
-    user = db_fetch_one("SELECT money FROM users WHERE id=%s", (user_id,))
     price = 0
     if item_type == 'seed':
         price = PLANT_TYPES.get(item_id, {}).get('seed_price')
     elif item_type == 'fertilizer':
         price = FERTILIZER_TYPES.get(item_id, {}).get('price')
-    if not price or user['money'] < price:
+    if not price:
         return jsonify(success=False, message="Cannot purchase"), 400
-    db_execute("UPDATE users SET money=money-%s WHERE id=%s", (price, user_id), commit=True)
-    existing = db_fetch_one("SELECT id, quantity FROM inventory WHERE user_id=%s AND item_type=%s AND item_id=%s", (user_id, item_type, item_id))
-    if existing:
-        db_execute("UPDATE inventory SET quantity=quantity+1 WHERE id=%s", (existing['id'],), commit=True)
-    else:
-        db_execute("INSERT INTO inventory(user_id,item_type,item_id) VALUES(%s,%s,%s)", (user_id, item_type, item_id), commit=True)
-    return get_game_state()
+
+    def apply(cursor):
+        _spend_money(cursor, user_id, price, "Cannot purchase")
+        _add_inventory(cursor, user_id, item_type, item_id)
+    return run_game_action(user_id, apply, event='money_changed')
 
 @app.route('/api/buy_plot', methods=['POST'])
 def buy_plot():
@@ -448,64 +1758,195 @@ def buy_plot():
     cost = PLOT_COSTS.get(plot_num)
     if not cost:
         return jsonify(success=False, message="Invalid plot"), 400
-    user = db_fetch_one("SELECT money FROM users WHERE id=%s", (user_id,))
-    if user['money'] < cost:
-        return jsonify(success=False, message="Not enough money"), 400
-    if db_fetch_one("SELECT id FROM user_plots WHERE user_id=%s AND plot_number=%s", (user_id, plot_num)):
-        return jsonify(success=False, message="Plot already owned"), 400
-    db_execute("UPDATE users SET money=money-%s WHERE id=%s", (cost, user_id), commit=True)
-    db_execute("INSERT INTO user_plots(user_id, plot_number) VALUES (%s,%s)", (user_id, plot_num), commit=True)
-    return get_game_state()
+
+    def apply(cursor):
+        cursor.execute("SELECT money FROM users WHERE id=%s FOR UPDATE", (user_id,))
+        if cursor.fetchone()['money'] < cost:
+            raise ActionRejected("Not enough money")
+        cursor.execute("SELECT id FROM user_plots WHERE user_id=%s AND plot_number=%s", (user_id, plot_num))
+        if cursor.fetchone():
+            raise ActionRejected("Plot already owned")
+        cursor.execute("UPDATE users SET money=money-%s WHERE id=%s", (cost, user_id))
+        cursor.execute("INSERT INTO user_plots(user_id, plot_number) VALUES (%s,%s)", (user_id, plot_num))
+    return run_game_action(user_id, apply, event='money_changed')
+
+def _plant_seed(cursor, user_id, inv_id, plot_id, now):
+    item = _consume_inventory(cursor, user_id, inv_id, 'seed', "Seed not found.")
+    cursor.execute("UPDATE user_plots SET plant_type_id=%s,growth_stage=1,planted_at=%s,last_growth_update=%s, growth_boost_seconds=0, last_spawn_attempt_at=NULL WHERE id=%s AND user_id=%s AND plant_type_id IS NULL", (item['item_id'], now, now, plot_id, user_id))
+    if cursor.rowcount != 1:
+        raise ActionRejected("Plot is not empty.")
+
+def _apply_fertilizer(cursor, user_id, inv_id, plot_id, now):
+    item = _consume_inventory(cursor, user_id, inv_id, 'fertilizer', "Item not found")
+    cursor.execute("SELECT * FROM user_plots WHERE id=%s AND user_id=%s AND plant_type_id IS NOT NULL FOR UPDATE", (plot_id, user_id))
+    plot = cursor.fetchone()
+    if not plot:
+        raise ActionRejected("No plant")
+    fert = FERTILIZER_TYPES[item['item_id']]
+    effect_type = fert['effect_type']
+    if effect_type == 'growth_boost':
+        plant_type = PLANT_TYPES.get(plot['plant_type_id'])
+        if not plant_type:
+            raise ActionRejected("Plant type not found for plot", 500)
+        boost_seconds_to_add = growth_boost_seconds(plant_type['growth_time_per_stage_seconds'], effective_growth_seconds(plot, now), fert['effect_value'])
+        cursor.execute("UPDATE user_plots SET growth_boost_seconds = growth_boost_seconds + %s WHERE id=%s", (boost_seconds_to_add, plot_id))
+    else:
+        effects = json.loads(plot.get('fertilizer_applied_effect') or '{}')
+        effects[effect_type] = {'expiry': (now + timedelta(seconds=FERTILIZER_EFFECT_SECONDS)).isoformat(), 'value': fert['effect_value']}
+        cursor.execute("UPDATE user_plots SET fertilizer_applied_effect=%s WHERE id=%s", (json.dumps(effects), plot_id))
+
+def _plot_actions(data, key):
+    entries = _bulk_entries(data, key)
+    if entries is None or not all(isinstance(e, dict) and e.get('inventory_id') and e.get('plot_id') for e in entries):
+        return None
+    return [(e['inventory_id'], e['plot_id']) for e in entries]
 
 @app.route('/api/plant_seed', methods=['POST'])
 def plant_seed():
     user_id = session['user_id']
     data = request.json
     inv_id, plot_id = data.get('inventory_id'), data.get('plot_id')
-    item = db_fetch_one("SELECT * FROM inventory WHERE id=%s AND user_id=%s AND item_type='seed'", (inv_id, user_id))
-    if not item:
-        return jsonify(success=False, message="Seed not found."), 400
-    now = datetime.now()
-    db_execute("UPDATE user_plots SET plant_type_id=%s,growth_stage=1,planted_at=%s,last_growth_update=%s, growth_boost_seconds=0, last_spawn_attempt_at=NULL WHERE id=%s", (item['item_id'], now, now, plot_id), commit=True)
-    if item['quantity'] > 1:
-        db_execute("UPDATE inventory SET quantity=quantity-1 WHERE id=%s", (inv_id,), commit=True)
-    else:
-        db_execute("DELETE FROM inventory WHERE id=%s", (inv_id,), commit=True)
-    return get_game_state()
+
+    def apply(cursor):
+        _plant_seed(cursor, user_id, inv_id, plot_id, datetime.now())
+    return run_game_action(user_id, apply)
+
+@app.route('/api/plant_seeds', methods=['POST'])
+def plant_seeds():
+    user_id = session['user_id']
+    plantings = _plot_actions(request.json or {}, 'plantings')
+    if plantings is None:
+        return jsonify(success=False, message='Invalid planting list provided.'), 400
+
+    def apply(cursor):
+        now = datetime.now()
+        for inv_id, plot_id in plantings:
+            _plant_seed(cursor, user_id, inv_id, plot_id, now)
+    return run_game_action(user_id, apply)
 
 @app.route('/api/use_fertilizer', methods=['POST'])
 def use_fertilizer():
     user_id = session['user_id']
     data = request.json
     inv_id, plot_id = data.get('inventory_id'), data.get('plot_id')
-    item = db_fetch_one("SELECT * FROM inventory WHERE id=%s AND user_id=%s AND item_type='fertilizer'", (inv_id, user_id))
-    if not item:
-        return jsonify(success=False, message="Item not found"), 400
-    plot = db_fetch_one("SELECT * FROM user_plots WHERE id=%s AND plant_type_id IS NOT NULL", (plot_id,))
-    if not plot:
-        return jsonify(success=False, message="No plant"), 400
-    fert = FERTILIZER_TYPES[item['item_id']]
-    effect_type = fert['effect_type']
-    if effect_type == 'growth_boost':
-        plant_type = PLANT_TYPES.get(plot['plant_type_id'])
-        if not plant_type:
-            return jsonify(success=False, message="Plant type not found for plot"), 500
-        base_time_elapsed = (datetime.now() - plot['planted_at']).total_seconds()
-        total_effective_time = base_time_elapsed + plot.get('growth_boost_seconds', 0)
-        stage_duration_seconds = plant_type['growth_time_per_stage_seconds']
-        time_in_current_stage = total_effective_time % stage_duration_seconds
-        time_remaining_in_stage = stage_duration_seconds - time_in_current_stage
-        boost_seconds_to_add = time_remaining_in_stage * fert['effect_value']
-        db_execute("UPDATE user_plots SET growth_boost_seconds = growth_boost_seconds + %s WHERE id=%s", (boost_seconds_to_add, plot_id), commit=True)
-    else:
-        effects = json.loads(plot.get('fertilizer_applied_effect') or '{}')
-        effects[effect_type] = {'expiry': (datetime.now() + timedelta(minutes=10)).isoformat(), 'value': fert['effect_value']}
-        db_execute("UPDATE user_plots SET fertilizer_applied_effect=%s WHERE id=%s", (json.dumps(effects), plot_id), commit=True)
-    if item['quantity'] > 1:
-        db_execute("UPDATE inventory SET quantity=quantity-1 WHERE id=%s", (inv_id,), commit=True)
-    else:
-        db_execute("DELETE FROM inventory WHERE id=%s", (inv_id,), commit=True)
-    return get_game_state()
+
+    def apply(cursor):
+        _apply_fertilizer(cursor, user_id, inv_id, plot_id, datetime.now())
+    return run_game_action(user_id, apply)
+
+@app.route('/api/use_fertilizers', methods=['POST'])
+def use_fertilizers():
+    user_id = session['user_id']
+    applications = _plot_actions(request.json or {}, 'applications')
+    if applications is None:
+        return jsonify(success=False, message='Invalid fertilizer list provided.'), 400
+
+    def apply(cursor):
+        now = datetime.now()
+        for inv_id, plot_id in applications:
+            _apply_fertilizer(cursor, user_id, inv_id, plot_id, now)
+    return run_game_action(user_id, apply)
+
+def migration_files():
+    return sorted(name[:-4] for name in os.listdir(MIGRATIONS_DIR) if re.match(r'\d+_\w+\.sql$', name))
+
+def migration_statements(version):
+    with open(os.path.join(MIGRATIONS_DIR, f'{version}.sql')) as f:
+        sql = '\n'.join(line for line in f.read().splitlines() if not line.lstrip().startswith('--'))
+    sql = sql.format(auto_id=DB_BACKEND.auto_id, timestamp=DB_BACKEND.timestamp_type)
+    return [statement.strip() for statement in sql.split(';') if statement.strip()]
+
+def applied_migrations():
+    db_execute("CREATE TABLE IF NOT EXISTS schema_migrations (version VARCHAR(255) PRIMARY KEY, applied_at INTEGER NOT NULL)", commit=True)
+    return {row['version'] for row in db_fetch_all("SELECT version FROM schema_migrations")}
+
+def require_migration(version):
+    if version not in applied_migrations():
+        raise RuntimeError(f"Migration {version} is not applied. Run `flask migrate` first.")
+
+def apply_migration(version):
+    with _db_connection() as conn:
+        with DB_BACKEND.cursor(conn) as cursor:
+            for statement in migration_statements(version):
+                index = re.match(r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+(\w+)\s+ON\s+(\w+)', statement, re.IGNORECASE)
+                if index and DB_BACKEND.index_exists(conn, index.group(2), index.group(1)):
+                    continue
+                cursor.execute(statement)
+            cursor.execute("INSERT INTO schema_migrations (version, applied_at) VALUES (%s, %s)", (version, int(time.time())))
+
+@app.cli.command('migrate')
+@click.option('--list', 'list_only', is_flag=True, help='Show every migration and whether it is applied.')
+def migrate(list_only):
+    applied = applied_migrations()
+    if list_only:
+        for version in migration_files():
+            print(f"{'applied' if version in applied else 'pending'}  {version}")
+        return
+    pending = [version for version in migration_files() if version not in applied]
+    for version in pending:
+        apply_migration(version)
+        print(f"Applied {version}.")
+    print(f"Schema up to date ({len(pending)} migrations applied).")
+
+@app.cli.command('archive-sold-fruits')
+@click.option('--batch-size', type=int, help='Fruits moved per transaction.')
+def archive_sold_fruits_command(batch_size):
+    print(f"Archived {archive_sold_fruits(batch_size)} sold fruits into user_fruits_archive.")
+
+@app.cli.command('migrate-inventory-keys')
+def migrate_inventory_keys():
+    with db_transaction() as cursor:
+        cursor.execute("SELECT user_id, item_type, item_id, MIN(id) AS keep_id, SUM(quantity) AS quantity FROM inventory GROUP BY user_id, item_type, item_id HAVING COUNT(*) > 1")
+        duplicates = cursor.fetchall()
+        for row in duplicates:
+            cursor.execute("UPDATE inventory SET quantity=%s WHERE id=%s", (row['quantity'], row['keep_id']))
+            cursor.execute("DELETE FROM inventory WHERE user_id=%s AND item_type=%s AND item_id=%s AND id <> %s", (row['user_id'], row['item_type'], row['item_id'], row['keep_id']))
+    print(f"Merged {len(duplicates)} duplicated inventory stacks. Run `flask migrate` to add the unique key.")
+
+@app.cli.command('migrate-weather-effects')
+def migrate_weather_effects():
+    require_migration('0002_fruit_weather_effects')
+    last_id, migrated = 0, 0
+    while True:
+        fruits = db_fetch_all("SELECT id, weather_effects FROM user_fruits WHERE id > %s AND harvested=FALSE AND weather_effects IS NOT NULL ORDER BY id LIMIT 1000", (last_id,))
+        if not fruits:
+            break
+        last_id = fruits[-1]['id']
+        effects = {}
+        for fruit in fruits:
+            try:
+                for effect in json.loads(fruit['weather_effects'] or '[]'):
+                    applied_at = int(datetime.fromisoformat(effect['applied_at']).timestamp())
+                    key = (fruit['id'], effect['weather_id'])
+                    effects[key] = max(applied_at, effects.get(key, applied_at))
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"Skipping unreadable weather_effects on fruit {fruit['id']}: {e}")
+        placeholders = ', '.join(['%s'] * len(fruits))
+        with db_transaction() as cursor:
+            cursor.execute(f"DELETE FROM fruit_weather_effects WHERE fruit_id IN ({placeholders})", tuple(f['id'] for f in fruits))
+            if effects:
+                cursor.executemany("INSERT INTO fruit_weather_effects (fruit_id, weather_id, applied_at) VALUES (%s, %s, %s)", [(fruit_id, weather_id, applied_at) for (fruit_id, weather_id), applied_at in effects.items()])
+        migrated += len(effects)
+    print(f"Migrated {migrated} weather effects into fruit_weather_effects.")
+
+@app.cli.command('weather-schedule')
+@click.option('--hours', default=24, help='How far ahead to print.')
+def print_weather_schedule(hours):
+    for starts_at, names in weather_schedule(datetime.now(), hours * 3600 // app.config['WEATHER_EPOCH_SECONDS']):
+        print(f"{starts_at.isoformat(timespec='minutes')}  {', '.join(names) or 'Clear'}")
+
+@app.cli.command('reload-catalog')
+def reload_catalog():
+    require_migration('0004_cache_invalidations')
+    db_execute("INSERT INTO cache_invalidations (origin, user_id, event, created_at) VALUES (%s, NULL, 'catalog_changed', %s)", (worker_id(), int(time.time())), commit=True)
+    print(f"Catalog {CATALOG_VERSION} published; workers running with PLANT_GAME_MULTI_WORKER=1 reload it within {app.config['CACHE_SYNC_INTERVAL_SECONDS']}s. Send SIGHUP to reload a single-process server.")
+
+load_asset_manifest()
+try:
+    load_game_data()
+except Exception as e:
+    print(f"❌ Could not load game data: {e}. Run `flask migrate` and fill the catalog tables.")
 
 if __name__ == '__main__':
+    start_background_jobs()
     app.run(debug=True, port=5000, use_reloader=False)
@@ -0,0 +1,236 @@
+import asyncio
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from flask import g
+from itsdangerous import BadSignature
+from werkzeug.http import parse_etags
+try:
+    import aiomysql
+except ImportError:
+    aiomysql = None
+try:
+    import aiosqlite
+except ImportError:
+    aiosqlite = None
+
+import app as game
+
+class PooledWsgiToAsgiInstance(WsgiToAsgiInstance):
+    async def run_wsgi_app(self, body):
+        await sync_to_async(self.run_wsgi_app_in_thread, thread_sensitive=False)(body)
+
+    def run_wsgi_app_in_thread(self, body):
+        try:
+            environ = self.build_environ(self.scope, body)
+        except ValueError:
+            self.sync_send({'type': 'http.response.start', 'status': 400, 'headers': [(b'content-type', b'text/plain')]})
+            self.sync_send({'type': 'http.response.body', 'body': b'Bad Request: Too many duplicate headers'})
+            return
+        with closing(self.wsgi_application(environ, self.start_response)) as outputs:
+            for output in outputs:
+                if not self.response_started:
+                    self.response_started = True
+                    self.sync_send(self.response_start)
+                self.sync_send({'type': 'http.response.body', 'body': output, 'more_body': True})
+        if not self.response_started:
+            self.response_started = True
+            self.sync_send(self.response_start)
+        self.sync_send({'type': 'http.response.body'})
+
+class PooledWsgiToAsgi(WsgiToAsgi):
+    async def __call__(self, scope, receive, send):
+        await PooledWsgiToAsgiInstance(self.wsgi_application)(scope, receive, send)
+
+class AioMySQLDatabase:
+    def __init__(self, config):
+        self.size = config['DB_ASYNC_POOL_SIZE']
+        self.pool = None
+
+    async def start(self):
+        if aiomysql is None:
+            raise RuntimeError("The async MySQL backend needs aiomysql (pip install aiomysql).")
+        config = game.DB_CONFIG
+        self.pool = await aiomysql.create_pool(host=config['host'], user=config['user'], password=config['password'], db=config['database'], minsize=1, maxsize=self.size, autocommit=True)
+
+    async def close(self):
+        self.pool.close()
+        await self.pool.wait_closed()
+
+    async def fetch_all(self, query, params=()):
+        async with self.pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(query, params)
+                return list(await cursor.fetchall())
+
+class AioSQLiteDatabase:
+    def __init__(self, config):
+        self.path = config['DB_SQLITE_PATH']
+        self.size = config['DB_ASYNC_POOL_SIZE']
+        self.idle = None
+
+    async def start(self):
+        if aiosqlite is None:
+            raise RuntimeError("The async SQLite backend needs aiosqlite (pip install aiosqlite).")
+        self.idle = asyncio.Queue()
+        for _ in range(self.size):
+            conn = await aiosqlite.connect(self.path, timeout=30, isolation_level=None, detect_types=sqlite3.PARSE_DECLTYPES)
+            conn.row_factory = sqlite3.Row
+            self.idle.put_nowait(conn)
+
+    async def close(self):
+        while not self.idle.empty():
+            await self.idle.get_nowait().close()
+
+    async def fetch_all(self, query, params=()):
+        conn = await self.idle.get()
+        try:
+            async with conn.execute(game.sqlite_query(query), params) as cursor:
+                return [dict(row) for row in await cursor.fetchall()]
+        finally:
+            self.idle.put_nowait(conn)
+
+ASYNC_DATABASES = {
+    'mysql': AioMySQLDatabase,
+    'sqlite': AioSQLiteDatabase,
+}
+
+DATABASE = ASYNC_DATABASES[game.app.config['DB_BACKEND']](game.app.config)
+SESSION_SERIALIZER = game.app.session_interface.get_signing_serializer(game.app)
+SESSION_MAX_AGE = int(game.app.permanent_session_lifetime.total_seconds())
+FLASK_APP = PooledWsgiToAsgi(game.app)
+
+async def db_fetch_all(query, params=()):
+    started = time.perf_counter()
+    failed = True
+    try:
+        rows = await DATABASE.fetch_all(query, params)
+        failed = False
+        return rows
+    finally:
+        if game.INSTRUMENTATION.enabled:
+            game.INSTRUMENTATION.record_query(query, time.perf_counter() - started, failed)
+
+def session_user_id(headers):
+    morsel = SimpleCookie(headers.get(b'cookie', b'').decode('latin-1')).get(game.app.config['SESSION_COOKIE_NAME'])
+    if not morsel:
+        return None
+    try:
+        return SESSION_SERIALIZER.loads(morsel.value, max_age=SESSION_MAX_AGE).get('user_id')
+    except BadSignature:
+        return None
+
+async def send_response(send, response):
+    headers = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in response.headers.items()]
+    await send({'type': 'http.response.start', 'status': response.status_code, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': response.get_data()})
+
+def json_response(payload, status=200):
+    response = game.app.json.response(payload)
+    response.status_code = status
+    return response
+
+def materialize_game_updates(user_id):
+    with game.app.app_context():
+        g.db_pool = game.REQUEST_DB_POOL
+        g.db_conn = g.db_pool.acquire()
+        game.perform_game_updates(user_id)
+
+async def build_game_snapshot(user_id, now):
+    generation = game.game_state_generation(user_id)
+    rows = await db_fetch_all(game.SNAPSHOT_PLOTS_QUERY, (user_id,))
+    if not rows:
+        return None
+    items = await db_fetch_all(game.SNAPSHOT_ITEMS_QUERY, (user_id, user_id, user_id))
+    return game.assemble_game_snapshot(user_id, generation, rows, items, now)
+
+async def get_game_state(scope, receive, send, user_id):
+    now = datetime.now()
+    snapshot = game.cached_game_snapshot(user_id, now)
+    if not snapshot:
+        await asyncio.get_running_loop().run_in_executor(None, materialize_game_updates, user_id)
+        snapshot = await build_game_snapshot(user_id, now)
+    if not snapshot:
+        response = json_response({'success': False, 'message': 'User not found'}, 404)
+        response.delete_cookie(game.app.config['SESSION_COOKIE_NAME'], path=game.app.config['SESSION_COOKIE_PATH'] or '/', httponly=True)
+        return await send_response(send, response)
+    args = parse_qs(scope['query_string'].decode('latin-1'))
+    payload = game.game_state_payload(snapshot, now, args.get('since', [''])[0], args.get('catalog', [None])[0])
+    await send_response(send, json_response(payload))
+
+async def get_catalog(scope, receive, send, headers):
+    response = game.app.response_class(game.CATALOG_RESPONSE_BODY, mimetype='application/json')
+    response.set_etag(game.CATALOG_VERSION)
+    response.cache_control.no_cache = True
+    if parse_etags(headers.get(b'if-none-match', b'').decode('latin-1')).contains(game.CATALOG_VERSION):
+        response.status_code = 304
+        response.set_data(b'')
+    await send_response(send, response)
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+async def game_events(scope, receive, send, user_id):
+    loop = asyncio.get_running_loop()
+    wake = asyncio.Event()
+    notify = lambda: loop.call_soon_threadsafe(wake.set)
+    channel, seen = game.GAME_EVENTS.subscribe(user_id, notify)
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [(b'content-type', b'text/event-stream; charset=utf-8'), (b'cache-control', b'no-cache'), (b'x-accel-buffering', b'no')]})
+        await send({'type': 'http.response.body', 'body': b'retry: 5000\n\n', 'more_body': True})
+        while True:
+            woken = asyncio.ensure_future(wake.wait())
+            done, _ = await asyncio.wait({woken, disconnected}, timeout=game.app.config['EVENT_STREAM_HEARTBEAT_SECONDS'], return_when=asyncio.FIRST_COMPLETED)
+            woken.cancel()
+            if disconnected in done:
+                return
+            wake.clear()
+            events, seen = game.GAME_EVENTS.pending(channel, seen)
+            if events or woken not in done:
+                await send({'type': 'http.response.body', 'body': game.encode_game_events(events).encode(), 'more_body': True})
+    finally:
+        disconnected.cancel()
+        game.GAME_EVENTS.unsubscribe(user_id, channel, notify)
+
+ASYNC_ROUTES = {
+    '/api/get_game_state': get_game_state,
+    '/api/update_game': get_game_state,
+    '/api/events': game_events,
+}
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(game.app.config['ASGI_SYNC_THREADS']))
+            await DATABASE.start()
+            game.start_background_jobs()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await DATABASE.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http' or scope['method'] != 'GET':
+        return await FLASK_APP(scope, receive, send)
+    headers = dict(scope['headers'])
+    if scope['path'] == '/api/catalog':
+        return await get_catalog(scope, receive, send, headers)
+    route = ASYNC_ROUTES.get(scope['path'])
+    if route is None:
+        return await FLASK_APP(scope, receive, send)
+    user_id = session_user_id(headers)
+    if not user_id:
+        return await send_response(send, json_response({'success': False, 'message': 'Authentication Required'}, 401))
+    await route(scope, receive, send, user_id)
@@ -0,0 +1,760 @@
+import argparse
+import http.client
+import http.cookiejar
+import json
+import math
+import os
+import random
+import re
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter
+from datetime import datetime, timedelta
+
+BENCH_PASSWORD = 'bench-password'
+SETUP_ENDPOINTS = ('/api/login', '/api/catalog', '/api/get_game_state')
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+SQLITE_SCHEMA_TYPES = {'auto_id': 'INTEGER PRIMARY KEY AUTOINCREMENT', 'timestamp': 'TIMESTAMP'}
+
+CATALOG = {
+    'plant_types': [
+        (1, 'Carrot', 'carrot', 10, 1.0, 4, 'single_harvest', 30),
+        (2, 'Cabbage', 'cabbage', 20, 1.5, 4, 'single_harvest', 40),
+        (3, 'Mango', 'mango', 50, 2.0, 20, 'perennial', 20),
+        (4, 'Banana', 'banana', 80, 2.5, 20, 'perennial', 25),
+        (5, 'Coconut', 'coconut', 120, 3.0, 20, 'perennial', 30),
+    ],
+    'fertilizer_types': [
+        (1, 'Regular Fertilizer', 50, 'growth_boost', 0.25),
+        (2, 'Good Fertilizer', 100, 'growth_boost', 0.5),
+        (3, 'Premium Fertilizer', 200, 'growth_boost', 1.0),
+        (4, 'Fruit Size Booster', 150, 'fruit_size_boost', 0.5),
+        (5, 'Special Color Booster', 300, 'fruit_color_boost', 0.5),
+        (6, 'Dual-Color Elixir', 500, 'dual_color_boost', 0.8),
+        (7, 'Tri-Color Catalyst', 800, 'tri_color_boost', 0.9),
+    ],
+    'fruit_types': [
+        (plant_id * 8 - 7 + i, plant_id, name, name.lower().replace(' ', '_'), rarity, multiplier)
+        for plant_id in range(1, 6)
+        for i, (name, rarity, multiplier) in enumerate([
+            ('Normal', 0.60, 1.0), ('Golden', 0.10, 2.0), ('Rainbow', 0.08, 3.0), ('Black', 0.07, 2.5),
+            ('Golden Rainbow', 0.05, 5.0), ('Golden Black', 0.04, 4.5), ('Rainbow Black', 0.04, 6.0), ('Golden Rainbow Black', 0.02, 10.0),
+        ])
+    ],
+    'weather_types': [
+        (1, 'Rain', 0.5, 0.3, 1.5, 'weather_rain.png'),
+        (2, 'Snow', 0.3, 0.2, 2.0, 'weather_snow.png'),
+        (3, 'Storm', 0.2, 0.1, 3.0, 'weather_storm.png'),
+    ],
+    'weather_combinations': [
+        (1, 'Rain + Snow', '[1, 2]', 3.5, 'weather_combo_rain_snow.png'),
+        (2, 'Rain + Storm', '[1, 3]', 5.0, 'weather_combo_rain_storm.png'),
+        (3, 'Snow + Storm', '[2, 3]', 6.0, 'weather_combo_snow_storm.png'),
+        (4, 'Rain + Snow + Storm', '[1, 2, 3]', 10.0, 'weather_combo_rain_snow_storm.png'),
+    ],
+}
+
+EXPLAIN_FULL_PASSES = {
+    'SELECT DISTINCT user_id FROM user_plots WHERE plant_type_id IS NOT NULL': 'the world tick visits every planted user once per run',
+}
+
+SPAWN_CHECK_EFFECTS = (
+    (),
+    ('tri_color_boost',),
+    ('dual_color_boost',),
+    ('fruit_color_boost',),
+    ('fruit_size_boost', 'fruit_color_boost'),
+    ('dual_color_boost', 'fruit_color_boost'),
+    ('tri_color_boost', 'dual_color_boost', 'fruit_color_boost'),
+)
+
+def apply_sqlite_migrations(conn):
+    versions = sorted(name[:-4] for name in os.listdir(MIGRATIONS_DIR) if name.endswith('.sql'))
+    for version in versions:
+        with open(os.path.join(MIGRATIONS_DIR, f'{version}.sql')) as f:
+            conn.executescript(f.read().format(**SQLITE_SCHEMA_TYPES))
+    conn.execute("CREATE TABLE schema_migrations (version VARCHAR(255) PRIMARY KEY, applied_at INTEGER NOT NULL)")
+    conn.executemany("INSERT INTO schema_migrations (version, applied_at) VALUES (?, ?)", [(version, int(time.time())) for version in versions])
+
+def create_sqlite_database(path, users, plots, fruits, seed):
+    from werkzeug.security import generate_password_hash
+    if os.path.exists(path):
+        os.remove(path)
+    rng = random.Random(seed)
+    now = datetime.now()
+    conn = sqlite3.connect(path)
+    apply_sqlite_migrations(conn)
+    for table, rows in CATALOG.items():
+        conn.executemany(f"INSERT INTO {table} VALUES ({', '.join(['?'] * len(rows[0]))})", rows)
+    plants = {row[0]: row for row in CATALOG['plant_types']}
+    fruit_types = {plant_id: [row[0] for row in CATALOG['fruit_types'] if row[1] == plant_id] for plant_id in plants}
+    password = generate_password_hash(BENCH_PASSWORD, method='pbkdf2:sha256:1000')
+    conn.executemany("INSERT INTO users (id, username, password, money) VALUES (?, ?, ?, ?)", [(u, f'bench{u}', password, 100000) for u in range(1, users + 1)])
+    plot_rows, fruit_rows, effect_rows, inventory_rows = [], [], [], []
+    plot_id, fruit_id = 0, 0
+    for user_id in range(1, users + 1):
+        for plot_number in range(1, plots + 1):
+            plot_id += 1
+            plant_id = rng.choice(list(plants)) if rng.random() < 0.9 else None
+            planted_at = now - timedelta(seconds=rng.randint(0, 3600)) if plant_id else None
+            plot_rows.append((plot_id, user_id, plot_number, plant_id, 1 if plant_id else 0, planted_at, planted_at))
+            if plant_id and plants[plant_id][6] == 'perennial':
+                for _ in range(rng.randint(0, 3)):
+                    fruit_id += 1
+                    fruit_rows.append((fruit_id, user_id, plot_id, rng.choice(fruit_types[plant_id]), round(rng.uniform(0.5, 2.0), 2), now - timedelta(seconds=rng.randint(0, 600))))
+        for _ in range(fruits):
+            fruit_id += 1
+            plant_id = rng.choice(list(plants))
+            fruit_rows.append((fruit_id, user_id, None, rng.choice(fruit_types[plant_id]), round(rng.uniform(0.5, 2.0), 2), now - timedelta(seconds=rng.randint(0, 86400))))
+            if rng.random() < 0.2:
+                effect_rows.append((fruit_id, rng.randint(1, 3), int(now.timestamp()) - rng.randint(0, 240)))
+        inventory_rows.append((user_id, 'seed', rng.choice(list(plants)), rng.randint(1, 5)))
+        inventory_rows.append((user_id, 'fertilizer', rng.randint(1, 7), 1))
+    conn.executemany("INSERT INTO user_plots (id, user_id, plot_number, plant_type_id, growth_stage, planted_at, last_growth_update) VALUES (?, ?, ?, ?, ?, ?, ?)", plot_rows)
+    conn.executemany("INSERT INTO user_fruits (id, user_id, plot_id, fruit_type_id, weight, created_at, harvested) VALUES (?, ?, ?, ?, ?, ?, 0)", fruit_rows)
+    conn.executemany("INSERT INTO fruit_weather_effects (fruit_id, weather_id, applied_at) VALUES (?, ?, ?)", effect_rows)
+    conn.executemany("INSERT INTO inventory (user_id, item_type, item_id, quantity) VALUES (?, ?, ?, ?)", inventory_rows)
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    print(f"Seeded {path}: {users} users, {len(plot_rows)} plots, {len(fruit_rows)} fruits, {len(effect_rows)} weather effects.", file=sys.stderr)
+
+class QueryCounter:
+    def __init__(self, backend):
+        self._local = threading.local()
+        self.total = 0
+        self.statements = {}
+        self._lock = threading.Lock()
+        original = backend.cursor
+
+        def counting_cursor(conn, dictionary=False):
+            return _CountingCursor(original(conn, dictionary), self)
+        backend.cursor = counting_cursor
+
+    def add(self, query, params):
+        self.statements.setdefault(query, params)
+        self._local.count = getattr(self._local, 'count', 0) + 1
+        with self._lock:
+            self.total += 1
+
+    def reset(self):
+        self._local.count = 0
+
+    def count(self):
+        return getattr(self._local, 'count', 0)
+
+class _CountingCursor:
+    def __init__(self, cursor, counter):
+        self._cursor = cursor
+        self._counter = counter
+
+    def __enter__(self):
+        self._cursor.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._cursor.__exit__(*exc)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def execute(self, query, params=()):
+        self._counter.add(query, params)
+        return self._cursor.execute(query, params)
+
+    def executemany(self, query, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        self._counter.add(query, seq_of_params[0] if seq_of_params else None)
+        return self._cursor.executemany(query, seq_of_params)
+
+class InProcessClient:
+    def __init__(self, game_app, counter):
+        self._client = game_app.test_client()
+        self._counter = counter
+
+    def call(self, method, path, body=None):
+        self._counter.reset()
+        started = time.perf_counter()
+        response = self._client.open(path, method=method, json=body)
+        elapsed = time.perf_counter() - started
+        return response.status_code, response.get_json(silent=True), elapsed, self._counter.count()
+
+class HTTPClient:
+    def __init__(self, base_url):
+        self._base_url = base_url.rstrip('/')
+        self._cookies = http.cookiejar.CookieJar()
+        self._opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self._cookies))
+
+    def call(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self._base_url + path, data=data, method=method, headers={'Content-Type': 'application/json'} if data else {})
+        started = time.perf_counter()
+        try:
+            with self._opener.open(req, timeout=30) as response:
+                status, raw = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, raw = e.code, e.read()
+        elapsed = time.perf_counter() - started
+        try:
+            payload = json.loads(raw) if raw else None
+        except ValueError:
+            payload = None
+        return status, payload, elapsed, None
+
+    def open_stream(self, path):
+        return EventStream(self._base_url + path, '; '.join(f'{c.name}={c.value}' for c in self._cookies))
+
+class EventStream:
+    def __init__(self, url, cookie):
+        parts = urllib.parse.urlsplit(url)
+        self.events = 0
+        self._conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+        self._conn.request('GET', parts.path, headers={'Cookie': cookie, 'Accept': 'text/event-stream'})
+        self._sock = self._conn.sock
+        response = self._conn.getresponse()
+        if response.status != 200:
+            self.close()
+            raise RuntimeError(f'event stream refused ({response.status})')
+        self._thread = threading.Thread(target=self._read, args=(response,), daemon=True)
+        self._thread.start()
+
+    def _read(self, response):
+        try:
+            for line in response:
+                if line.startswith(b'event:'):
+                    self.events += 1
+        except Exception:
+            pass
+
+    def close(self):
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._conn.close()
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+
+    def record(self, endpoint, status, elapsed, queries):
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append((status, elapsed, queries))
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)]
+
+def summarize(values):
+    values = sorted(values)
+    return {
+        'count': len(values),
+        'mean_ms': round(sum(values) / len(values) * 1000, 3) if values else None,
+        'p50_ms': round(percentile(values, 50) * 1000, 3) if values else None,
+        'p95_ms': round(percentile(values, 95) * 1000, 3) if values else None,
+        'p99_ms': round(percentile(values, 99) * 1000, 3) if values else None,
+        'max_ms': round(values[-1] * 1000, 3) if values else None,
+    }
+
+class Player:
+    def __init__(self, client, username, recorder, rng, action_rate):
+        self.client = client
+        self.username = username
+        self.recorder = recorder
+        self.rng = rng
+        self.action_rate = action_rate
+        self.state = {}
+        self.state_version = ''
+        self.catalog_version = ''
+
+    def call(self, endpoint, body=None, method='POST'):
+        path = f'{endpoint}?catalog={self.catalog_version}&since={self.state_version}' if endpoint.startswith('/api/') and endpoint not in ('/api/login', '/api/catalog') else endpoint
+        status, payload, elapsed, queries = self.client.call(method, path, body)
+        self.recorder.record(endpoint, status, elapsed, queries)
+        if payload and payload.get('success') and 'state' in payload:
+            self.state.update(payload['state'])
+            self.state_version = payload.get('state_version', self.state_version)
+        return status, payload
+
+    def login(self):
+        status, _ = self.call('/api/login', {'username': self.username, 'password': BENCH_PASSWORD})
+        if status != 200:
+            raise RuntimeError(f'login failed for {self.username} ({status})')
+        _, catalog = self.call('/api/catalog', method='GET')
+        self.catalog_version = (catalog or {}).get('catalog_version', '')
+        self.call('/api/get_game_state', method='GET')
+
+    def poll(self):
+        self.call('/api/update_game', method='GET')
+
+    def act(self):
+        if self.rng.random() >= self.action_rate:
+            return
+        plots = self.state.get('plots', [])
+        inventory = self.state.get('inventory', [])
+        plot_fruits = [f for p in plots for f in p.get('fruits', [])]
+        inventory_fruits = self.state.get('inventory_fruits', [])
+        empty_plots = [p for p in plots if not p.get('plant_type_id')]
+        seeds = [i for i in inventory if i['item_type'] == 'seed']
+        actions = []
+        if plot_fruits:
+            actions.append(lambda: self.call('/api/harvest_fruits', {'fruit_ids': [self.rng.choice(plot_fruits)['id']]}))
+        if len(plot_fruits) > 1:
+            actions.append(lambda: self.call('/api/harvest_fruits', {'all': True}))
+        if inventory_fruits:
+            actions.append(lambda: self.call('/api/sell_fruits', {'fruit_ids': [f['id'] for f in inventory_fruits[:10]]}))
+        if empty_plots and seeds:
+            actions.append(lambda: self.call('/api/plant_seed', {'inventory_id': seeds[0]['id'], 'plot_id': empty_plots[0]['id']}))
+        actions.append(lambda: self.call('/api/buy_item', {'item_type': 'seed', 'item_id': self.rng.randint(1, 5)}))
+        self.rng.choice(actions)()
+
+def run_player(player, deadline, poll_interval, errors, streams=None):
+    stream = None
+    try:
+        player.login()
+        if streams is not None:
+            stream = player.client.open_stream('/api/events')
+            streams.append(stream)
+        next_poll = time.monotonic() + player.rng.uniform(0, poll_interval)
+        while True:
+            delay = next_poll - time.monotonic()
+            if next_poll >= deadline:
+                break
+            if delay > 0:
+                time.sleep(delay)
+            player.poll()
+            player.act()
+            next_poll += poll_interval
+    except Exception as e:
+        errors.append(f'{player.username}: {e!r}')
+    finally:
+        if stream:
+            stream.close()
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def time_world_tick(game_app, counter, runs):
+    durations, queries, phases = [], [], {}
+    for _ in range(runs):
+        before = counter.total
+        started = time.perf_counter()
+        game_app.run_global_game_updates()
+        durations.append(time.perf_counter() - started)
+        queries.append(counter.total - before)
+        for name, seconds in game_app.LAST_WORLD_TICK_STATS.get('phases', {}).items():
+            phases.setdefault(name, []).append(seconds)
+    result = summarize(durations)
+    result['queries_mean'] = round(sum(queries) / len(queries), 2) if queries else None
+    result['phases'] = {name: summarize(values) for name, values in phases.items()}
+    return result
+
+def run_load(game_app, counter, args):
+    recorder, errors = Recorder(), []
+    rng = random.Random(args.seed)
+    players = [
+        Player(HTTPClient(args.url) if args.url else InProcessClient(game_app.app, counter), f'bench{u}', recorder, random.Random(rng.random()), args.action_rate)
+        for u in rng.sample(range(1, args.users + 1), args.players)
+    ]
+    started = time.monotonic()
+    deadline = started + args.duration
+    threads = [threading.Thread(target=run_player, args=(p, deadline, args.poll_interval, errors), daemon=True) for p in players]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall_seconds = time.monotonic() - started
+
+    endpoints = {}
+    all_latencies, all_queries = [], []
+    for endpoint, samples in sorted(recorder.samples.items()):
+        latencies = [s[1] for s in samples]
+        queries = [s[2] for s in samples if s[2] is not None]
+        if endpoint not in SETUP_ENDPOINTS:
+            all_latencies += latencies
+            all_queries += queries
+        endpoints[endpoint] = summarize(latencies)
+        endpoints[endpoint]['errors'] = sum(1 for s in samples if s[0] >= 500)
+        endpoints[endpoint]['queries_mean'] = round(sum(queries) / len(queries), 2) if queries else None
+    results = {
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'config': vars(args),
+        'requests': {
+            **summarize(all_latencies),
+            'throughput_rps': round(len(all_latencies) / wall_seconds, 2) if wall_seconds else None,
+            'queries_mean': round(sum(all_queries) / len(all_queries), 2) if all_queries else None,
+            'wall_seconds': round(wall_seconds, 3),
+            'player_errors': errors,
+        },
+        'endpoints': endpoints,
+    }
+    if game_app:
+        results['world_tick'] = time_world_tick(game_app, counter, args.tick_runs)
+        results['db_pools'] = game_app.db_pool_metrics()
+    return results
+
+def run_scaling(args):
+    cores = args.server_cores or os.cpu_count()
+    levels = []
+    for url in [args.url] + (args.compare_url or []):
+        for connections in args.connections:
+            levels.append(run_scaling_level(url, connections, cores, args))
+    return {
+        'revision': git_revision(),
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'config': {k: v for k, v in vars(args).items() if k in ('connections', 'duration', 'poll_interval', 'action_rate', 'seed')},
+        'server_cores': cores,
+        'scaling': levels,
+    }
+
+def run_scaling_level(url, connections, cores, args):
+    recorder, errors, streams = Recorder(), [], []
+    rng = random.Random(args.seed)
+    players = [Player(HTTPClient(url), f'bench{u}', recorder, random.Random(rng.random()), args.action_rate) for u in range(1, connections + 1)]
+    started = time.monotonic()
+    deadline = started + args.duration
+    threads = [threading.Thread(target=run_player, args=(p, deadline, args.poll_interval, errors, streams), daemon=True) for p in players]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall_seconds = time.monotonic() - started
+    samples = [s for endpoint, values in recorder.samples.items() if endpoint not in SETUP_ENDPOINTS for s in values]
+    result = summarize([s[1] for s in samples])
+    result.update({
+        'url': url,
+        'connections': connections,
+        'event_streams': len(streams),
+        'events_received': sum(s.events for s in streams),
+        'wall_seconds': round(wall_seconds, 3),
+        'throughput_rps': round(len(samples) / wall_seconds, 2) if wall_seconds else None,
+        'throughput_rps_per_core': round(len(samples) / wall_seconds / cores, 2) if wall_seconds else None,
+        'status_counts': {str(code): sum(1 for s in samples if s[0] == code) for code in sorted({s[0] for s in samples})},
+        'player_errors': errors,
+    })
+    return result
+
+def run_contention(game_app, args):
+    usernames = [f'bench{n}' for n in range(1, min(args.users, args.players) + 1)]
+    seed_price = game_app.PLANT_TYPES[1]['seed_price']
+    affordable = max(1, args.threads // 2)
+    for username in usernames:
+        game_app.app.test_client().post('/api/register', json={'username': username, 'password': BENCH_PASSWORD})
+    fruit_ids = {}
+    with game_app.db_transaction() as cursor:
+        cursor.execute(f"SELECT id, username FROM users WHERE username IN ({', '.join(['%s'] * len(usernames))})", tuple(usernames))
+        users = {row['username']: row['id'] for row in cursor.fetchall()}
+        placeholders = ', '.join(['%s'] * len(users))
+        cursor.execute(f"UPDATE users SET money=%s WHERE id IN ({placeholders})", (affordable * seed_price, *users.values()))
+        cursor.execute(f"DELETE FROM inventory WHERE item_type='seed' AND item_id=1 AND user_id IN ({placeholders})", tuple(users.values()))
+        for user_id in users.values():
+            cursor.execute("SELECT id FROM user_plots WHERE user_id=%s AND plot_number=1", (user_id,))
+            plot_id = cursor.fetchone()['id']
+            cursor.execute("UPDATE user_fruits SET plot_id=NULL, harvested=1 WHERE plot_id=%s", (plot_id,))
+            cursor.execute("UPDATE user_plots SET plant_type_id=3, growth_stage=20, planted_at=%s WHERE id=%s", (datetime.now() - timedelta(days=1), plot_id))
+            cursor.execute("INSERT INTO user_fruits (user_id, plot_id, fruit_type_id, weight, created_at, harvested) VALUES (%s, %s, 17, 1.0, %s, 0)", (user_id, plot_id, datetime.now()))
+            cursor.execute("SELECT id FROM user_fruits WHERE plot_id=%s AND harvested=0", (plot_id,))
+            fruit_ids[user_id] = cursor.fetchone()['id']
+    game_app.invalidate_game_state(*users.values())
+
+    outcomes = {user_id: {'buy_ok': 0, 'buy_rejected': 0, 'harvest_ok': 0, 'errors': 0} for user_id in users.values()}
+    lock = threading.Lock()
+    barrier = threading.Barrier(len(users) * args.threads)
+
+    def hammer(username, user_id):
+        client = game_app.app.test_client()
+        client.post('/api/login', json={'username': username, 'password': BENCH_PASSWORD})
+        barrier.wait()
+        buys = [client.post('/api/buy_item', json={'item_type': 'seed', 'item_id': 1}).status_code for _ in range(2)]
+        harvest = client.post('/api/harvest_fruit', json={'fruit_id': fruit_ids[user_id]}).status_code
+        with lock:
+            outcome = outcomes[user_id]
+            outcome['errors'] += sum(1 for status in buys + [harvest] if status >= 500)
+            outcome['buy_ok'] += buys.count(200)
+            outcome['buy_rejected'] += sum(1 for status in buys if 400 <= status < 500)
+            outcome['harvest_ok'] += harvest == 200
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=hammer, args=item) for item in users.items() for _ in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall_seconds = time.monotonic() - started
+
+    violations = []
+    for user_id, outcome in outcomes.items():
+        money = game_app.db_fetch_one("SELECT money FROM users WHERE id=%s", (user_id,))['money']
+        stacks = [row['quantity'] for row in game_app.db_fetch_all("SELECT quantity FROM inventory WHERE user_id=%s AND item_type='seed' AND item_id=1", (user_id,))]
+        if money < 0:
+            violations.append(f'user {user_id}: money went negative ({money})')
+        if money != (affordable - outcome['buy_ok']) * seed_price:
+            violations.append(f"user {user_id}: money {money} does not match {outcome['buy_ok']} successful purchases")
+        if outcome['buy_ok'] > affordable:
+            violations.append(f"user {user_id}: bought {outcome['buy_ok']} seeds but could afford {affordable}")
+        if len(stacks) > 1 or sum(stacks) != outcome['buy_ok']:
+            violations.append(f"user {user_id}: inventory stacks {stacks} do not match {outcome['buy_ok']} purchases")
+        if outcome['harvest_ok'] != 1:
+            violations.append(f"user {user_id}: fruit harvested {outcome['harvest_ok']} times")
+        if outcome['errors']:
+            violations.append(f"user {user_id}: {outcome['errors']} server errors")
+    return {
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'config': vars(args),
+        'contention': {
+            'backend': game_app.app.config['DB_BACKEND'],
+            'users': len(users),
+            'threads_per_user': args.threads,
+            'wall_seconds': round(wall_seconds, 3),
+            'purchases': sum(o['buy_ok'] for o in outcomes.values()),
+            'rejected_purchases': sum(o['buy_rejected'] for o in outcomes.values()),
+            'violations': violations,
+        },
+    }
+
+def exercise_every_endpoint(game_app, user_id):
+    client = game_app.app.test_client()
+    client.post('/api/register', json={'username': f'explain{time.time_ns()}', 'password': BENCH_PASSWORD})
+    client.post('/api/login', json={'username': f'bench{user_id}', 'password': BENCH_PASSWORD})
+    client.get('/api/check_session')
+    client.get('/api/catalog')
+    state = lambda: client.get('/api/get_game_state').get_json()['state']
+    plots = state()['plots']
+    plot_fruits = [f for p in plots for f in p.get('fruits', [])]
+    if plot_fruits:
+        client.post('/api/harvest_fruit', json={'fruit_id': plot_fruits[0]['id']})
+    client.post('/api/harvest_fruits', json={'all': True})
+    client.post('/api/sell_fruits', json={'fruit_ids': [f['id'] for f in state()['inventory_fruits'][:10]]})
+    for plot in plots[:2]:
+        client.post('/api/dig_up_plant', json={'plot_id': plot['id']})
+    for item_type, item_id in (('seed', 1), ('seed', 1), ('seed', 1), ('fertilizer', 1), ('fertilizer', 1), ('fertilizer', 1)):
+        client.post('/api/buy_item', json={'item_type': item_type, 'item_id': item_id})
+    client.post('/api/buy_plot', json={'plot_number': 2})
+    inventory = state()['inventory']
+    seed = next(i['id'] for i in inventory if i['item_type'] == 'seed' and i['item_id'] == 1)
+    fertilizer = next(i['id'] for i in inventory if i['item_type'] == 'fertilizer' and i['item_id'] == 1)
+    client.post('/api/plant_seed', json={'inventory_id': seed, 'plot_id': plots[0]['id']})
+    client.post('/api/use_fertilizer', json={'inventory_id': fertilizer, 'plot_id': plots[0]['id']})
+    client.post('/api/plant_seeds', json={'plantings': [{'inventory_id': seed, 'plot_id': plots[1]['id']}]})
+    client.post('/api/use_fertilizers', json={'applications': [{'inventory_id': fertilizer, 'plot_id': plots[1]['id']}]})
+    client.get('/api/update_game')
+    client.get('/api/logout')
+
+def run_explain(game_app, counter, args):
+    game_app.app.config['MULTI_WORKER'] = True
+    exercise_every_endpoint(game_app, 1)
+    now = datetime.now()
+    for minute in (0, 1):
+        game_app.WORLD_TICK.run(now.replace(minute=minute))
+    game_app.run_global_game_updates()
+    game_app.sync_cache_invalidations()
+    game_app.archive_sold_fruits()
+    conn = sqlite3.connect(args.db)
+    tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    statements, full_scans, full_passes = [], [], []
+    for query, params in sorted(counter.statements.items()):
+        if params is None:
+            continue
+        plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + game_app.sqlite_query(query), params)]
+        aliases = {alias or table: table for table, alias in re.findall(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(\w+))?', query)}
+        scanned = [aliases.get(name, name) for name in (re.match(r'SCAN (\w+)', detail).group(1) for detail in plan if re.match(r'SCAN (\w+)', detail))]
+        entry = {'query': game_app.normalize_sql(query), 'plan': plan}
+        statements.append(entry)
+        if any(table in tables and table not in CATALOG for table in scanned):
+            if entry['query'] in EXPLAIN_FULL_PASSES:
+                full_passes.append(dict(entry, reason=EXPLAIN_FULL_PASSES[entry['query']]))
+            else:
+                full_scans.append(entry)
+    conn.close()
+    return {
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'config': vars(args),
+        'explain': {'backend': 'sqlite', 'statements': statements, 'full_scans': full_scans, 'allowed_full_passes': full_passes},
+    }
+
+def legacy_redistributed_weights(possible_fruits, steal_percentage, dual_pool_share, tri_pool_share):
+    normal_fruit = next((p for p in possible_fruits if 'normal' in p['image_suffix'].lower()), None)
+    if not normal_fruit:
+        return [p['rarity_rate'] for p in possible_fruits]
+    single_specials = [p for p in possible_fruits if p['image_suffix'].count('_') == 0 and 'normal' not in p['image_suffix'].lower()]
+    dual_specials = [p for p in possible_fruits if p['image_suffix'].count('_') == 1]
+    tri_specials = [p for p in possible_fruits if p['image_suffix'].count('_') == 2]
+    amount_to_redistribute = normal_fruit['rarity_rate'] * steal_percentage
+    new_weights_map = {normal_fruit['id']: normal_fruit['rarity_rate'] - amount_to_redistribute}
+    for fruit in single_specials:
+        new_weights_map[fruit['id']] = fruit['rarity_rate']
+    for pool, pool_share in ((dual_specials, dual_pool_share), (tri_specials, tri_pool_share)):
+        total_original_rate = sum(p['rarity_rate'] for p in pool)
+        for fruit in pool:
+            share = (fruit['rarity_rate'] / total_original_rate) if total_original_rate > 0 else (1 / len(pool))
+            new_weights_map[fruit['id']] = fruit['rarity_rate'] + amount_to_redistribute * pool_share * share
+    return [new_weights_map.get(p['id'], p['rarity_rate']) for p in possible_fruits]
+
+def legacy_spawn_weights(possible, effects, now):
+    active = lambda effect_type: effects.get(effect_type) and now < datetime.fromisoformat(effects[effect_type]['expiry'])
+    if active('tri_color_boost'):
+        return legacy_redistributed_weights(possible, 0.90, 0.20, 0.80)
+    if active('dual_color_boost'):
+        return legacy_redistributed_weights(possible, 0.80, 0.80, 0.20)
+    normal_fruit = next((f for f in possible if 'normal' in f['image_suffix'].lower()), None)
+    special_fruits = [f for f in possible if 'normal' not in f['image_suffix'].lower()]
+    if not (active('fruit_color_boost') and normal_fruit and special_fruits):
+        return [ft['rarity_rate'] for ft in possible]
+    amount_to_redistribute = normal_fruit['rarity_rate'] * effects['fruit_color_boost']['value']
+    total_special_original_rate = sum(f['rarity_rate'] for f in special_fruits)
+    new_weights_map = {normal_fruit['id']: normal_fruit['rarity_rate'] - amount_to_redistribute}
+    for fruit in special_fruits:
+        bonus = (amount_to_redistribute * (fruit['rarity_rate'] / total_special_original_rate)) if total_special_original_rate > 0 else 0
+        new_weights_map[fruit['id']] = fruit['rarity_rate'] + bonus
+    return [new_weights_map.get(p['id'], p['rarity_rate']) for p in possible]
+
+def run_spawn_check(game_app, args):
+    now = datetime.now()
+    table_rng, legacy_rng = random.Random(args.seed), random.Random(args.seed + 1)
+    effect_values = {f['effect_type']: f['effect_value'] for f in game_app.FERTILIZER_TYPES.values()}
+    combinations, mismatches = [], []
+    for plant_id in sorted(game_app.PLANT_TYPES):
+        possible = [ft for ft in game_app.FRUIT_TYPES.values() if ft['plant_type_id'] == plant_id]
+        for effect_types in SPAWN_CHECK_EFFECTS:
+            effects = {effect_type: {'expiry': (now + timedelta(minutes=10)).isoformat(), 'value': effect_values[effect_type]} for effect_type in effect_types}
+            plots = [{'id': i, 'user_id': 0, 'plant_type_id': plant_id, 'fertilizer_applied_effect': json.dumps(effects)} for i in range(args.spawn_rolls)]
+            table_counts = Counter(chosen['id'] for _, chosen, _ in game_app.roll_fruits(plots, now, table_rng))
+            weights = legacy_spawn_weights(possible, effects, now)
+            legacy_counts = Counter(legacy_rng.choices(possible, weights=weights, k=1)[0]['id'] for _ in range(args.spawn_rolls))
+            max_z = 0.0
+            for fruit_id in sorted(set(table_counts) | set(legacy_counts)):
+                pooled = (table_counts[fruit_id] + legacy_counts[fruit_id]) / (2 * args.spawn_rolls)
+                stderr = math.sqrt(2 * pooled * (1 - pooled) / args.spawn_rolls)
+                z = abs(table_counts[fruit_id] - legacy_counts[fruit_id]) / args.spawn_rolls / stderr if stderr else 0.0
+                max_z = max(max_z, z)
+                if z > args.spawn_z or fruit_id not in {ft['id'] for ft in possible}:
+                    mismatches.append({'plant_type_id': plant_id, 'effects': list(effect_types), 'fruit_type_id': fruit_id, 'tables': table_counts[fruit_id], 'legacy': legacy_counts[fruit_id], 'z': round(z, 2)})
+            combinations.append({'plant_type_id': plant_id, 'effects': list(effect_types), 'max_z': round(max_z, 2)})
+    return {
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'config': vars(args),
+        'spawn': {'rolls': args.spawn_rolls, 'combinations': combinations, 'mismatches': mismatches, 'max_z': max(c['max_z'] for c in combinations)},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed a database and load-test the plant game API and world tick.')
+    parser.add_argument('--db', default='bench.sqlite3', help='SQLite database to seed and benchmark against')
+    parser.add_argument('--backend', choices=('sqlite', 'mysql'), default='sqlite', help='mysql runs the contention scenario against the database from the PLANT_GAME_* settings instead of --db, so FOR UPDATE row locks are exercised rather than SQLite\'s single writer')
+    parser.add_argument('--no-seed', action='store_true', help='reuse the existing database instead of reseeding it')
+    parser.add_argument('--seed-only', action='store_true', help='seed --db and exit, to start servers for --url runs against it')
+    parser.add_argument('--url', help='drive a running server over HTTP instead of the in-process app')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--plots', type=int, default=4, help='plots per user')
+    parser.add_argument('--fruits', type=int, default=20, help='inventory fruits per user')
+    parser.add_argument('--players', type=int, default=50, help='concurrent simulated players')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds of simulated play')
+    parser.add_argument('--poll-interval', type=float, default=5.0, help='seconds between polls, as in game.js')
+    parser.add_argument('--action-rate', type=float, default=0.3, help='chance a poll is followed by a player action')
+    parser.add_argument('--tick-runs', type=int, default=5, help='timed run_global_game_updates calls (in-process only)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    parser.add_argument('--scenario', choices=('load', 'contention', 'scaling', 'explain', 'spawn'), default='load', help='spawn draws --spawn-rolls fruits per plant and fertilizer combination through the spawn tables and through the original weight redistribution, then fails if any outcome frequency differs by more than --spawn-z standard errors; explain calls every endpoint, the world tick and the sold fruit archive once, then fails if the SQLite plan of any statement they ran scans a table other than the catalog, directly or through an index, unless it is a listed full pass; contention fires concurrent purchases and harvests at the same users and checks the invariants, on SQLite (where BEGIN IMMEDIATE serializes writers and FOR UPDATE is stripped) unless --backend mysql; scaling holds an event stream per player against --url (and each --compare-url) at every --connections level')
+    parser.add_argument('--spawn-rolls', type=int, default=20000, help='rolls per path and combination in the spawn scenario')
+    parser.add_argument('--spawn-z', type=float, default=4.5, help='largest z-score allowed between the two paths in the spawn scenario')
+    parser.add_argument('--threads', type=int, default=8, help='concurrent requests per user in the contention scenario')
+    parser.add_argument('--compare-url', action='append', help='another running server to measure in the scaling scenario, e.g. the ASGI server next to the WSGI one')
+    parser.add_argument('--connections', type=lambda v: [int(n) for n in v.split(',')], default=[10, 50, 100, 200], help='comma-separated concurrent player counts for the scaling scenario')
+    parser.add_argument('--server-cores', type=int, help='CPU cores given to each server, to normalise scaling throughput (default: cores on this machine)')
+    args = parser.parse_args()
+
+    if args.players > args.users:
+        parser.error('--players cannot exceed --users')
+    if args.scenario in ('contention', 'explain', 'spawn') and args.url:
+        parser.error(f'the {args.scenario} scenario runs in-process only')
+    if args.backend == 'mysql' and args.scenario != 'contention':
+        parser.error('--backend mysql is only supported by the contention scenario')
+    if args.scenario == 'scaling' and not args.url:
+        parser.error('the scaling scenario needs --url pointing at a server started on a database from --seed-only')
+    if args.scenario == 'scaling' and max(args.connections) > args.users:
+        parser.error('--connections cannot exceed --users')
+    game_app, counter = None, None
+    if args.seed_only:
+        create_sqlite_database(args.db, args.users, args.plots, args.fruits, args.seed)
+        return 0
+    if args.backend == 'mysql':
+        os.environ['PLANT_GAME_DB_BACKEND'] = 'mysql'
+    elif not args.url:
+        if not args.no_seed:
+            create_sqlite_database(args.db, args.users, args.plots, args.fruits, args.seed)
+        os.environ['PLANT_GAME_DB_BACKEND'] = 'sqlite'
+        os.environ['PLANT_GAME_SQLITE_PATH'] = args.db
+    if not args.url:
+        os.environ.setdefault('PLANT_GAME_DB_POOL_SIZE', str(max(10, args.players)))
+        os.environ.setdefault('PLANT_GAME_TICK_LEADER_LOCK', 'none')
+        os.environ.setdefault('PLANT_GAME_BACKGROUND_JOBS', '0')
+        import app as game_app
+        counter = QueryCounter(game_app.DB_BACKEND)
+
+    if args.scenario == 'contention':
+        results = run_contention(game_app, args)
+    elif args.scenario == 'scaling':
+        results = run_scaling(args)
+    elif args.scenario == 'explain':
+        results = run_explain(game_app, counter, args)
+    elif args.scenario == 'spawn':
+        results = run_spawn_check(game_app, args)
+    else:
+        results = run_load(game_app, counter, args)
+
+    output = json.dumps(results, indent=2, default=str)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+    if 'contention' in results:
+        contention = results['contention']
+        print(f"Contention: {contention['users']} users x {contention['threads_per_user']} threads, {contention['purchases']} purchases, {contention['rejected_purchases']} rejected, {len(contention['violations'])} invariant violations.", file=sys.stderr)
+        for violation in contention['violations']:
+            print(f"  {violation}", file=sys.stderr)
+        return 1 if contention['violations'] else 0
+    if 'explain' in results:
+        explain = results['explain']
+        print(f"Explained {len(explain['statements'])} statements with SQLite query plans (MySQL plans are not checked): {len(explain['full_scans'])} full table or index scans, {len(explain['allowed_full_passes'])} allowed full passes.", file=sys.stderr)
+        for entry in explain['full_scans']:
+            print(f"  {entry['query']}\n    {'; '.join(entry['plan'])}", file=sys.stderr)
+        for entry in explain['allowed_full_passes']:
+            print(f"  allowed, {entry['reason']}: {entry['query']}\n    {'; '.join(entry['plan'])}", file=sys.stderr)
+        return 1 if explain['full_scans'] else 0
+    if 'spawn' in results:
+        spawn = results['spawn']
+        print(f"Spawn tables: {len(spawn['combinations'])} plant/fertilizer combinations, {spawn['rolls']} rolls per path each, max z {spawn['max_z']}, {len(spawn['mismatches'])} mismatched outcomes.", file=sys.stderr)
+        for entry in spawn['mismatches']:
+            print(f"  plant {entry['plant_type_id']} {'+'.join(entry['effects']) or 'no effects'} fruit {entry['fruit_type_id']}: {entry['tables']} from tables, {entry['legacy']} from weights (z {entry['z']})", file=sys.stderr)
+        return 1 if spawn['mismatches'] else 0
+    if 'scaling' in results:
+        for level in results['scaling']:
+            print(f"{level['url']} @ {level['connections']} connections: {level['throughput_rps']} req/s ({level['throughput_rps_per_core']} per core), p50 {level['p50_ms']}ms, p99 {level['p99_ms']}ms, {level['event_streams']} event streams, {len(level['player_errors'])} player errors.", file=sys.stderr)
+        return 1 if any(level['player_errors'] for level in results['scaling']) else 0
+    req = results['requests']
+    print(f"{req['count']} requests in {req['wall_seconds']:.1f}s ({req['throughput_rps']} req/s), p50 {req['p50_ms']}ms, p95 {req['p95_ms']}ms, p99 {req['p99_ms']}ms, {req['queries_mean']} queries/request.", file=sys.stderr)
+    if 'world_tick' in results:
+        tick = results['world_tick']
+        print(f"World tick: p50 {tick['p50_ms']}ms, p99 {tick['p99_ms']}ms, {tick['queries_mean']} queries/tick.", file=sys.stderr)
+    return 1 if req['player_errors'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,165 @@
+import argparse
+import hashlib
+import io
+import json
+import math
+import os
+import re
+import shutil
+import sys
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+# Source images are 500px squares; frames are scaled to roughly twice their largest on-screen size.
+ATLAS_GROUPS = (
+    ('plants', r'images/plants/(?P<atlas>[a-z]+)_(?P<frame>\d+)\.png$', 256),
+    ('fruits', r'images/fruits/(?P<atlas>[a-z]+)_(?P<frame>\w+)\.png$', 160),
+    ('weather', r'images/weather/(?P<frame>.+)\.png$', 96),
+    ('fertilizer', r'images/fertilizer/(?P<frame>.+)\.png$', 128),
+)
+IMAGE_FILES = (
+    (r'images/icon/.+\.png$', 96),
+)
+TEXT_FILES = (r'css/.+\.css$', r'js/.+\.js$')
+PRELOAD_GROUPS = ('fruits', 'weather', 'fertilizer')
+WEBP_QUALITY = 82
+
+def fingerprint(data):
+    return hashlib.sha1(data).hexdigest()[:10]
+
+def static_files():
+    for root, dirs, files in os.walk(STATIC_DIR):
+        dirs[:] = [d for d in dirs if os.path.relpath(os.path.join(root, d), STATIC_DIR) != DIST_DIR]
+        for name in files:
+            yield os.path.relpath(os.path.join(root, name), STATIC_DIR).replace(os.sep, '/')
+
+def load_frame(path, size):
+    image = Image.open(os.path.join(STATIC_DIR, path)).convert('RGBA')
+    image.thumbnail((size, size), Image.LANCZOS)
+    frame = Image.new('RGBA', (size, size))
+    frame.paste(image, ((size - image.width) // 2, size - image.height))
+    return frame
+
+def encode(image, fmt):
+    out = io.BytesIO()
+    if fmt == 'png':
+        image.save(out, 'PNG', optimize=True)
+    else:
+        image.save(out, 'WEBP', quality=WEBP_QUALITY, method=6)
+    return out.getvalue()
+
+def write_fingerprinted(out_dir, name, ext, data):
+    filename = f'{name}.{fingerprint(data)}.{ext}'
+    path = os.path.join(out_dir, *filename.split('/'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if not os.path.exists(path):
+        with open(path, 'wb') as f:
+            f.write(data)
+    return f'{DIST_DIR}/{filename}'
+
+def frame_sort_key(frame):
+    return (0, int(frame)) if frame.isdigit() else (1, frame)
+
+def collect_atlases(paths):
+    atlases = {}
+    for group, pattern, size in ATLAS_GROUPS:
+        for path in paths:
+            match = re.fullmatch(pattern, path)
+            if match:
+                name = f"{group}/{match.group('atlas')}" if 'atlas' in match.groupdict() else group
+                atlases.setdefault(name, {'size': size, 'frames': []})['frames'].append((match.group('frame'), path))
+    for atlas in atlases.values():
+        atlas['frames'].sort(key=lambda frame: frame_sort_key(frame[0]))
+    return atlases
+
+def build_atlas(out_dir, name, size, frames):
+    columns = math.ceil(math.sqrt(len(frames)))
+    rows = math.ceil(len(frames) / columns)
+    sheet = Image.new('RGBA', (columns * size, rows * size))
+    sprites = {}
+    for i, (_, path) in enumerate(frames):
+        column, row = i % columns, i // columns
+        sheet.paste(load_frame(path, size), (column * size, row * size))
+        sprites[path] = [name, column, row]
+    entry = {'columns': columns, 'rows': rows, 'frame': size}
+    for fmt in ('png', 'webp'):
+        data = encode(sheet, fmt)
+        entry[fmt] = write_fingerprinted(out_dir, name, fmt, data)
+        entry[f'{fmt}_bytes'] = len(data)
+    return entry, sprites
+
+def build_image_file(out_dir, path, size):
+    image = load_frame(path, size)
+    name = path[len('images/'):-len('.png')]
+    return {fmt: write_fingerprinted(out_dir, name, fmt, encode(image, fmt)) for fmt in ('png', 'webp')}
+
+def build_text_file(out_dir, path):
+    with open(os.path.join(STATIC_DIR, path), 'rb') as f:
+        data = f.read()
+    name, ext = path.rsplit('.', 1)
+    return write_fingerprinted(out_dir, name, ext, data)
+
+def prune(out_dir, manifest):
+    keep = {url for atlas in manifest['atlases'].values() for url in (atlas['png'], atlas['webp'])}
+    keep |= {url for files in manifest['images'].values() for url in files.values()}
+    keep |= set(manifest['files'].values())
+    removed = 0
+    for root, _, files in os.walk(out_dir):
+        for name in files:
+            url = f"{DIST_DIR}/{os.path.relpath(os.path.join(root, name), out_dir).replace(os.sep, '/')}"
+            if name != MANIFEST_NAME and url not in keep:
+                os.remove(os.path.join(root, name))
+                removed += 1
+    return removed
+
+def build(out_dir):
+    paths = sorted(static_files())
+    manifest = {'atlases': {}, 'sprites': {}, 'images': {}, 'files': {}, 'preload': []}
+    for name, atlas in sorted(collect_atlases(paths).items()):
+        entry, sprites = build_atlas(out_dir, name, atlas['size'], atlas['frames'])
+        manifest['atlases'][name] = entry
+        manifest['sprites'].update(sprites)
+    for path in paths:
+        size = next((size for pattern, size in IMAGE_FILES if re.fullmatch(pattern, path)), None)
+        if size:
+            manifest['images'][path] = build_image_file(out_dir, path, size)
+        elif any(re.fullmatch(pattern, path) for pattern in TEXT_FILES):
+            manifest['files'][path] = build_text_file(out_dir, path)
+    manifest['preload'] = [atlas['webp'] for name, atlas in manifest['atlases'].items() if name.split('/')[0] in PRELOAD_GROUPS]
+    manifest['version'] = fingerprint(json.dumps(manifest, sort_keys=True).encode())
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description='Pack game images into fingerprinted sprite atlases with WebP variants and write static/dist/manifest.json.')
+    parser.add_argument('--out', default=os.path.join(STATIC_DIR, DIST_DIR), help='output directory, served as /static/dist/')
+    parser.add_argument('--prune', action='store_true', help='delete files left over from earlier builds; keep them while old pages may still be open')
+    parser.add_argument('--clean', action='store_true', help='empty the output directory before building')
+    args = parser.parse_args()
+    if Image is None:
+        parser.error('building assets needs Pillow (pip install Pillow)')
+
+    if args.clean and os.path.isdir(args.out):
+        shutil.rmtree(args.out)
+    os.makedirs(args.out, exist_ok=True)
+    manifest = build(args.out)
+    with open(os.path.join(args.out, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    removed = prune(args.out, manifest) if args.prune else 0
+    source_bytes = sum(os.path.getsize(os.path.join(STATIC_DIR, path)) for path in manifest['sprites'])
+    png_bytes = sum(atlas['png_bytes'] for atlas in manifest['atlases'].values())
+    webp_bytes = sum(atlas['webp_bytes'] for atlas in manifest['atlases'].values())
+    preload_bytes = sum(atlas['webp_bytes'] for atlas in manifest['atlases'].values() if atlas['webp'] in manifest['preload'])
+    print(f"Packed {len(manifest['sprites'])} images ({source_bytes / 1e6:.1f} MB) into {len(manifest['atlases'])} atlases: {png_bytes / 1e6:.2f} MB PNG, {webp_bytes / 1e6:.2f} MB WebP.")
+    print(f"Fingerprinted {len(manifest['images'])} images and {len(manifest['files'])} scripts/stylesheets; {len(manifest['preload'])} atlases ({preload_bytes / 1e6:.2f} MB) preloaded; manifest {manifest['version']}.")
+    if removed:
+        print(f"Pruned {removed} stale files.")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
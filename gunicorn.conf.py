@@ -0,0 +1,11 @@
+import os
+
+bind = os.environ.get('PLANT_GAME_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('PLANT_GAME_WORKERS', 4))
+worker_class = 'gthread'
+threads = int(os.environ.get('PLANT_GAME_THREADS', 8))
+raw_env = ['PLANT_GAME_MULTI_WORKER=1']
+
+def post_worker_init(worker):
+    from app import start_background_jobs
+    start_background_jobs()
@@ -0,0 +1,7 @@
+import os
+
+bind = os.environ.get('PLANT_GAME_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('PLANT_GAME_WORKERS', 4))
+wsgi_app = 'asgi:application'
+worker_class = 'uvicorn.workers.UvicornWorker'
+raw_env = ['PLANT_GAME_MULTI_WORKER=1']
@@ -0,0 +1,88 @@
+-- Base schema as deployed before versioned migrations. Every statement is a no-op on an existing database.
+-- {auto_id} and {timestamp} are filled in per backend by `flask migrate`.
+
+CREATE TABLE IF NOT EXISTS users (
+    id {auto_id},
+    username VARCHAR(50) NOT NULL UNIQUE,
+    password VARCHAR(255) NOT NULL,
+    money INTEGER NOT NULL DEFAULT 100
+);
+
+CREATE TABLE IF NOT EXISTS plant_types (
+    id INTEGER PRIMARY KEY,
+    name VARCHAR(50) NOT NULL,
+    image_prefix VARCHAR(50) NOT NULL,
+    seed_price INTEGER NOT NULL,
+    base_price DOUBLE NOT NULL,
+    max_growth_stage INTEGER NOT NULL,
+    harvest_type VARCHAR(20) NOT NULL,
+    growth_time_per_stage_seconds INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS fertilizer_types (
+    id INTEGER PRIMARY KEY,
+    name VARCHAR(50) NOT NULL,
+    price INTEGER NOT NULL,
+    effect_type VARCHAR(30) NOT NULL,
+    effect_value DOUBLE NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS fruit_types (
+    id INTEGER PRIMARY KEY,
+    plant_type_id INTEGER NOT NULL,
+    color_name VARCHAR(50) NOT NULL,
+    image_suffix VARCHAR(50) NOT NULL,
+    rarity_rate DOUBLE NOT NULL,
+    price_multiplier DOUBLE NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS weather_types (
+    id INTEGER PRIMARY KEY,
+    name VARCHAR(50) NOT NULL,
+    spawn_rate DOUBLE NOT NULL,
+    stick_rate DOUBLE NOT NULL,
+    price_multiplier DOUBLE NOT NULL,
+    display_icon_filename VARCHAR(100)
+);
+
+CREATE TABLE IF NOT EXISTS weather_combinations (
+    id INTEGER PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    weather_type_ids TEXT NOT NULL,
+    price_multiplier DOUBLE NOT NULL,
+    display_icon_filename VARCHAR(100)
+);
+
+CREATE TABLE IF NOT EXISTS user_plots (
+    id {auto_id},
+    user_id INTEGER NOT NULL,
+    plot_number INTEGER NOT NULL,
+    plant_type_id INTEGER,
+    growth_stage INTEGER NOT NULL DEFAULT 0,
+    planted_at {timestamp},
+    last_growth_update {timestamp},
+    growth_boost_seconds DOUBLE NOT NULL DEFAULT 0,
+    last_spawn_attempt_at {timestamp},
+    last_harvest_at {timestamp},
+    fertilizer_applied_effect TEXT
+);
+
+CREATE TABLE IF NOT EXISTS user_fruits (
+    id {auto_id},
+    user_id INTEGER NOT NULL,
+    plot_id INTEGER,
+    fruit_type_id INTEGER NOT NULL,
+    weight DOUBLE NOT NULL,
+    created_at {timestamp},
+    harvested BOOLEAN NOT NULL DEFAULT 0,
+    weather_effects TEXT,
+    last_weather_check {timestamp}
+);
+
+CREATE TABLE IF NOT EXISTS inventory (
+    id {auto_id},
+    user_id INTEGER NOT NULL,
+    item_type VARCHAR(20) NOT NULL,
+    item_id INTEGER NOT NULL,
+    quantity INTEGER NOT NULL DEFAULT 1
+);
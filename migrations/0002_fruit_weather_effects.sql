@@ -0,0 +1,8 @@
+-- Weather effects moved out of user_fruits.weather_effects; backfill old rows with `flask migrate-weather-effects`.
+
+CREATE TABLE IF NOT EXISTS fruit_weather_effects (
+    fruit_id BIGINT NOT NULL,
+    weather_id INTEGER NOT NULL,
+    applied_at INTEGER NOT NULL,
+    PRIMARY KEY (fruit_id, weather_id)
+);
@@ -0,0 +1,3 @@
+-- One stack per item. Fails on a database with duplicated stacks: run `flask migrate-inventory-keys` first.
+
+CREATE UNIQUE INDEX uq_inventory_item ON inventory (user_id, item_type, item_id);
@@ -0,0 +1,11 @@
+-- Cross-worker cache invalidation log read by sync_cache_invalidations (PLANT_GAME_MULTI_WORKER=1).
+
+CREATE TABLE IF NOT EXISTS cache_invalidations (
+    id {auto_id},
+    origin VARCHAR(64) NOT NULL,
+    user_id INTEGER,
+    event VARCHAR(32) NOT NULL,
+    created_at INTEGER NOT NULL
+);
+
+CREATE INDEX idx_cache_invalidations_created ON cache_invalidations (created_at);
@@ -0,0 +1,14 @@
+-- Indexes for the request and world tick access paths. Check plans with `python bench.py --scenario explain`.
+
+-- Fruits hanging on a plot: tick spawn checks, weather sticks, harvest and dig up.
+CREATE INDEX idx_user_fruits_plot_harvested ON user_fruits (plot_id, harvested);
+
+-- A player's unsold fruits, on plots (plot_id set) or in the inventory (plot_id NULL), newest first.
+-- Carries every column the snapshot reads so it never touches the table rows.
+CREATE INDEX idx_user_fruits_user_unsold ON user_fruits (user_id, harvested, plot_id, created_at, fruit_type_id, weight, last_weather_check);
+
+-- Sold fruits waiting for archive_sold_fruits.
+CREATE INDEX idx_user_fruits_harvested ON user_fruits (harvested);
+
+-- A player's plots by what is planted and how far it has grown: snapshot, tick growth and spawn phases.
+CREATE INDEX idx_user_plots_user_plant_stage ON user_plots (user_id, plant_type_id, growth_stage);
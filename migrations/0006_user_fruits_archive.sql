@@ -0,0 +1,12 @@
+-- Sold fruits moved out of user_fruits by archive_sold_fruits.
+
+CREATE TABLE IF NOT EXISTS user_fruits_archive (
+    id BIGINT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    fruit_type_id INTEGER NOT NULL,
+    weight DOUBLE NOT NULL,
+    created_at {timestamp},
+    archived_at {timestamp} NOT NULL
+);
+
+CREATE INDEX idx_user_fruits_archive_user ON user_fruits_archive (user_id, created_at);
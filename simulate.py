@@ -0,0 +1,332 @@
+import argparse
+import json
+import math
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+import numpy as np
+
+CATALOG_TABLES = {
+    'plant_types': 'PLANT_TYPES',
+    'fertilizer_types': 'FERTILIZER_TYPES',
+    'fruit_types': 'FRUIT_TYPES',
+    'weather_types': 'WEATHER_TYPES',
+    'weather_combinations': 'WEATHER_COMBINATIONS',
+}
+
+def load_game(catalog):
+    if catalog == 'bench':
+        import bench
+        path = os.path.join(tempfile.mkdtemp(prefix='plant-game-sim-'), 'catalog.sqlite3')
+        bench.create_sqlite_database(path, 0, 0, 0, 0)
+        os.environ['PLANT_GAME_DB_BACKEND'] = 'sqlite'
+        os.environ['PLANT_GAME_SQLITE_PATH'] = path
+    os.environ.setdefault('PLANT_GAME_TICK_LEADER_LOCK', 'none')
+    import app as game
+    return game
+
+def apply_overrides(game, overrides):
+    for override in overrides:
+        path, value = override.split('=', 1)
+        table, key, *field = path.split('.')
+        if table == 'plot_costs':
+            game.PLOT_COSTS[int(key)] = float(value)
+        else:
+            getattr(game, CATALOG_TABLES[table])[int(key)][field[0]] = float(value)
+    game._build_spawn_tables()
+    game.weather_ids_for_epoch.cache_clear()
+
+class Strategy:
+    def __init__(self, plant_id, fertilizer_id=None, harvest_every=1.0, refertilize_every=None):
+        self.plant_id = plant_id
+        self.fertilizer_id = fertilizer_id
+        self.harvest_every = harvest_every
+        self.refertilize_every = refertilize_every
+
+    @classmethod
+    def parse(cls, spec, refertilize_every):
+        plant_id, fertilizer_id, harvest_every = (spec.split(':') + ['', ''])[:3]
+        return cls(int(plant_id), int(fertilizer_id) if fertilizer_id else None, float(harvest_every) if harvest_every else 1.0, refertilize_every)
+
+    def name(self, game):
+        fertilizer = game.FERTILIZER_TYPES[self.fertilizer_id]['name'] if self.fertilizer_id else 'no fertilizer'
+        return f"{game.PLANT_TYPES[self.plant_id]['name']} + {fertilizer}, harvest every {self.harvest_every:g}m"
+
+class SpawnSampler:
+    def __init__(self, table):
+        self.type_ids = np.array([f['id'] for f in table.fruits])
+        self.cum_weights = np.array(table.cum_weights, dtype=float)
+
+    def sample(self, rng, n):
+        return self.type_ids[np.searchsorted(self.cum_weights, rng.random(n) * self.cum_weights[-1], side='right')]
+
+class FruitPricer:
+    def __init__(self, game):
+        self.weather_ids = sorted(game.WEATHER_TYPES)
+        self.type_ids = np.array(sorted(game.FRUIT_TYPES))
+        self.base_prices = np.array([game.PLANT_TYPES[game.FRUIT_TYPES[t]['plant_type_id']]['base_price'] for t in self.type_ids], dtype=float)
+        self.color_multipliers = np.array([game.FRUIT_TYPES[t]['price_multiplier'] for t in self.type_ids], dtype=float)
+        self.weather_multipliers = np.array([game.weather_multiplier({w for bit, w in enumerate(self.weather_ids) if mask >> bit & 1}) for mask in range(1 << len(self.weather_ids))], dtype=float)
+
+    def weather_masks(self, active):
+        return (active << np.arange(len(self.weather_ids))).sum(axis=-1)
+
+    def prices(self, type_ids, weights, weather_masks):
+        idx = np.searchsorted(self.type_ids, type_ids)
+        return np.round(self.base_prices[idx] * weights * self.color_multipliers[idx] * self.weather_multipliers[weather_masks])
+
+def fertilizer_boost(game, fertilizer):
+    effects = {fertilizer['effect_type']: {'expiry': datetime.max.isoformat(), 'value': fertilizer['effect_value']}}
+    return game.spawn_boost(effects, datetime.min)
+
+def simulate_strategy(game, strategy, plots, hours, tick_seconds, start, rng, harvest=True, record=None, online=False):
+    plant = game.PLANT_TYPES[strategy.plant_id]
+    fertilizer = game.FERTILIZER_TYPES.get(strategy.fertilizer_id)
+    stage_seconds = plant['growth_time_per_stage_seconds']
+    single = plant['harvest_type'] == 'single_harvest'
+    slots = 1 if single else game.MAX_PLOT_FRUITS
+    fruiting_seconds = ((plant['max_growth_stage'] if single else game.PERENNIAL_FRUITING_STAGE) - 1) * stage_seconds
+    pricer = FruitPricer(game)
+    weather_ids = pricer.weather_ids
+    rolls = 1 + tick_seconds / game.app.config['WEATHER_STICK_ROLL_SECONDS'] if online else 1
+    stick_rates = [game.weather_stick_chance(game.WEATHER_TYPES[w]['stick_rate'], rolls) for w in weather_ids]
+    timed_effect = fertilizer['effect_type'] if fertilizer and fertilizer['effect_type'] != 'growth_boost' else None
+    boost = fertilizer_boost(game, fertilizer) if timed_effect else None
+    normal_sampler = SpawnSampler(game.spawn_table(strategy.plant_id))
+    boosted_sampler = SpawnSampler(game.spawn_table(strategy.plant_id, boost)) if boost else None
+    size_boost = fertilizer['effect_value'] if timed_effect == 'fruit_size_boost' else 0.0
+
+    planted_at = np.zeros(plots)
+    boost_seconds = np.zeros(plots)
+    effect_expiry = np.full(plots, -np.inf)
+    last_spawn_minute = np.full(plots, -1)
+    present = np.zeros((plots, slots), dtype=bool)
+    fruit_type = np.zeros((plots, slots), dtype=np.int64)
+    fruit_weight = np.zeros((plots, slots))
+    effect_at = np.full((plots, slots, len(weather_ids)), -np.inf)
+    income, spend = np.zeros(plots), np.zeros(plots)
+    fruits_sold, plantings = np.zeros(plots, dtype=np.int64), np.zeros(plots, dtype=np.int64)
+
+    def fertilize(idx, t):
+        if not fertilizer:
+            return
+        spend[idx] += fertilizer['price']
+        if timed_effect:
+            effect_expiry[idx] = t + game.FERTILIZER_EFFECT_SECONDS
+        else:
+            boost_seconds[idx] += game.growth_boost_seconds(stage_seconds, t - planted_at[idx] + boost_seconds[idx], fertilizer['effect_value'])
+
+    def plant_plots(idx, t):
+        planted_at[idx], boost_seconds[idx], effect_expiry[idx] = t, 0.0, -np.inf
+        spend[idx] += plant['seed_price']
+        plantings[idx] += 1
+        fertilize(idx, t)
+
+    plant_plots(np.arange(plots), 0.0)
+    start_timestamp = int(start.timestamp())
+    start_minute = start.minute
+    harvest_ticks = max(1, round(strategy.harvest_every * 60 / tick_seconds))
+    refertilize_ticks = max(1, round(strategy.refertilize_every * 60 / tick_seconds)) if strategy.refertilize_every and not single else None
+    for tick in range(1, int(hours * 3600 // tick_seconds) + 1):
+        t = tick * tick_seconds
+        minute = (start_minute + int(t // 60)) % 60
+        fruiting = t - planted_at + boost_seconds >= fruiting_seconds
+        count = present.sum(axis=1)
+        if single:
+            due = np.flatnonzero(fruiting & (count == 0))
+        elif minute % 2 == 0:
+            due = np.flatnonzero(fruiting & (count < slots) & (last_spawn_minute != minute))
+        else:
+            due = np.empty(0, dtype=np.int64)
+        if len(due):
+            slot = np.argmin(present[due], axis=1)
+            boosted = effect_expiry[due] > t
+            weights = np.round(rng.uniform(0.5, 50.0, len(due)), 1)
+            if size_boost:
+                weights = np.where(boosted, weights * (1 + size_boost), weights)
+            types = normal_sampler.sample(rng, len(due))
+            if boosted_sampler and boosted.any():
+                types[boosted] = boosted_sampler.sample(rng, int(boosted.sum()))
+            present[due, slot] = True
+            fruit_type[due, slot] = types
+            fruit_weight[due, slot] = np.round(weights, 1)
+            effect_at[due, slot] = -np.inf
+            last_spawn_minute[due] = minute
+            if record is not None:
+                record.append((tick, due, types, np.round(weights, 1)))
+        effect_at[effect_at <= t - game.WEATHER_EFFECT_SECONDS] = -np.inf
+        global_weather = set(game.weather_ids_for_epoch((start_timestamp + int(t)) // game.app.config['WEATHER_EPOCH_SECONDS']))
+        for bit, weather_id in enumerate(weather_ids):
+            if weather_id in global_weather:
+                column = effect_at[:, :, bit]
+                column[present & (column == -np.inf) & (rng.random(present.shape) < stick_rates[bit])] = t
+        if harvest and tick % harvest_ticks == 0 and present.any():
+            plot_idx, slot_idx = np.nonzero(present)
+            masks = pricer.weather_masks(effect_at[plot_idx, slot_idx] > -np.inf)
+            np.add.at(income, plot_idx, pricer.prices(fruit_type[plot_idx, slot_idx], fruit_weight[plot_idx, slot_idx], masks))
+            np.add.at(fruits_sold, plot_idx, 1)
+            present[plot_idx, slot_idx] = False
+            if single:
+                plant_plots(np.unique(plot_idx), t)
+        if refertilize_ticks and tick % refertilize_ticks == 0:
+            fertilize(np.arange(plots), t)
+    return {'income': income, 'spend': spend, 'fruits_sold': fruits_sold, 'plantings': plantings}
+
+def summarize_strategy(game, strategy, outcome, hours):
+    net_per_hour = (outcome['income'] - outcome['spend']) / hours
+    p5, p25, p50, p75, p95 = np.percentile(net_per_hour, [5, 25, 50, 75, 95])
+    mean = float(net_per_hour.mean())
+    return {
+        'strategy': strategy.name(game),
+        'plant_id': strategy.plant_id,
+        'fertilizer_id': strategy.fertilizer_id,
+        'harvest_every_minutes': strategy.harvest_every,
+        'net_income_per_hour': {'mean': round(mean, 2), 'std': round(float(net_per_hour.std()), 2), 'p5': round(p5, 2), 'p25': round(p25, 2), 'p50': round(p50, 2), 'p75': round(p75, 2), 'p95': round(p95, 2)},
+        'gross_income_per_hour': round(float(outcome['income'].mean()) / hours, 2),
+        'spend_per_hour': round(float(outcome['spend'].mean()) / hours, 2),
+        'fruits_per_hour': round(float(outcome['fruits_sold'].mean()) / hours, 3),
+        'plant_lifetimes': int(outcome['plantings'].sum()),
+        'plot_payback_hours': {str(plot): round(cost / mean, 1) if mean > 0 else None for plot, cost in sorted(game.PLOT_COSTS.items())},
+    }
+
+def run_simulation(game, args):
+    start = datetime.fromisoformat(args.start) if args.start else datetime.now().replace(minute=0, second=0, microsecond=0)
+    if args.strategy:
+        strategies = [Strategy.parse(spec, args.refertilize_every) for spec in args.strategy]
+    else:
+        strategies = [Strategy(plant_id, fertilizer_id, args.harvest_every, args.refertilize_every) for plant_id in sorted(game.PLANT_TYPES) for fertilizer_id in [None, *sorted(game.FERTILIZER_TYPES)]]
+    rng = np.random.default_rng(args.seed)
+    results = []
+    started = time.perf_counter()
+    for strategy in strategies:
+        outcome = simulate_strategy(game, strategy, args.plots, args.hours, args.tick_seconds, start, rng, online=args.online)
+        results.append(summarize_strategy(game, strategy, outcome, args.hours))
+    return {
+        'catalog_version': game.CATALOG_VERSION,
+        'start': start.isoformat(),
+        'config': {k: v for k, v in vars(args).items() if k in ('plots', 'hours', 'tick_seconds', 'seed', 'set')},
+        'elapsed_seconds': round(time.perf_counter() - started, 2),
+        'strategies': sorted(results, key=lambda r: -r['net_income_per_hour']['mean']),
+    }
+
+def check_engine(game, args):
+    if game.app.config['DB_BACKEND'] != 'sqlite':
+        raise SystemExit('--check-engine writes plots into the catalog database and only runs against --catalog bench')
+    start = datetime.fromisoformat(args.start) if args.start else datetime.now().replace(minute=0, second=0, microsecond=0)
+    fertilizers = [None, *(f_id for f_id, f in sorted(game.FERTILIZER_TYPES.items()) if f['effect_type'] != 'fruit_size_boost')]
+    strategies = [Strategy(plant_id, fertilizer_id) for plant_id in sorted(game.PLANT_TYPES) for fertilizer_id in fertilizers]
+    conn = sqlite3.connect(game.app.config['DB_SQLITE_PATH'])
+    plot_ids = []
+    for user_id, strategy in enumerate(strategies, start=1):
+        plant = game.PLANT_TYPES[strategy.plant_id]
+        fertilizer = game.FERTILIZER_TYPES.get(strategy.fertilizer_id)
+        boost_seconds, effects = 0.0, {}
+        if fertilizer and fertilizer['effect_type'] == 'growth_boost':
+            boost_seconds = game.growth_boost_seconds(plant['growth_time_per_stage_seconds'], 0.0, fertilizer['effect_value'])
+        elif fertilizer:
+            effects[fertilizer['effect_type']] = {'expiry': (start + timedelta(seconds=game.FERTILIZER_EFFECT_SECONDS)).isoformat(), 'value': fertilizer['effect_value']}
+        conn.execute("INSERT INTO users (id, username, password) VALUES (?, ?, '')", (user_id, f'oracle{user_id}'))
+        conn.executemany("INSERT INTO user_plots (user_id, plot_number, plant_type_id, growth_stage, planted_at, last_growth_update, growth_boost_seconds, fertilizer_applied_effect) VALUES (?, ?, ?, 1, ?, ?, ?, ?)", [(user_id, n, strategy.plant_id, start, start, boost_seconds, json.dumps(effects) if effects else None) for n in range(1, args.check_plots + 1)])
+        plot_ids.append([row[0] for row in conn.execute("SELECT id FROM user_plots WHERE user_id=? ORDER BY plot_number", (user_id,))])
+    conn.commit()
+    random.seed(args.seed)
+    for tick in range(1, args.check_minutes + 1):
+        game.run_world_tick(now=start + timedelta(seconds=tick * 60))
+    rows = conn.execute("SELECT plot_id, fruit_type_id, weight, created_at FROM user_fruits").fetchall()
+    engine_spawns = {}
+    for plot_id, type_id, weight, created_at in rows:
+        tick = round((datetime.fromisoformat(created_at) - start).total_seconds() / 60)
+        engine_spawns.setdefault(plot_id, []).append((tick, type_id, weight))
+
+    mismatched, type_counts, rng = [], {}, np.random.default_rng(args.seed)
+    for strategy, ids in zip(strategies, plot_ids):
+        record = []
+        simulate_strategy(game, strategy, args.check_plots, args.check_minutes / 60, 60, start, rng, harvest=False, record=record)
+        expected = {}
+        for tick, due, _, _ in record:
+            for plot in due:
+                expected.setdefault(ids[plot], []).append(tick)
+        for plot_id in ids:
+            spawned = engine_spawns.get(plot_id, [])
+            if sorted(t for t, _, _ in spawned) != expected.get(plot_id, []):
+                mismatched.append({'plot_id': plot_id, 'strategy': strategy.name(game), 'engine_ticks': sorted(t for t, _, _ in spawned), 'simulated_ticks': expected.get(plot_id, [])})
+            for tick, type_id, _ in spawned:
+                fertilizer = game.FERTILIZER_TYPES.get(strategy.fertilizer_id)
+                boosted = fertilizer and fertilizer['effect_type'] != 'growth_boost' and tick * 60 < game.FERTILIZER_EFFECT_SECONDS
+                counts = type_counts.setdefault((strategy.plant_id, strategy.fertilizer_id if boosted else None), {})
+                counts[type_id] = counts.get(type_id, 0) + 1
+
+    outliers = []
+    for (plant_id, fertilizer_id), counts in sorted(type_counts.items(), key=lambda item: (item[0][0], item[0][1] or 0)):
+        table = game.spawn_table(plant_id, fertilizer_boost(game, game.FERTILIZER_TYPES[fertilizer_id]) if fertilizer_id else None)
+        total, n = sum(table.weights), sum(counts.values())
+        for fruit, weight in zip(table.fruits, table.weights):
+            p = weight / total
+            observed, expected = counts.get(fruit['id'], 0), n * p
+            if abs(observed - expected) > 5 * math.sqrt(n * p * (1 - p)) + 1:
+                outliers.append({'plant_id': plant_id, 'fertilizer_id': fertilizer_id, 'fruit_type_id': fruit['id'], 'observed': observed, 'expected': round(expected, 1)})
+
+    fruits = [{'fruit_type_id': type_id, 'weight': weight, 'weather_ids': {w for w in game.WEATHER_TYPES if random.random() < 0.3}} for spawned in engine_spawns.values() for _, type_id, weight in spawned]
+    pricer = FruitPricer(game)
+    masks = pricer.weather_masks(np.array([[w in f['weather_ids'] for w in pricer.weather_ids] for f in fruits], dtype=bool).reshape(-1, len(pricer.weather_ids)))
+    simulated_prices = pricer.prices(np.array([f['fruit_type_id'] for f in fruits], dtype=np.int64), np.array([f['weight'] for f in fruits], dtype=float), masks)
+    engine_prices = game.price_fruits(*game.fruit_price_inputs(fruits))
+    price_mismatches = int(sum(1 for a, b in zip(simulated_prices, engine_prices) if a != b))
+    weights = np.array([f['weight'] for f in fruits])
+    return {
+        'start': start.isoformat(),
+        'plots': sum(len(ids) for ids in plot_ids),
+        'minutes': args.check_minutes,
+        'spawns': len(rows),
+        'spawn_schedule_mismatches': mismatched,
+        'fruit_type_outliers': outliers,
+        'weight_range': [float(weights.min()), float(weights.max())] if len(weights) else None,
+        'price_mismatches': price_mismatches,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate plant game income per strategy in memory, or check a tick engine against the simulator.')
+    parser.add_argument('--catalog', choices=('bench', 'app'), default='bench', help='bench uses the benchmark catalog in a temporary SQLite file; app loads the catalog from the PLANT_GAME_* database')
+    parser.add_argument('--plots', type=int, default=2000, help='simulated plots per strategy')
+    parser.add_argument('--hours', type=float, default=24.0)
+    parser.add_argument('--tick-seconds', type=int, default=60, help='seconds between world ticks; 60 matches the scheduler')
+    parser.add_argument('--online', action='store_true', help='players stay online, so weather also sticks at the request-path cadence between ticks')
+    parser.add_argument('--harvest-every', type=float, default=1.0, help='minutes between harvests for the default strategies')
+    parser.add_argument('--refertilize-every', type=float, help='minutes between fertilizer reapplications on perennials')
+    parser.add_argument('--strategy', action='append', help='PLANT_ID[:FERTILIZER_ID[:HARVEST_EVERY_MINUTES]]; default is every plant with every fertilizer')
+    parser.add_argument('--set', action='append', default=[], help='override a catalog value before simulating, e.g. fruit_types.3.rarity_rate=0.2 or plot_costs.2=4000')
+    parser.add_argument('--start', help='simulated start time (ISO format); weather follows the real schedule from here. Default: the current hour')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    parser.add_argument('--check-engine', action='store_true', help='run the real world tick on generated plots and compare it with the simulator')
+    parser.add_argument('--check-plots', type=int, default=20, help='plots per strategy in --check-engine')
+    parser.add_argument('--check-minutes', type=int, default=180, help='ticks to run in --check-engine')
+    args = parser.parse_args()
+
+    game = load_game(args.catalog)
+    apply_overrides(game, args.set)
+    results = check_engine(game, args) if args.check_engine else run_simulation(game, args)
+
+    output = json.dumps(results, indent=2, default=str)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+    if args.check_engine:
+        failed = results['spawn_schedule_mismatches'] or results['fruit_type_outliers'] or results['price_mismatches']
+        print(f"Engine check: {results['spawns']} spawns on {results['plots']} plots over {results['minutes']} ticks, {len(results['spawn_schedule_mismatches'])} schedule mismatches, {len(results['fruit_type_outliers'])} fruit type outliers, {results['price_mismatches']} price mismatches.", file=sys.stderr)
+        return 1 if failed else 0
+    for result in results['strategies']:
+        income = result['net_income_per_hour']
+        print(f"{result['strategy']}: {income['mean']}/h net (p5 {income['p5']}, p50 {income['p50']}, p95 {income['p95']}), {result['fruits_per_hour']} fruits/h", file=sys.stderr)
+    print(f"Simulated {len(results['strategies'])} strategies x {args.plots} plots x {args.hours:g}h in {results['elapsed_seconds']}s.", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
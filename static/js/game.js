@@ -1,8 +1,25 @@
 document.addEventListener('DOMContentLoaded', () => {
     const appContent = document.getElementById('app-content');
     let gameState = {};
+    let catalog = null;
+    let catalogVersion = null;
+    let stateVersion = null;
     let gameLoopInterval = null;
     let uiUpdateInterval = null;
+    let eventSource = null;
+    let eventSourceRetryTimeout = null;
+    let stateRefreshPending = false;
+    let harvestFlushTimeout = null;
+    const pendingHarvestIds = new Set();
+
+    const POLL_INTERVAL_MS = 5000;
+    const PUSH_FALLBACK_POLL_MS = 60000;
+    const PUSH_RETRY_MS = 60000;
+    const HARVEST_BATCH_DELAY_MS = 250;
+    const GAME_EVENT_TYPES = ['state_changed', 'money_changed', 'fruit_spawned', 'growth_stage', 'weather_effects', 'weather_changed', 'catalog_changed'];
+    const ASSETS = window.ASSET_MANIFEST || {};
+    const IMAGE_FORMAT = document.createElement('canvas').toDataURL('image/webp').startsWith('data:image/webp') ? 'webp' : 'png';
+    const SVG_NS = 'http://www.w3.org/2000/svg';
 
     function createDiv(id, className) {
         const d = document.createElement('div');
@@ -19,6 +36,44 @@ document.addEventListener('DOMContentLoaded', () => {
         return b;
     }
 
+    // Game images are frames of sprite atlases built by build_assets.py, drawn as <svg viewBox="0 0 1 1">
+    // with the atlas offset inside so any element size shows exactly one frame. Without a build they
+    // fall back to the source image at the same path.
+    function spriteFrame(path) {
+        const sprite = ASSETS.sprites && ASSETS.sprites[path];
+        if (!sprite) return { href: `/static/${path}`, x: 0, y: 0, width: 1, height: 1 };
+        const atlas = ASSETS.atlases[sprite[0]];
+        return { href: atlas[IMAGE_FORMAT], x: -sprite[1], y: -sprite[2], width: atlas.columns, height: atlas.rows };
+    }
+
+    function assetUrl(path) {
+        const files = ASSETS.images && ASSETS.images[path];
+        return files ? files[IMAGE_FORMAT] : `/static/${path}`;
+    }
+
+    function createSprite(className, align = 'xMidYMid') {
+        const svg = document.createElementNS(SVG_NS, 'svg');
+        svg.setAttribute('class', `sprite ${className}`);
+        svg.setAttribute('viewBox', '0 0 1 1');
+        svg.setAttribute('preserveAspectRatio', `${align} meet`);
+        svg.appendChild(document.createElementNS(SVG_NS, 'image'));
+        return svg;
+    }
+
+    function setSprite(svg, path) {
+        if (svg.dataset.path === path) return;
+        svg.dataset.path = path;
+        const frame = spriteFrame(path);
+        const image = svg.firstChild;
+        image.setAttribute('href', frame.href);
+        ['x', 'y', 'width', 'height'].forEach(attr => image.setAttribute(attr, frame[attr]));
+    }
+
+    function spriteHtml(path, className, label, style = '') {
+        const frame = spriteFrame(path);
+        return `<svg class="sprite ${className}" viewBox="0 0 1 1" role="img" aria-label="${label}" style="${style}"><image href="${frame.href}" x="${frame.x}" y="${frame.y}" width="${frame.width}" height="${frame.height}"/></svg>`;
+    }
+
     function formatTime(seconds) {
         if (isNaN(seconds) || seconds < 0) return "--:--";
         seconds = Math.floor(seconds);
@@ -47,12 +102,31 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    async function loadCatalog() {
+        const response = await fetch('/api/catalog');
+        const result = await response.json();
+        catalog = result.game_data;
+        catalogVersion = result.catalog_version;
+    }
+
+    function withStateVersions(url) {
+        const params = new URLSearchParams();
+        if (catalogVersion) params.set('catalog', catalogVersion);
+        if (stateVersion) params.set('since', stateVersion);
+        const query = params.toString();
+        return query ? `${url}${url.includes('?') ? '&' : '?'}${query}` : url;
+    }
+
     async function loadGameDashboard() {
         try {
+            gameState = {};
+            stateVersion = null;
             appContent.innerHTML = await (await fetch('/ui/game_dashboard')).text();
+            await loadCatalog();
             await handleApiCall('/api/get_game_state', {});
             attachGameDashboardListeners();
             startGameLoop();
+            startEventStream();
             startUiUpdateLoop();
         } catch (e) {
             console.error("Dashboard Load Error:", e);
@@ -61,9 +135,10 @@ document.addEventListener('DOMContentLoaded', () => {
 
     async function handleApiCall(url, options = {}, successCallback) {
         try {
-            const response = await fetch(url, options);
+            const response = await fetch(withStateVersions(url), options);
             if (response.status === 401) {
                 stopGameLoop();
+                stopEventStream();
                 stopUiUpdateLoop();
                 showAuthForm();
                 return;
@@ -71,8 +146,14 @@ document.addEventListener('DOMContentLoaded', () => {
             const result = await response.json();
             if (result.success) {
                 if (result.state) {
-                    gameState = result.state;
-                    renderGameUI();
+                    if (result.state.game_data) {
+                        catalog = result.state.game_data;
+                        catalogVersion = result.catalog_version;
+                    }
+                    const changed = Object.keys(result.state).length > 0;
+                    gameState = Object.assign({}, gameState, result.state, { game_data: catalog });
+                    stateVersion = result.state_version;
+                    if (changed) renderGameUI();
                 }
                 if (successCallback) successCallback(result);
             } else {
@@ -85,12 +166,14 @@ document.addEventListener('DOMContentLoaded', () => {
 
     async function handleLogout() {
         stopGameLoop();
+        stopEventStream();
         stopUiUpdateLoop();
         try {
             const response = await fetch('/api/logout');
             const result = await response.json();
             if (result.success) {
                 gameState = {};
+                stateVersion = null;
                 showAuthForm(true);
             } else {
                 alert('Logout failed. Please try again.');
@@ -107,6 +190,15 @@ document.addEventListener('DOMContentLoaded', () => {
         document.getElementById('user-money').textContent = gameState.user.money.toLocaleString();
         document.getElementById('global-weather').textContent = gameState.global_weather.map(w => w.name).join(', ') || 'Clear';
         renderPlots();
+        renderHarvestAllButton();
+    }
+
+    function renderHarvestAllButton() {
+        const button = document.getElementById('harvest-all-btn');
+        if (!button) return;
+        const count = gameState.plots.reduce((total, plot) => total + plot.fruits.length, 0);
+        button.textContent = count > 0 ? `Harvest All (${count})` : 'Harvest All';
+        button.disabled = count === 0;
     }
 
     function renderPlots() {
@@ -143,6 +235,7 @@ document.addEventListener('DOMContentLoaded', () => {
         if (target.id === 'logout-btn') handleLogout();
         else if (target.id === 'shop-btn') showShopModal();
         else if (target.id === 'inventory-btn') showInventoryModal();
+        else if (target.id === 'harvest-all-btn') handleHarvestAll();
         else if (classList.contains('buy-plot-btn')) handleBuyPlot(target.dataset.plotNumber);
         else if (classList.contains('use-fertilizer-btn')) showFertilizerModal(target.dataset.plotId);
         else if (classList.contains('dig-up-plant-btn')) {
@@ -150,7 +243,7 @@ document.addEventListener('DOMContentLoaded', () => {
         }
         else if (target.closest('.close-modal-btn')) closeAllModals();
         else if (classList.contains('plant-seed-btn')) showPlantSeedModal(target.dataset.plotId);
-        else if (target.closest('.fruit-image')) handleHarvest(target.dataset.fruitId, target.closest('.fruit-container'));
+        else if (target.closest('.fruit-image')) handleHarvest(target.closest('.fruit-image').dataset.fruitId, target.closest('.fruit-container'));
     }
 
     function attachGameDashboardListeners() {
@@ -158,19 +251,45 @@ document.addEventListener('DOMContentLoaded', () => {
         document.body.addEventListener('click', handleDashboardClick);
     }
 
-    async function handleHarvest(fruitId, container) {
-        if (!container) return;
+    function hideFruit(container) {
         container.style.transition = 'transform 0.3s, opacity 0.3s';
         container.style.transform = 'scale(0)';
         container.style.opacity = '0';
+    }
 
-        handleApiCall('/api/harvest_fruit', {
+    function handleHarvest(fruitId, container) {
+        if (!container) return;
+        hideFruit(container);
+        pendingHarvestIds.add(fruitId);
+        if (!harvestFlushTimeout) harvestFlushTimeout = setTimeout(flushPendingHarvests, HARVEST_BATCH_DELAY_MS);
+    }
+
+    function flushPendingHarvests() {
+        harvestFlushTimeout = null;
+        const fruitIds = Array.from(pendingHarvestIds);
+        pendingHarvestIds.clear();
+        if (fruitIds.length === 0) return;
+        handleApiCall('/api/harvest_fruits', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
             },
             body: JSON.stringify({
-                fruit_id: fruitId
+                fruit_ids: fruitIds
+            })
+        });
+    }
+
+    function handleHarvestAll() {
+        document.querySelectorAll('.fruit-container').forEach(hideFruit);
+        pendingHarvestIds.clear();
+        handleApiCall('/api/harvest_fruits', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                all: true
             })
         });
     }
@@ -237,16 +356,13 @@ document.addEventListener('DOMContentLoaded', () => {
                     <div class="plot-effects-container"></div>
                 `;
 
-                const imagePath = `/static/images/plants/${plantInfo.image_prefix}_${String(plot.growth_stage).padStart(2, '0')}.png`;
+                const imagePath = `images/plants/${plantInfo.image_prefix}_${String(plot.growth_stage).padStart(2, '0')}.png`;
                 let plantImage = plotDiv.querySelector('.plant-image');
                 if (!plantImage) {
-                    plantImage = document.createElement('img');
-                    plantImage.className = 'plant-image';
+                    plantImage = createSprite('plant-image', 'xMidYMax');
                     plotDiv.appendChild(plantImage);
                 }
-                if (plantImage.src !== new URL(imagePath, window.location.origin).href) {
-                    plantImage.src = imagePath;
-                }
+                setSprite(plantImage, imagePath);
 
                 plotDiv.querySelectorAll('.fruit-container').forEach(c => c.remove());
 
@@ -265,7 +381,7 @@ document.addEventListener('DOMContentLoaded', () => {
             }
 
         } else {
-            const imagePath = `/static/images/plants/${plantInfo.image_prefix}_${String(plot.growth_stage).padStart(2, '0')}.png`;
+            const imagePath = `images/plants/${plantInfo.image_prefix}_${String(plot.growth_stage).padStart(2, '0')}.png`;
             let infoDiv = plotDiv.querySelector('.plot-info');
             if (!infoDiv) {
                 plotDiv.innerHTML = '';
@@ -282,13 +398,10 @@ document.addEventListener('DOMContentLoaded', () => {
             `;
             let plantImage = plotDiv.querySelector('.plant-image');
             if (!plantImage) {
-                plantImage = document.createElement('img');
-                plantImage.className = 'plant-image';
+                plantImage = createSprite('plant-image', 'xMidYMax');
                 plotDiv.appendChild(plantImage);
             }
-            if (plantImage.src !== new URL(imagePath, window.location.origin).href) {
-                plantImage.src = imagePath;
-            }
+            setSprite(plantImage, imagePath);
             const serverFruitIds = new Set(plot.fruits.map(f => String(f.id)));
             plotDiv.querySelectorAll('.fruit-container').forEach(c => {
                 if (!serverFruitIds.has(c.dataset.fruitId)) c.remove();
@@ -388,9 +501,8 @@ document.addEventListener('DOMContentLoaded', () => {
             container.style.cssText = `position: absolute; top: ${topPosition}%; left: ${leftPosition}%;`;
         }
 
-        const img = document.createElement('img');
-        img.className = 'fruit-image';
-        img.src = `/static/images/fruits/${plantInfo.image_prefix}_${fruitInfo.image_suffix}.png`;
+        const img = createSprite('fruit-image');
+        setSprite(img, `images/fruits/${plantInfo.image_prefix}_${fruitInfo.image_suffix}.png`);
         img.dataset.fruitId = fruit.id;
         container.appendChild(img);
         return container;
@@ -455,13 +567,11 @@ document.addEventListener('DOMContentLoaded', () => {
                 if (combo) iconSrc = combo.display_icon_filename;
             }
             if (iconSrc) {
-                const fullIconPath = new URL(`/static/images/weather/${iconSrc}`, window.location.origin).href;
                 if (!existingIcon) {
-                    existingIcon = document.createElement('img');
-                    existingIcon.className = 'weather-icon';
+                    existingIcon = createSprite('weather-icon');
                     container.appendChild(existingIcon);
                 }
-                if (existingIcon.src !== fullIconPath) existingIcon.src = fullIconPath;
+                setSprite(existingIcon, `images/weather/${iconSrc}`);
             }
         } else if (existingIcon) {
             existingIcon.remove();
@@ -471,6 +581,7 @@ document.addEventListener('DOMContentLoaded', () => {
     function updateAllTimers() {
         if (!gameState.game_data) return;
         const now = new Date();
+        advanceGrowthStages(now);
         updateTopBarCountdowns(now);
         updateAllPlotInfo(now);
     }
@@ -498,6 +609,23 @@ document.addEventListener('DOMContentLoaded', () => {
         weatherEl.textContent = formatTime(weatherSecondsLeft);
     }
 
+    function advanceGrowthStages(now) {
+        let stageChanged = false;
+        gameState.plots.forEach(plot => {
+            if (!plot.plant_type_id || !plot.planted_at) return;
+            const plantInfo = gameState.game_data.plant_types[plot.plant_type_id];
+            const plantedAt = new Date(plot.planted_at);
+            if (!plantInfo || isNaN(plantedAt.getTime())) return;
+            const effectiveMs = now.getTime() - plantedAt.getTime() + (plot.growth_boost_seconds || 0) * 1000;
+            const stage = Math.min(plantInfo.max_growth_stage, Math.floor(effectiveMs / (plantInfo.growth_time_per_stage_seconds * 1000)) + 1);
+            if (stage > plot.growth_stage) {
+                plot.growth_stage = stage;
+                stageChanged = true;
+            }
+        });
+        if (stageChanged) renderPlots();
+    }
+
     function updatePlotCountdowns(now) {
         document.querySelectorAll('.growth-countdown').forEach(el => {
             if (el.classList.contains('mature-text')) return;
@@ -618,7 +746,7 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     function showShopModal() {
-        const shopTitle = `<img src="/static/images/icon/cart.png" class="modal-title-icon" alt="Shop"> Shop`;
+        const shopTitle = `<img src="${assetUrl('images/icon/cart.png')}" class="modal-title-icon" alt="Shop"> Shop`;
         showModal(shopTitle, `<h3>Seeds</h3><div id="seed-items" class="shop-grid"></div><hr><h3>Fertilizers</h3><div id="fert-items" class="shop-grid"></div>`);
 
         const inventoryMap = {};
@@ -645,13 +773,13 @@ document.addEventListener('DOMContentLoaded', () => {
                     el.dataset.itemKey = `${group.itemType}-${item.id}`;
                     const price = item.seed_price ?? item.price;
                     const ownedQuantity = inventoryMap[`${group.itemType}-${item.id}`] || 0;
-                    let imageUrl = '';
-                    if (group.itemType === 'seed') imageUrl = `/static/images/fruits/${item.image_prefix}_normal.png`;
-                    else if (group.itemType === 'fertilizer') imageUrl = `/static/images/fertilizer/${item.name.replace(/ /g, '_') + '.png'}`;
+                    let imagePath = '';
+                    if (group.itemType === 'seed') imagePath = `images/fruits/${item.image_prefix}_normal.png`;
+                    else if (group.itemType === 'fertilizer') imagePath = `images/fertilizer/${item.name.replace(/ /g, '_') + '.png'}`;
 
                     let descriptionHtml = (group.itemType === 'fertilizer') ? `<p class="item-description">${generateFertilizerDescription(item)}</p>` : '';
                     el.innerHTML = `
-                        <img src="${imageUrl}" alt="${item.name}" style="width: 60px; height: 60px; object-fit: contain;">
+                        ${spriteHtml(imagePath, '', item.name, 'width: 60px; height: 60px;')}
                         <h4>${item.name}</h4>
                         ${descriptionHtml}
                         <p class="owned-count">Owned: ${ownedQuantity}</p>
@@ -702,25 +830,25 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     function showInventoryModal() {
-        const inventoryTitle = `<img src="/static/images/icon/backpack.png" class="modal-title-icon" alt="Inventory"> Inventory`;
+        const inventoryTitle = `<img src="${assetUrl('images/icon/backpack.png')}" class="modal-title-icon" alt="Inventory"> Inventory`;
 
         const createItemHtml = (item, type) => {
-            let info, imageUrl, descriptionHtml = '';
+            let info, imagePath, descriptionHtml = '';
             if (type === 'seed') {
                 info = gameState.game_data.plant_types[item.item_id];
-                if (info) imageUrl = `/static/images/fruits/${info.image_prefix}_normal.png`;
+                if (info) imagePath = `images/fruits/${info.image_prefix}_normal.png`;
             } else if (type === 'fertilizer') {
                 info = gameState.game_data.fertilizer_types[item.item_id];
                 if (info) {
                     const imageName = info.name.replace(/ /g, '_') + '.png';
-                    imageUrl = `/static/images/fertilizer/${imageName}`;
+                    imagePath = `images/fertilizer/${imageName}`;
                     descriptionHtml = `<p class="item-description">${generateFertilizerDescription(info)}</p>`;
                 }
             }
             if (!info) return '';
             return `
                 <div class="shop-item">
-                    <img src="${imageUrl}" alt="${info.name}" style="width: 60px; height: 60px; object-fit: contain;">
+                    ${spriteHtml(imagePath, '', info.name, 'width: 60px; height: 60px;')}
                     <h4>${info.name}</h4>
                     ${descriptionHtml}
                     <p>Quantity: ${item.quantity.toLocaleString()}</p>
@@ -801,7 +929,7 @@ document.addEventListener('DOMContentLoaded', () => {
                         if (combo) iconSrc = combo.display_icon_filename;
                     }
                     if (iconSrc) {
-                        weatherIconHtml = `<img src="/static/images/weather/${iconSrc}" class="inventory-weather-icon" alt="Weather Effect">`;
+                        weatherIconHtml = spriteHtml(`images/weather/${iconSrc}`, 'inventory-weather-icon', 'Weather Effect');
                     }
                 }
 
@@ -813,7 +941,7 @@ document.addEventListener('DOMContentLoaded', () => {
                         <label class="fruit-select-label">
                             ${weatherIconHtml}
                             <input type="checkbox" class="fruit-select-checkbox" data-fruit-id="${fruit.id}" data-price="${price}">
-                            <img src="/static/images/fruits/${fruit.image_prefix}_${fruit.image_suffix}.png" alt="${fruit.plant_name}" style="width:60px; height:60px; object-fit:contain;">
+                            ${spriteHtml(`images/fruits/${fruit.image_prefix}_${fruit.image_suffix}.png`, '', fruit.plant_name, 'width:60px; height:60px;')}
                         </label>
                         <h4>${fruit.color_name} ${fruit.plant_name}</h4>
                         ${weatherTextHtml}
@@ -882,31 +1010,32 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
-    function createItemSelectionModal(title, items, infoLookup, buttonData, onSelect) {
+    function createItemSelectionModal(title, items, infoLookup, buttonData, onSelect, onSelectBulk) {
         let body = items.length === 0 ? `<p>You have no ${buttonData.itemName}s!</p>` : '<div class="shop-grid">';
 
         if (items.length > 0) {
             items.forEach(item => {
                 const info = infoLookup[item.item_id];
                 let descriptionHtml = '';
-                let imageUrl = '';
+                let imagePath = '';
 
                 if (info) {
                     if (buttonData.itemName === 'fertilizer') {
                         const imageName = info.name.replace(/ /g, '_') + '.png';
-                        imageUrl = `/static/images/fertilizer/${imageName}`;
+                        imagePath = `images/fertilizer/${imageName}`;
                         descriptionHtml = `<p class="item-description">${generateFertilizerDescription(info)}</p>`;
                     } else if (buttonData.itemName === 'seed') {
-                        imageUrl = `/static/images/fruits/${info.image_prefix}_normal.png`;
+                        imagePath = `images/fruits/${info.image_prefix}_normal.png`;
                     }
 
                     body += `
                         <div class="shop-item">
-                            <img src="${imageUrl}" alt="${info.name}" style="width: 60px; height: 60px; object-fit: contain;">
+                            ${spriteHtml(imagePath, '', info.name, 'width: 60px; height: 60px;')}
                             <h4>${info.name}</h4>
                             ${descriptionHtml}
                             <p>Owned: ${item.quantity}</p>
                             ${createButton(buttonData.text, buttonData.className, { inventoryId: item.id }).outerHTML}
+                            ${buttonData.bulkText ? createButton(buttonData.bulkText, buttonData.bulkClassName, { inventoryId: item.id, quantity: item.quantity }).outerHTML : ''}
                         </div>
                     `;
                 }
@@ -918,14 +1047,27 @@ document.addEventListener('DOMContentLoaded', () => {
         document.querySelectorAll(`.${buttonData.className}`).forEach(btn => {
             btn.onclick = onSelect;
         });
+        if (buttonData.bulkText) {
+            document.querySelectorAll(`.${buttonData.bulkClassName}`).forEach(btn => {
+                btn.onclick = onSelectBulk;
+            });
+        }
+    }
+
+    function targetPlotIds(firstPlotId, plots, quantity) {
+        const ids = [String(firstPlotId), ...plots.map(p => String(p.id)).filter(id => id !== String(firstPlotId))];
+        return ids.slice(0, quantity);
     }
 
     function showPlantSeedModal(plotId) {
         const items = gameState.inventory.filter(i => i.item_type === 'seed');
+        const emptyPlots = gameState.plots.filter(p => !p.plant_type_id);
         createItemSelectionModal('Choose a Seed', items, gameState.game_data.plant_types, {
             text: 'Plant This',
             className: 'select-seed-btn',
-            itemName: 'seed'
+            itemName: 'seed',
+            bulkText: emptyPlots.length > 1 ? 'Plant in All Empty Plots' : null,
+            bulkClassName: 'select-seed-all-btn'
         }, (e) => {
             closeAllModals();
             handleApiCall('/api/plant_seed', {
@@ -938,15 +1080,30 @@ document.addEventListener('DOMContentLoaded', () => {
                     plot_id: plotId
                 })
             });
+        }, (e) => {
+            closeAllModals();
+            const inventoryId = e.target.dataset.inventoryId;
+            handleApiCall('/api/plant_seeds', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({
+                    plantings: targetPlotIds(plotId, emptyPlots, Number(e.target.dataset.quantity)).map(id => ({ inventory_id: inventoryId, plot_id: id }))
+                })
+            });
         });
     }
 
     function showFertilizerModal(plotId) {
         const items = gameState.inventory.filter(i => i.item_type === 'fertilizer');
+        const plantedPlots = gameState.plots.filter(p => p.plant_type_id);
         createItemSelectionModal('Use a Fertilizer', items, gameState.game_data.fertilizer_types, {
             text: 'Use This',
             className: 'select-fertilizer-btn',
-            itemName: 'fertilizer'
+            itemName: 'fertilizer',
+            bulkText: plantedPlots.length > 1 ? 'Use on All Plants' : null,
+            bulkClassName: 'select-fertilizer-all-btn'
         }, (e) => {
             closeAllModals();
             handleApiCall('/api/use_fertilizer', {
@@ -959,12 +1116,24 @@ document.addEventListener('DOMContentLoaded', () => {
                     plot_id: plotId
                 })
             });
+        }, (e) => {
+            closeAllModals();
+            const inventoryId = e.target.dataset.inventoryId;
+            handleApiCall('/api/use_fertilizers', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({
+                    applications: targetPlotIds(plotId, plantedPlots, Number(e.target.dataset.quantity)).map(id => ({ inventory_id: inventoryId, plot_id: id }))
+                })
+            });
         });
     }
 
-    function startGameLoop() {
+    function startGameLoop(intervalMs = POLL_INTERVAL_MS) {
         if (gameLoopInterval) clearInterval(gameLoopInterval);
-        gameLoopInterval = setInterval(updateGame, 5000);
+        gameLoopInterval = setInterval(updateGame, intervalMs);
     }
 
     function stopGameLoop() {
@@ -972,6 +1141,35 @@ document.addEventListener('DOMContentLoaded', () => {
         gameLoopInterval = null;
     }
 
+    function startEventStream() {
+        stopEventStream();
+        if (!window.EventSource) return;
+        eventSource = new EventSource('/api/events');
+        eventSource.onopen = () => startGameLoop(PUSH_FALLBACK_POLL_MS);
+        eventSource.onerror = () => {
+            startGameLoop(POLL_INTERVAL_MS);
+            // The server refused the stream (all slots taken); keep polling and try again later.
+            if (eventSource.readyState === EventSource.CLOSED) eventSourceRetryTimeout = setTimeout(startEventStream, PUSH_RETRY_MS);
+        };
+        GAME_EVENT_TYPES.forEach(type => eventSource.addEventListener(type, scheduleStateRefresh));
+    }
+
+    function stopEventStream() {
+        if (eventSourceRetryTimeout) clearTimeout(eventSourceRetryTimeout);
+        eventSourceRetryTimeout = null;
+        if (eventSource) eventSource.close();
+        eventSource = null;
+    }
+
+    function scheduleStateRefresh() {
+        if (stateRefreshPending) return;
+        stateRefreshPending = true;
+        setTimeout(async () => {
+            stateRefreshPending = false;
+            await handleApiCall('/api/get_game_state', {});
+        }, 250);
+    }
+
     function startUiUpdateLoop() {
         if (uiUpdateInterval) clearInterval(uiUpdateInterval);
         uiUpdateInterval = setInterval(updateAllTimers, 1000);